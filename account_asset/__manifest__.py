@@ -16,6 +16,7 @@ Keeps track of depreciations, and creates corresponding journal entries.
     'data': [
         'security/account_asset_security.xml',
         'security/ir.model.access.csv',
+        'data/account_asset_data.xml',
         'wizard/asset_modify_views.xml',
         'wizard/asset_pause_views.xml',
         'wizard/asset_sell_views.xml',
@@ -2,12 +2,22 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 import calendar
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
 from dateutil.relativedelta import relativedelta
 from math import copysign
 
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
-from odoo.tools import float_compare, float_is_zero, float_round
+from odoo.osv import expression
+from odoo.tools import date_utils, float_compare, float_is_zero, float_round
+
+_logger = logging.getLogger(__name__)
+
+# Number of depreciation entries posted between two commits of the posting cron
+DEPRECIATION_BATCH_SIZE = 500
 
 
 class AccountAsset(models.Model):
@@ -334,32 +344,113 @@ class AccountAsset(models.Model):
         return amount
 
     def compute_depreciation_board(self):
-        self.ensure_one()
-        amount_change_ids = self.depreciation_move_ids.filtered(lambda x: x.asset_value_change and not x.reversal_move_id).sorted(key=lambda l: l.date)
-        posted_depreciation_move_ids = self.depreciation_move_ids.filtered(lambda x: x.state == 'posted' and not x.asset_value_change and not x.reversal_move_id).sorted(key=lambda l: l.date)
-        already_depreciated_amount = sum([m.amount_total for m in posted_depreciation_move_ids])
-        depreciation_number = self.method_number
-        if self.prorata:
-            depreciation_number += 1
-        starting_sequence = 0
-        amount_to_depreciate = self.value_residual + sum([m.amount_total for m in amount_change_ids])
-        depreciation_date = self.first_depreciation_date
-        # if we already have some previous validated entries, starting date is last entry + method period
-        if posted_depreciation_move_ids and posted_depreciation_move_ids[-1].date:
-            last_depreciation_date = fields.Date.from_string(posted_depreciation_move_ids[-1].date)
-            if last_depreciation_date > depreciation_date:  # in case we unpause the asset
-                depreciation_date = last_depreciation_date + relativedelta(months=+int(self.method_period))
-        commands = [(2, line_id.id, False) for line_id in self.depreciation_move_ids.filtered(lambda x: x.state == 'draft')]
-        newlines = self._recompute_board(depreciation_number, starting_sequence, amount_to_depreciate, depreciation_date, already_depreciated_amount, amount_change_ids)
+        """ Recompute the draft depreciation entries of the assets.
+
+        The boards of all the assets are computed first, then compared to their draft entries: the entries
+        which did not change are kept, the other ones are deleted and the new ones are created all at once.
+        """
+        moves_to_unlink = self.env['account.move']
         newline_vals_list = []
-        for newline_vals in newlines:
-            # no need of amount field, as it is computed and we don't want to trigger its inverse function
-            del(newline_vals['amount_total'])
-            newline_vals_list.append(newline_vals)
-        new_moves = self.env['account.move'].create(newline_vals_list)
-        for move in new_moves:
-            commands.append((4, move.id))
-        return self.write({'depreciation_move_ids': commands})
+        for asset in self:
+            amount_change_ids = asset.depreciation_move_ids.filtered(lambda x: x.asset_value_change and not x.reversal_move_id).sorted(key=lambda l: l.date)
+            posted_depreciation_move_ids = asset.depreciation_move_ids.filtered(lambda x: x.state == 'posted' and not x.asset_value_change and not x.reversal_move_id).sorted(key=lambda l: l.date)
+            already_depreciated_amount = sum([m.amount_total for m in posted_depreciation_move_ids])
+            depreciation_number = asset.method_number
+            if asset.prorata:
+                depreciation_number += 1
+            starting_sequence = 0
+            amount_to_depreciate = asset.value_residual + sum([m.amount_total for m in amount_change_ids])
+            depreciation_date = asset.first_depreciation_date
+            # if we already have some previous validated entries, starting date is last entry + method period
+            if posted_depreciation_move_ids and posted_depreciation_move_ids[-1].date:
+                last_depreciation_date = fields.Date.from_string(posted_depreciation_move_ids[-1].date)
+                if last_depreciation_date > depreciation_date:  # in case we unpause the asset
+                    depreciation_date = last_depreciation_date + relativedelta(months=+int(asset.method_period))
+            newlines = asset._recompute_board(depreciation_number, starting_sequence, amount_to_depreciate, depreciation_date, already_depreciated_amount, amount_change_ids)
+
+            draft_moves = asset.depreciation_move_ids.filtered(lambda x: x.state == 'draft')
+            moves_per_key = defaultdict(list)
+            for move in draft_moves.sorted(lambda m: (m.date, m.id)):
+                moves_per_key[asset._get_depreciation_move_key(move)].append(move)
+            for newline_vals in newlines:
+                existing_moves = moves_per_key.get(asset._get_depreciation_move_values_key(newline_vals))
+                if existing_moves:
+                    # the entry did not change: only its cumulated values may have to be updated
+                    move = existing_moves.pop(0)
+                    draft_moves -= move
+                    to_write = {
+                        field: newline_vals[field]
+                        for field in ('asset_remaining_value', 'asset_depreciated_value')
+                        if asset.currency_id.compare_amounts(move[field], newline_vals[field])
+                    }
+                    if to_write:
+                        move.write(to_write)
+                    continue
+                # no need of amount field, as it is computed and we don't want to trigger its inverse function
+                del(newline_vals['amount_total'])
+                newline_vals_list.append(newline_vals)
+            moves_to_unlink |= draft_moves
+        moves_to_unlink.unlink()
+        self.env['account.move'].create(newline_vals_list)
+        self._check_depreciations()
+        return True
+
+    def _get_depreciation_move_values_key(self, move_vals):
+        """ The key identifying a depreciation entry of the asset from its values,
+        see `account.move._prepare_move_for_asset_depreciation`. """
+        self.ensure_one()
+        company_currency = self.company_id.currency_id
+        lines = []
+        for dummy, dummy, line_vals in move_vals['line_ids']:
+            analytic_tag_ids = line_vals.get('analytic_tag_ids') and line_vals['analytic_tag_ids'][0][2] or []
+            lines.append((
+                line_vals['name'],
+                line_vals['account_id'],
+                line_vals.get('partner_id') or False,
+                company_currency.round(line_vals['debit']),
+                company_currency.round(line_vals['credit']),
+                line_vals['currency_id'],
+                self.currency_id.round(line_vals['amount_currency']),
+                line_vals.get('analytic_account_id') or False,
+                tuple(sorted(analytic_tag_ids)),
+            ))
+        return (
+            move_vals['date'],
+            move_vals['ref'],
+            move_vals['journal_id'],
+            move_vals.get('partner_id') or False,
+            move_vals['currency_id'],
+            move_vals['move_type'],
+            move_vals.get('asset_value_change') or False,
+            tuple(sorted(lines)),
+        )
+
+    def _get_depreciation_move_key(self, move):
+        """ The key identifying the depreciation entry ``move`` of the asset, see `_get_depreciation_move_values_key`. """
+        self.ensure_one()
+        if move.asset_value_change:
+            return None
+        lines = [(
+            line.name,
+            line.account_id.id,
+            line.partner_id.id,
+            line.company_currency_id.round(line.debit),
+            line.company_currency_id.round(line.credit),
+            line.currency_id.id,
+            self.currency_id.round(line.amount_currency),
+            line.analytic_account_id.id,
+            tuple(sorted(line.analytic_tag_ids.ids)),
+        ) for line in move.line_ids]
+        return (
+            move.date,
+            move.ref,
+            move.journal_id.id,
+            move.partner_id.id,
+            move.currency_id.id,
+            move.move_type,
+            move.asset_value_change,
+            tuple(sorted(lines)),
+        )
 
     def _recompute_board(self, depreciation_number, starting_sequence, amount_to_depreciate, depreciation_date, already_depreciated_amount, amount_change_ids):
         self.ensure_one()
@@ -414,6 +505,77 @@ class AccountAsset(models.Model):
                     depreciation_date = depreciation_date.replace(day=max_day_in_month)
         return move_vals
 
+    @api.model
+    def _cron_post_depreciation_moves(self, batch_size=DEPRECIATION_BATCH_SIZE):
+        """ Post the due depreciation entries of the oldest pending period (month), by batches of ``batch_size``
+        entries, committing after each batch. The entries of a batch are locked, so that they are skipped by a
+        concurrent posting of the draft entries. The cron is triggered again while some entries remain due.
+        """
+        auto_commit = not getattr(threading.currentThread(), 'testing', False)
+        Move = self.env['account.move']
+        today = fields.Date.context_today(self)
+        domain = [
+            ('asset_id', '!=', False),
+            ('state', '=', 'draft'),
+            ('auto_post', '=', True),
+            ('date', '<=', today),
+        ]
+        first_move = Move.search(domain, order='date, id', limit=1)
+        if not first_move:
+            return
+        period_end = min(date_utils.end_of(first_move.date, 'month'), today)
+        period_domain = expression.AND([domain, [('date', '<=', period_end)]])
+        total = Move.search_count(period_domain)
+        start = time.time()
+        stats = Counter()
+        skipped_ids = []
+        while True:
+            moves = Move.search(expression.AND([period_domain, [('id', 'not in', skipped_ids)]]), order='date, id', limit=batch_size)
+            if not moves:
+                break
+            self.env.cr.execute("SELECT id FROM account_move WHERE id IN %s FOR UPDATE SKIP LOCKED", [tuple(moves.ids)])
+            locked_ids = {row[0] for row in self.env.cr.fetchall()}
+            skipped_ids += [move_id for move_id in moves.ids if move_id not in locked_ids]
+            skipped_ids += self._post_depreciation_moves(moves.filtered(lambda move: move.id in locked_ids), stats)
+            if auto_commit:
+                self.env.cr.commit()
+            self.invalidate_cache()
+            _logger.info(
+                "Depreciation posting: %s/%s entries until %s posted in %.2fs, %s failures, %s retries",
+                stats['posted'], total, period_end, time.time() - start, stats['failures'], stats['retries'])
+
+        # The next period, or the entries skipped by this run, are posted by the next run. It is only triggered
+        # if this one made some progress, so that it does not loop on the entries which can not be posted.
+        if stats['posted'] and Move.search_count(domain):
+            self.env.ref('account_asset.ir_cron_post_depreciation_moves')._trigger()
+
+    @api.model
+    def _post_depreciation_moves(self, moves, stats):
+        """ Post the depreciation entries ``moves`` at once, retrying them one by one if it fails.
+
+        :param stats: Counter of the 'posted' entries, 'retries' and 'failures', updated in place
+        :return: the ids of the entries which could not be posted
+        """
+        try:
+            with self.env.cr.savepoint():
+                moves._post()
+            stats['posted'] += len(moves)
+            return []
+        except Exception:
+            _logger.warning('Fail to post %s depreciation entries at once, retrying them one by one', len(moves))
+        failed_ids = []
+        for move in moves:
+            stats['retries'] += 1
+            try:
+                with self.env.cr.savepoint():
+                    move._post()
+                stats['posted'] += 1
+            except Exception:
+                stats['failures'] += 1
+                failed_ids.append(move.id)
+                _logger.exception('Fail to post the depreciation entry %s', move.id)
+        return failed_ids
+
     @api.model
     def _get_views(self, type):
         form_view = self.env.ref('account_asset.view_account_asset_form')
@@ -560,10 +722,9 @@ class AccountAsset(models.Model):
             asset.message_post(body=asset_name[0], tracking_value_ids=tracking_value_ids)
             for move_id in asset.original_move_line_ids.mapped('move_id'):
                 move_id.message_post(body=msg)
-            if not asset.depreciation_move_ids:
-                asset.compute_depreciation_board()
-            asset._check_depreciations()
-            asset.depreciation_move_ids.filtered(lambda move: move.state != 'posted')._post()
+        self.filtered(lambda asset: not asset.depreciation_move_ids).compute_depreciation_board()
+        self._check_depreciations()
+        self.depreciation_move_ids.filtered(lambda move: move.state != 'posted')._post()
 
     def _return_disposal_view(self, move_ids):
         name = _('Disposal Move')
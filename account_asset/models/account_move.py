@@ -4,6 +4,7 @@
 import math
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
+from odoo.osv import expression
 from odoo.tools import float_compare, float_round
 from odoo.tools.misc import formatLang
 from dateutil.relativedelta import relativedelta
@@ -47,6 +48,23 @@ class AccountMove(models.Model):
         posted._delete_reversed_entry_assets()
         return posted
 
+    @api.model
+    def _autopost_draft_entries(self):
+        # OVERRIDE
+        # The depreciation entries are posted period by period by the dedicated cron, see
+        # `account.asset._cron_post_depreciation_moves`, so they are left out to not post them twice concurrently.
+        return super(AccountMove, self.with_context(autopost_skip_asset_entries=True))._autopost_draft_entries()
+
+    @api.model
+    def _search(self, args, offset=0, limit=None, order=None, count=False, access_rights_uid=None):
+        # OVERRIDE
+        # Leave the depreciation entries out of the search of the entries to auto post, see `_autopost_draft_entries`.
+        if self._context.get('autopost_skip_asset_entries') and any(
+            isinstance(leaf, (list, tuple)) and leaf[0] == 'auto_post' for leaf in args
+        ):
+            args = expression.AND([args, [('asset_id', '=', False)]])
+        return super()._search(args, offset=offset, limit=limit, order=order, count=count, access_rights_uid=access_rights_uid)
+
     def _reverse_moves(self, default_values_list=None, cancel=False):
         for move in self:
             # Report the value of this move to the next draft move or create a new one
@@ -92,10 +110,19 @@ class AccountMove(models.Model):
         return super(AccountMove, self).button_draft()
 
     def _log_depreciation_asset(self):
+        # The messages are logged for all the assets at once, an asset having several entries is logged once per batch
+        moves_per_asset = defaultdict(list)
         for move in self.filtered(lambda m: m.asset_id):
-            asset = move.asset_id
-            msg = _('Depreciation entry %s posted (%s)') % (move.name, formatLang(self.env, move.amount_total, currency_obj=move.company_id.currency_id))
-            asset.message_post(body=msg)
+            moves_per_asset[move.asset_id.id].append(move)
+        subtype_id = self.env['ir.model.data']._xmlid_to_res_id('mail.mt_note')
+        while moves_per_asset:
+            bodies = {}
+            for asset_id, moves in list(moves_per_asset.items()):
+                move = moves.pop(0)
+                bodies[asset_id] = _('Depreciation entry %s posted (%s)') % (move.name, formatLang(self.env, move.amount_total, currency_obj=move.company_id.currency_id))
+                if not moves:
+                    del moves_per_asset[asset_id]
+            self.env['account.asset'].browse(list(bodies))._message_log_batch(bodies=bodies, subtype_id=subtype_id)
 
     def _auto_create_asset(self):
         create_list = []
@@ -55,7 +55,9 @@ class TestAccountAsset(TestAccountReportsCommon):
             'method': 'linear',
         })
         cls.truck.validate()
-        cls.env['account.move']._autopost_draft_entries()
+        # the cron posts the due depreciation entries of one period per run
+        for dummy in cls.truck.depreciation_move_ids.filtered(lambda m: m.date <= today):
+            cls.env['account.asset']._cron_post_depreciation_moves()
 
         cls.account_asset_model_fixedassets = cls.env['account.asset'].create({
             'account_depreciation_id': cls.company_data['default_account_assets'].copy().id,
@@ -1126,3 +1128,85 @@ class TestAccountAsset(TestAccountReportsCommon):
         self.assertEqual(len(product_b_lines.asset_ids), 4)
         self.assertEqual(len(product_a_100_lines.asset_ids), 5)
         self.assertEqual(len(product_a_150_lines.asset_ids), 4)
+
+    @patch('odoo.fields.Date.today', return_value=today())
+    @patch('odoo.fields.Date.context_today', context_today)
+    def test_asset_compute_depreciation_board_batch(self, today_mock):
+        """Test the boards of several assets are computed together and the unchanged draft entries are kept"""
+        draft_moves = self.truck.depreciation_move_ids.filtered(lambda m: m.state == 'draft')
+        self.truck.compute_depreciation_board()
+        self.assertEqual(self.truck.depreciation_move_ids.filtered(lambda m: m.state == 'draft'), draft_moves)
+
+        assets = self.env['account.asset'].create([{
+            'account_asset_id': self.company_data['default_account_expense'].id,
+            'account_depreciation_id': self.company_data['default_account_assets'].copy().id,
+            'account_depreciation_expense_id': self.company_data['default_account_assets'].id,
+            'journal_id': self.company_data['default_journal_misc'].id,
+            'asset_type': 'purchase',
+            'name': name,
+            'acquisition_date': fields.Date.today() + relativedelta(month=1, day=1),
+            'original_value': 10000,
+            'method_number': 5,
+            'method_period': '12',
+            'method': method,
+            'method_progress_factor': 0.3,
+        } for name, method in [('linear', 'linear'), ('degressive', 'degressive')]])
+        assets.compute_depreciation_board()
+        self.assertRecordValues(assets[0].depreciation_move_ids.sorted('date'), [{'amount_total': 2000}] * 5)
+        self.assertRecordValues(assets[1].depreciation_move_ids.sorted('date'), [
+            {'amount_total': 3000, 'asset_remaining_value': 7000},
+            {'amount_total': 2100, 'asset_remaining_value': 4900},
+            {'amount_total': 1470, 'asset_remaining_value': 3430},
+            {'amount_total': 1029, 'asset_remaining_value': 2401},
+            {'amount_total': 2401, 'asset_remaining_value': 0},
+        ])
+
+        # Changing the board of one asset only rewrites its changed entries
+        moves = assets.depreciation_move_ids
+        assets[0].method_number = 4
+        assets.compute_depreciation_board()
+        self.assertEqual(assets[1].depreciation_move_ids, moves.filtered(lambda m: m.asset_id == assets[1]))
+        self.assertRecordValues(assets[0].depreciation_move_ids.sorted('date'), [{'amount_total': 2500}] * 4)
+
+        # An entry whose labels differ from the asset is rewritten as well
+        move = assets[1].depreciation_move_ids.sorted('date')[0]
+        move.line_ids.write({'name': 'Outdated label'})
+        assets.compute_depreciation_board()
+        self.assertNotIn(move, assets[1].depreciation_move_ids)
+        self.assertEqual(assets[1].depreciation_move_ids.line_ids.mapped('name'), ['degressive'] * 10)
+
+    @patch('odoo.fields.Date.today', return_value=today())
+    @patch('odoo.fields.Date.context_today', context_today)
+    def test_asset_cron_post_depreciation_moves(self, today_mock):
+        """Test the due depreciation entries are posted one period after the other"""
+        asset = self.env['account.asset'].create({
+            'account_asset_id': self.company_data['default_account_expense'].id,
+            'account_depreciation_id': self.company_data['default_account_assets'].copy().id,
+            'account_depreciation_expense_id': self.company_data['default_account_assets'].id,
+            'journal_id': self.company_data['default_journal_misc'].id,
+            'asset_type': 'purchase',
+            'name': 'laptop',
+            'acquisition_date': fields.Date.today() + relativedelta(months=-3, day=1),
+            'original_value': 1200,
+            'method_number': 12,
+            'method_period': '1',
+            'method': 'linear',
+        })
+        asset.compute_depreciation_board()
+        asset.write({'state': 'open'})
+        moves = asset.depreciation_move_ids.sorted(lambda m: (m.date, m.id))
+        moves.write({'auto_post': True})
+
+        # the depreciation entries are left to the dedicated cron
+        self.env['account.move']._autopost_draft_entries()
+        self.assertEqual(moves.mapped('state'), ['draft'] * 12)
+
+        self.env['account.asset']._cron_post_depreciation_moves()
+        self.assertEqual(moves.mapped('state'), ['posted'] + ['draft'] * 11)
+        self.assertEqual(asset.value_residual, 1100)
+
+        self.env['account.asset']._cron_post_depreciation_moves(batch_size=1)
+        self.env['account.asset']._cron_post_depreciation_moves(batch_size=1)
+        self.assertEqual(moves.mapped('state'), ['posted'] * 3 + ['draft'] * 9)
+        self.assertEqual(asset.value_residual, 900)
+        self.assertEqual(len(asset.message_ids.filtered(lambda m: 'Depreciation entry' in (m.body or ''))), 3)
@@ -149,8 +149,7 @@ class AssetModify(models.TransientModel):
             'method_number': asset_vals['method_number'],
             'method_period': asset_vals['method_period'],
         })
-        for child in self.asset_id.children_ids:
-            child.compute_depreciation_board()
+        self.asset_id.children_ids.compute_depreciation_board()
         tracked_fields = self.env['account.asset'].fields_get(old_values.keys())
         changes, tracking_value_ids = self.asset_id._mail_track(tracked_fields, old_values)
         if changes:
@@ -5,10 +5,14 @@ import base64
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
 from odoo.addons.base.models.res_bank import sanitize_account_number
+from odoo.tools import split_every
 
 import logging
 _logger = logging.getLogger(__name__)
 
+# Number of statement lines created at once, the progress is logged after each batch
+STATEMENT_LINES_BATCH_SIZE = 1000
+
 
 class AccountBankStatementLine(models.Model):
     _inherit = "account.bank.statement.line"
@@ -218,6 +222,22 @@ class AccountBankStatementImport(models.TransientModel):
         return currency, journal
 
     def _complete_stmts_vals(self, stmts_vals, journal, account_number):
+        # Find the partners' bank accounts of all the transactions at once
+        identifying_strings = {
+            line_vals['account_number']
+            for st_vals in stmts_vals
+            for line_vals in st_vals['transactions']
+            if not line_vals.get('partner_bank_id') and line_vals.get('account_number')
+        }
+        partner_bank_per_acc_number = {}
+        if identifying_strings:
+            partner_banks = self.env['res.partner.bank'].search([
+                ('acc_number', 'in', list(identifying_strings)),
+                ('company_id', 'in', (False, journal.company_id.id)),
+            ])
+            for partner_bank in partner_banks:
+                partner_bank_per_acc_number.setdefault(partner_bank.acc_number, partner_bank)
+
         for st_vals in stmts_vals:
             st_vals['journal_id'] = journal.id
             if not st_vals.get('reference'):
@@ -233,8 +253,7 @@ class AccountBankStatementImport(models.TransientModel):
                     # reconciliation process will be linked to the bank when the statement is closed.
                     identifying_string = line_vals.get('account_number')
                     if identifying_string:
-                        partner_bank = self.env['res.partner.bank']\
-                            .search([('acc_number', '=', identifying_string), ('company_id', 'in', (False, journal.company_id.id))], limit=1)
+                        partner_bank = partner_bank_per_acc_number.get(identifying_string)
                         if partner_bank:
                             line_vals['partner_bank_id'] = partner_bank.id
                             line_vals['partner_id'] = partner_bank.partner_id.id
@@ -245,6 +264,20 @@ class AccountBankStatementImport(models.TransientModel):
         BankStatement = self.env['account.bank.statement']
         BankStatementLine = self.env['account.bank.statement.line']
 
+        # Find the already imported transactions at once
+        unique_import_ids = [
+            line_vals['unique_import_id']
+            for st_vals in stmts_vals
+            for line_vals in st_vals['transactions']
+            if line_vals.get('unique_import_id')
+        ]
+        imported_unique_import_ids = set()
+        if unique_import_ids:
+            imported_unique_import_ids = {
+                line['unique_import_id']
+                for line in BankStatementLine.sudo().search_read([('unique_import_id', 'in', unique_import_ids)], ['unique_import_id'])
+            }
+
         # Filter out already imported transactions and create statements
         statement_ids = []
         statement_line_ids = []
@@ -255,8 +288,11 @@ class AccountBankStatementImport(models.TransientModel):
                 if (line_vals['amount'] != 0
                    and ('unique_import_id' not in line_vals
                    or not line_vals['unique_import_id']
-                   or not bool(BankStatementLine.sudo().search([('unique_import_id', '=', line_vals['unique_import_id'])], limit=1)))):
+                   or line_vals['unique_import_id'] not in imported_unique_import_ids)):
                     filtered_st_lines.append(line_vals)
+                    # a transaction repeated later in the file is imported once
+                    if line_vals.get('unique_import_id'):
+                        imported_unique_import_ids.add(line_vals['unique_import_id'])
                 else:
                     ignored_statement_lines_import_ids.append(line_vals['unique_import_id'])
                     if 'balance_start' in st_vals:
@@ -266,9 +302,14 @@ class AccountBankStatementImport(models.TransientModel):
                 # Remove values that won't be used to create records
                 st_vals.pop('transactions', None)
                 number = st_vals.pop('number', None)
-                # Create the statement
-                st_vals['line_ids'] = [[0, False, line] for line in filtered_st_lines]
+                # Create the statement, then its lines by batches
+                batches = list(split_every(STATEMENT_LINES_BATCH_SIZE, filtered_st_lines, piece_maker=list))
+                st_vals['line_ids'] = [[0, False, line] for line in batches[0]]
                 statement = BankStatement.create(st_vals)
+                for index, batch in enumerate(batches[1:], start=1):
+                    _logger.info("Bank statement import: %s/%s lines created for statement %s",
+                                 index * STATEMENT_LINES_BATCH_SIZE, len(filtered_st_lines), statement.id)
+                    BankStatementLine.create([dict(line, statement_id=statement.id) for line in batch])
                 statement_ids.append(statement.id)
                 if number and number.isdecimal():
                     statement._set_next_sequence()
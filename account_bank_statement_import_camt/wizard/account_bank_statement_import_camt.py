@@ -700,22 +700,37 @@ class AccountBankStatementImport(models.TransientModel):
     _inherit = 'account.bank.statement.import'
 
     def _check_camt(self, data_file):
+        """ Returns the namespaces of the file if it is a CAMT.053 file, None otherwise.
+        Only the root element is read, the other formats are not parsed as XML. """
         try:
-            root = etree.parse(io.BytesIO(data_file)).getroot()
-        except:
+            for _event, root in etree.iterparse(io.BytesIO(data_file), events=('start',)):
+                if root.tag.find('camt.053') != -1:
+                    return {k or 'ns': v for k, v in root.nsmap.items()}
+                return None
+        except Exception:
             return None
-        if root.tag.find('camt.053') != -1:
-            return root
         return None
 
     def _parse_file(self, data_file):
-        root = self._check_camt(data_file)
-        if root is not None:
-            return self._parse_file_camt(root)
+        ns = self._check_camt(data_file)
+        if ns is not None:
+            return self._parse_file_camt(data_file, ns)
         return super(AccountBankStatementImport, self)._parse_file(data_file)
 
-    def _parse_file_camt(self, root):
-        ns = {k or 'ns': v for k, v in root.nsmap.items()}
+    def _iter_camt_statements(self, data_file, ns):
+        """ Yields the statements of the file one by one. The file is parsed incrementally
+        and the statements already processed are freed, so a large file is never loaded
+        entirely in memory. """
+        try:
+            for _event, statement in etree.iterparse(io.BytesIO(data_file), events=('end',), tag='{%s}Stmt' % ns['ns']):
+                yield statement
+                statement.clear()
+                while statement.getprevious() is not None:
+                    del statement.getparent()[0]
+        except etree.XMLSyntaxError as e:
+            raise UserError(_("The CAMT file could not be read: %s", e))
+
+    def _parse_file_camt(self, data_file, ns):
 
         curr_cache = {c['name']: c['id'] for c in self.env['res.currency'].search_read([], ['id', 'name'])}
         statements_per_iban = {}
@@ -725,7 +740,7 @@ class AccountBankStatementImport(models.TransientModel):
         has_multi_currency = self.env.user.user_has_groups('base.group_multi_currency')
         journal = self.env['account.journal'].browse(self.env.context.get('journal_id'))
         journal_currency = journal.currency_id or journal.company_id.currency_id
-        for statement in root[0].findall('ns:Stmt', ns):
+        for statement in self._iter_camt_statements(data_file, ns):
             statement_vals = {}
             statement_vals['name'] = statement.xpath('ns:Id/text()', namespaces=ns)[0]
             statement_vals['date'] = _get_statement_date(statement, namespaces=ns)
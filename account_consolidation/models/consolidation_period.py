@@ -597,7 +597,9 @@ class ConsolidationCompanyPeriod(models.Model):
 
     def get_journal_lines_values(self):
         """
-        Get all the journal line values in order to create them.
+        Get all the journal line values in order to create them. The move lines of all the consolidation accounts are
+        summed with one grouped query for the accounts not using the historical currency mode, and one for the ones
+        using it.
         :return: a list of dict containing values for journal lines creation
         :rtype: list
         """
@@ -605,12 +607,12 @@ class ConsolidationCompanyPeriod(models.Model):
         journal_lines_values = []
         historical_account_ids = self.period_id.chart_id.account_ids.filtered(lambda x: x.currency_mode == 'hist')
         non_hist_account_ids = self.period_id.chart_id.account_ids - historical_account_ids
-        for consolidation_account in historical_account_ids:
-            journal_lines_values += self._get_historical_journal_lines_values(consolidation_account)
+        if historical_account_ids:
+            journal_lines_values += self._get_historical_journal_lines_values(historical_account_ids)
 
+        totals = self._get_total_balances_and_audit_lines(non_hist_account_ids)
         for consolidation_account in non_hist_account_ids:
-            # Maybe there is a better way to group all move line ids and total balance by consolidation account
-            currency_amount, move_lines_ids = self._get_total_balance_and_audit_lines(consolidation_account)
+            currency_amount, move_lines_ids = totals[consolidation_account.id]
             amount = self._apply_rates(currency_amount, consolidation_account)
             journal_lines_values.append({
                 "account_id": consolidation_account.id,
@@ -630,9 +632,50 @@ class ConsolidationCompanyPeriod(models.Model):
         :rtype: tuple
         """
         self.ensure_one()
-        domain = self._get_move_lines_domain(consolidation_account)
-        res = self.env['account.move.line'].read_group(domain, ['balance:sum', 'id:array_agg'], [])
-        return res[0]['balance'] or 0.0, res[0]['id'] or []
+        return self._get_total_balances_and_audit_lines(consolidation_account)[consolidation_account.id]
+
+    def _get_total_balances_and_audit_lines(self, consolidation_accounts):
+        """
+        Get the total balance and the move lines "linked" to this company for each of the given consolidation accounts.
+        :param consolidation_accounts: the consolidation accounts
+        :return: a dict {consolidation account id: (total balance, move line ids)}
+        :rtype: dict
+        """
+        self.ensure_one()
+        totals = {consolidation_account.id: (0.0, []) for consolidation_account in consolidation_accounts}
+        for consolidation_account_id, _date, balance, move_line_ids in self._get_move_lines_groups(consolidation_accounts):
+            total_balance, total_move_line_ids = totals[consolidation_account_id]
+            totals[consolidation_account_id] = (total_balance + balance, total_move_line_ids + move_line_ids)
+        return totals
+
+    def _get_move_lines_groups(self, consolidation_accounts, group_by_date=False):
+        """
+        Sum the move lines "linked" to this company period and the given consolidation accounts in one grouped query.
+        :param consolidation_accounts: the consolidation accounts
+        :param group_by_date: whether the move lines are also grouped by date
+        :return: a list of tuples (consolidation account id, date or None, total balance, move line ids)
+        :rtype: list
+        """
+        self.ensure_one()
+        if not consolidation_accounts:
+            return []
+        self.env['account.move.line'].flush()
+        query = self.env['account.move.line']._search(self._get_move_lines_domain(consolidation_accounts))
+        from_clause, where_clause, where_params = query.get_sql()
+        # an account can be mapped to several consolidation accounts of the chart, each one gets its move lines
+        self._cr.execute(f"""
+            SELECT rel.consolidation_account_id,
+                   {'"account_move_line"."date"' if group_by_date else 'NULL::date'},
+                   SUM("account_move_line"."balance"),
+                   ARRAY_AGG("account_move_line"."id" ORDER BY "account_move_line"."id")
+              FROM {from_clause}
+              JOIN account_account_consolidation_account_rel rel
+                ON rel.account_account_id = "account_move_line"."account_id"
+             WHERE {where_clause}
+               AND rel.consolidation_account_id IN %s
+          GROUP BY 1, 2
+        """, list(where_params) + [tuple(consolidation_accounts.ids)])
+        return [(account_id, date, balance or 0.0, ids) for account_id, date, balance, ids in self._cr.fetchall()]
 
     def _apply_rates(self, amount, consolidation_account):
         """
@@ -661,41 +704,55 @@ class ConsolidationCompanyPeriod(models.Model):
         :rtype: float
         """
         self.ensure_one()
-        rate = self.env['consolidation.rate'].get_rate_for(move_line.date, self.company_id.id,
-                                                                         self.chart_id.id)
-        if rate:
-            amount = move_line.balance * rate
-        else:
-            amount = move_line.balance
-            currency = move_line.company_currency_id
-            if currency != self.currency_chart_id:
-                amount = currency._convert(amount, self.currency_chart_id, self.company_id, move_line.date)
-        return self._apply_consolidation_rate(amount)
+        rate = self._get_historical_rates([move_line.date])[move_line.date]
+        return self._apply_consolidation_rate(move_line.balance * rate)
 
-    def _get_historical_journal_lines_values(self, consolidation_account):
+    def _get_historical_rates(self, dates):
         """
-        Get all the journal line values for a given consolidation account when using historical currency mode.
-        :param consolidation_account: the consolidation account
-        :return: a list of dict containing values for journal lines creation
-        :rtype: list
+        Get the historical rates of this company period at the given dates, in bulk. The historical rate of a date is
+        the consolidation rate defined for it, or else the currency rate between the company currency and the chart
+        currency at this date.
+        :param dates: the dates
+        :return: a dict {date: rate} giving the amount in chart currency of 1 unit of company currency
+        :rtype: dict
         """
         self.ensure_one()
-        domain = self._get_move_lines_domain(consolidation_account)
-        move_lines = self.env['account.move.line'].search(domain)
-        return [{"account_id": consolidation_account.id,
-                 "currency_amount": move_line.balance,
-                 "amount": self._apply_historical_rates(move_line),
-                 'move_line_ids': [(6, 0, [move_line.id])]} for move_line in move_lines]
+        rates = self.env['consolidation.rate'].get_rates_for(dates, self.company_id.id, self.chart_id.id)
+        for date, rate in rates.items():
+            if not rate:
+                if self.currency_company_id == self.currency_chart_id:
+                    rates[date] = 1.0
+                else:
+                    rates[date] = self.env['res.currency']._get_conversion_rate(
+                        self.currency_company_id, self.currency_chart_id, self.company_id, date)
+        return rates
 
-    def _get_move_lines_domain(self, consolidation_account):
+    def _get_historical_journal_lines_values(self, consolidation_accounts):
         """
-        Get the domain definition to get all the move lines "linked" to this company period and a given consolidation
-        account. That means all the move lines that :
+        Get all the journal line values for the given consolidation accounts when using historical currency mode. The
+        move lines are summed per consolidation account and date, as they share the same historical rate.
+        :param consolidation_accounts: the consolidation accounts
+        :return: a list of dict containing values for journal lines creation
+        :rtype: list
+        """
+        self.ensure_one()
+        groups = self._get_move_lines_groups(consolidation_accounts, group_by_date=True)
+        rates = self._get_historical_rates({date for _account_id, date, _balance, _ids in groups})
+        return [{"account_id": consolidation_account_id,
+                 "currency_amount": balance,
+                 "amount": self._apply_consolidation_rate(balance * rates[date]),
+                 'move_line_ids': [(6, 0, move_line_ids)]}
+                for consolidation_account_id, date, balance, move_line_ids in sorted(groups, key=lambda group: group[:2])]
+
+    def _get_move_lines_domain(self, consolidation_accounts):
+        """
+        Get the domain definition to get all the move lines "linked" to this company period and the given consolidation
+        accounts. That means all the move lines that :
         - are in the right company,
         - are not in excluded journals,
-        - are linked to a account.account which is mapped in the given consolidation account
+        - are linked to a account.account which is mapped in one of the given consolidation accounts
         - have a date contained in the company period start and company period end.
-        :param consolidation_account: the consolidation account
+        :param consolidation_accounts: the consolidation accounts
         :return: a domain definition to be use in search ORM method.
         """
         self.ensure_one()
@@ -703,7 +760,7 @@ class ConsolidationCompanyPeriod(models.Model):
             ('move_id.state', '=', 'posted'),
             ('company_id', '=', self.company_id.id),
             ('journal_id', 'not in', self.mapped('exclude_journal_ids.id')),
-            ('account_id.consolidation_account_ids', '=', consolidation_account.id),
+            ('account_id.consolidation_account_ids', 'in', consolidation_accounts.ids),
             ('date', '<=', self.date_company_end),
             '|',
             ('date', '>=', self.date_company_begin),
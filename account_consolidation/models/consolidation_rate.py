@@ -34,3 +34,32 @@ class ConsolidationRate(models.Model):
             domain.append(('chart_id', '=', chart_id))
         res = self.search_read(domain, ['rate'], limit=1, order='date_end desc')
         return res[0]['rate'] if len(res) > 0 else False
+
+    def get_rates_for(self, dates, company_id=False, chart_id=False):
+        """
+        Get the potential rates for a given company and a given chart at the given dates, in one search.
+        :param dates: the dates
+        :param company_id: the company on which these rates should be applied
+        :type company_id: int
+        :param chart_id: the consolidation chart on which these rates should be applied
+        :type chart_id: int
+        :return: a dict {date: the found rate or False}, see `get_rate_for`
+        :rtype: dict
+        """
+        rates = dict.fromkeys(dates, False)
+        if not rates:
+            return rates
+        domain = [
+            ('date_start', '<=', max(rates)),
+            ('date_end', '>=', min(rates)),
+        ]
+        if company_id:
+            domain.append(('company_id', '=', company_id))
+        if chart_id:
+            domain.append(('chart_id', '=', chart_id))
+        # the rates ending last have the priority, as in `get_rate_for`
+        for res in self.search_read(domain, ['rate', 'date_start', 'date_end'], order='date_end desc'):
+            for date, rate in rates.items():
+                if rate is False and res['date_start'] <= date <= res['date_end']:
+                    rates[date] = res['rate']
+        return rates
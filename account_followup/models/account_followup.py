@@ -44,6 +44,23 @@ Best Regards,
         ('uniq_name', 'unique(company_id, name)', 'A follow-up action name must be unique. This name is already set to another action.'),
     ]
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        self.env['account_followup.partner.status']._invalidate_companies(lines.company_id.ids)
+        return lines
+
+    def write(self, vals):
+        companies = self.company_id
+        res = super().write(vals)
+        if {'delay', 'company_id'} & vals.keys():
+            self.env['account_followup.partner.status']._invalidate_companies((companies | self.company_id).ids)
+        return res
+
+    def unlink(self):
+        self.env['account_followup.partner.status']._invalidate_companies(self.company_id.ids)
+        return super().unlink()
+
     def copy_data(self, default=None):
         default = dict(default or {})
         if not default or 'delay' not in default:
@@ -111,3 +128,43 @@ class AccountMoveLine(models.Model):
 
     followup_line_id = fields.Many2one('account_followup.followup.line', 'Follow-up Level', copy=False)
     followup_date = fields.Date('Latest Follow-up', index=True, copy=False)
+
+    def write(self, vals):
+        # The follow-up states of the partners depend on their open lines, see `account_followup.partner.status`.
+        # Only the posted lines are followed up, the other ones are handled when their entry is posted.
+        impacted = {'blocked', 'followup_line_id', 'date_maturity', 'partner_id', 'account_id'} & vals.keys()
+        partners = self.filtered(lambda line: line.parent_state == 'posted').partner_id if impacted else self.env['res.partner']
+        res = super().write(vals)
+        if impacted:
+            partners |= self.filtered(lambda line: line.parent_state == 'posted').partner_id
+            self.env['account_followup.partner.status']._invalidate_partners(partners.ids)
+        return res
+
+
+class AccountMove(models.Model):
+    _inherit = 'account.move'
+
+    def write(self, vals):
+        # Only the entries leaving or reaching the posted state change the follow-up states of their partners
+        posted = self.filtered(lambda move: move.state == 'posted') if 'state' in vals else self.env['account.move']
+        res = super().write(vals)
+        if 'state' in vals:
+            posted |= self.filtered(lambda move: move.state == 'posted')
+            self.env['account_followup.partner.status']._invalidate_partners(posted.line_ids.partner_id.ids)
+        return res
+
+
+class AccountPartialReconcile(models.Model):
+    _inherit = 'account.partial.reconcile'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        partials = super().create(vals_list)
+        self.env['account_followup.partner.status']._invalidate_partners(
+            (partials.debit_move_id.partner_id | partials.credit_move_id.partner_id).ids)
+        return partials
+
+    def unlink(self):
+        self.env['account_followup.partner.status']._invalidate_partners(
+            (self.debit_move_id.partner_id | self.credit_move_id.partner_id).ids)
+        return super().unlink()
@@ -152,6 +152,18 @@ class AccountFollowupReport(models.AbstractModel):
             lines.pop()
         return lines
 
+    @api.model
+    def _prefetch_followup_data(self, partners):
+        """
+        Load the open lines and the unpaid invoices of ``partners`` with a few grouped queries, so that rendering
+        their follow-ups one after the other reads them from the cache instead of querying them partner by partner.
+        """
+        amls = partners.unreconciled_aml_ids
+        amls.move_id.mapped('name')
+        amls.currency_id.mapped('name')
+        partners.unpaid_invoices.message_main_attachment_id.mapped('name')
+        partners.followup_level.mapped('name')
+
     def _get_html_render_values(self, options, report_manager):
         # OVERRIDE
         res = super(AccountFollowupReport, self)._get_html_render_values(options, report_manager)
@@ -359,8 +371,10 @@ class AccountFollowupReport(models.AbstractModel):
         res_ids = records['ids'] if 'ids' in records else records.ids  # records come from either JS or server.action
         action = self.env.ref('account_followup.action_report_followup').report_action(res_ids)
         if action.get('type') == 'ir.actions.report':
-            for partner in self.env['res.partner'].browse(res_ids):
-                partner.message_post(body=_('Follow-up letter printed'))
+            self.env['res.partner'].browse(res_ids)._message_log_batch(
+                bodies=dict.fromkeys(res_ids, _('Follow-up letter printed')),
+                subtype_id=self.env.ref('mail.mt_note').id,
+            )
         return action
 
     def _get_line_info(self, followup_line):
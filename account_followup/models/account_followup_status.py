@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, fields, models
+from odoo.tools import split_every
+
+# Number of partners whose state is computed at once
+REFRESH_BATCH_SIZE = 1000
+# Fields of the partners computed from their follow-up state
+PARTNER_FIELDS = ['total_due', 'total_overdue', 'followup_level', 'followup_status']
+
+
+class FollowupPartnerStatus(models.Model):
+    """ The follow-up state of the partners (level, status and amounts due), materialized per partner and company.
+
+        A state is deleted when a change impacts it (posting, reconciliation, follow-up levels, next action date, ...)
+        and recomputed only when it is read, in place so that concurrent readers of a partner do not conflict. As the status also depends on the current day, each state is valid
+        until the next due date or follow-up delay of the open lines of the partner, or its next action date.
+        The partners without open receivable lines have an empty state, so they are not recomputed on each read.
+    """
+    _name = 'account_followup.partner.status'
+    _description = 'Follow-up Status of a Partner'
+    _log_access = False
+
+    partner_id = fields.Many2one('res.partner', required=True, ondelete='cascade', index=True)
+    company_id = fields.Many2one('res.company', required=True, ondelete='cascade')
+    followup_level = fields.Many2one('account_followup.followup.line', ondelete='set null')
+    followup_status = fields.Selection([
+        ('in_need_of_action', 'In need of action'),
+        ('with_overdue_invoices', 'With overdue invoices'),
+        ('no_action_needed', 'No action needed'),
+    ], help="Empty if the partner has no open receivable line to follow up, see `res.partner._query_followup_level`")
+    total_due = fields.Float()
+    total_overdue = fields.Float()
+    valid_until = fields.Date(help="The state has to be recomputed from this date. Empty if it only changes with the partner's entries.")
+
+    _sql_constraints = [
+        ('partner_company_uniq', 'unique (partner_id, company_id)', "A partner can only have one follow-up state per company."),
+    ]
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS account_followup_partner_status_company_status_idx
+                ON account_followup_partner_status (company_id, followup_status)
+        """)
+
+    # ------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------
+
+    @api.model
+    def _get_states(self, partners):
+        """ :returns: dict {partner_id: {'followup_level', 'followup_status', 'total_due', 'total_overdue'}} for
+            ``partners`` in the company of the environment """
+        today = fields.Date.context_today(self)
+        states = self._read_states(partners.ids)
+        stale_ids = [partner_id for partner_id in partners.ids if partner_id not in states or states[partner_id]['valid_until'] and states[partner_id]['valid_until'] <= today]
+        if stale_ids:
+            self._refresh_partners(stale_ids)
+            states = self._read_states(partners.ids)
+        return states
+
+    @api.model
+    def _search_partner_ids(self, statuses):
+        """ :returns: the ids of the partners having one of ``statuses`` in the company of the environment """
+        self._refresh_stale_partners()
+        self.env.cr.execute("""
+            SELECT partner_id
+              FROM account_followup_partner_status
+             WHERE company_id = %s
+               AND followup_status IN %s
+        """, [self.env.company.id, tuple(statuses)])
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    def _read_states(self, partner_ids):
+        if not partner_ids:
+            return {}
+        self.env.cr.execute("""
+            SELECT partner_id, followup_level, followup_status, total_due, total_overdue, valid_until
+              FROM account_followup_partner_status
+             WHERE company_id = %s
+               AND partner_id IN %s
+        """, [self.env.company.id, tuple(partner_ids)])
+        return {row['partner_id']: row for row in self.env.cr.dictfetchall()}
+
+    # ------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------
+
+    @api.model
+    def _invalidate_partners(self, partner_ids):
+        partner_ids = tuple(set(partner_ids) - {False})
+        if partner_ids:
+            self.env.cr.execute("DELETE FROM account_followup_partner_status WHERE partner_id IN %s", [partner_ids])
+            self.invalidate_cache(list(self._fields))
+            self.env['res.partner'].invalidate_cache(PARTNER_FIELDS, list(partner_ids))
+
+    @api.model
+    def _invalidate_companies(self, company_ids):
+        company_ids = tuple(set(company_ids) - {False})
+        if company_ids:
+            self.env.cr.execute("DELETE FROM account_followup_partner_status WHERE company_id IN %s", [company_ids])
+            self.invalidate_cache(list(self._fields))
+            self.env['res.partner'].invalidate_cache(PARTNER_FIELDS)
+
+    # ------------------------------------------------------------
+    # Computation
+    # ------------------------------------------------------------
+
+    def _get_open_lines_query(self):
+        """ Query of the open receivable lines of the company of the environment, see `res.partner.unreconciled_aml_ids` """
+        return """
+              FROM account_move_line line
+              JOIN account_account account ON account.id = line.account_id
+              JOIN account_move move ON move.id = line.move_id
+             WHERE line.company_id = %(company_id)s
+               AND account.internal_type = 'receivable'
+               AND account.deprecated IS NOT TRUE
+               AND move.state = 'posted'
+               AND line.reconciled IS NOT TRUE
+        """
+
+    @api.model
+    def _refresh_stale_partners(self):
+        """ Recompute the missing and expired states of the company of the environment. """
+        self.env['account.move.line'].flush(['partner_id', 'account_id', 'move_id', 'company_id', 'reconciled'])
+        self.env['account.move'].flush(['state'])
+        self.env.cr.execute("""
+            SELECT DISTINCT line.partner_id
+            {open_lines}
+               AND line.partner_id IS NOT NULL
+               AND NOT EXISTS (
+                       SELECT 1
+                         FROM account_followup_partner_status status
+                        WHERE status.partner_id = line.partner_id
+                          AND status.company_id = %(company_id)s
+                          AND (status.valid_until IS NULL OR status.valid_until > %(today)s)
+                   )
+        """.format(open_lines=self._get_open_lines_query()), {
+            'company_id': self.env.company.id,
+            'today': fields.Date.context_today(self),
+        })
+        partner_ids = [row[0] for row in self.env.cr.fetchall()]
+        for ids in split_every(REFRESH_BATCH_SIZE, partner_ids):
+            self._refresh_partners(list(ids))
+
+    @api.model
+    def _refresh_partners(self, partner_ids):
+        """ Recompute the states of ``partner_ids`` in the company of the environment, from their open lines. """
+        company = self.env.company
+        today = fields.Date.context_today(self)
+        partners = self.env['res.partner'].browse(partner_ids)
+        followup_data = partners._query_followup_level()
+        params = {
+            'company_id': company.id,
+            'partner_ids': tuple(partner_ids),
+            'today': today,
+        }
+
+        open_lines = self._get_open_lines_query()
+        self.env.cr.execute("""
+            SELECT line.partner_id,
+                   COALESCE(SUM(line.amount_residual), 0),
+                   COALESCE(SUM(line.amount_residual) FILTER (
+                       WHERE line.blocked IS NOT TRUE AND COALESCE(line.date_maturity, line.date) < %(today)s
+                   ), 0)
+            {open_lines}
+               AND line.partner_id IN %(partner_ids)s
+          GROUP BY line.partner_id
+        """.format(open_lines=open_lines), params)
+        totals = {partner_id: (total_due, total_overdue) for partner_id, total_due, total_overdue in self.env.cr.fetchall()}
+
+        # the status changes when a line becomes overdue or reaches the delay of a follow-up level
+        self.env.cr.execute("SELECT delay FROM account_followup_followup_line WHERE company_id = %s", [company.id])
+        params['delays'] = [0, 1] + [row[0] for row in self.env.cr.fetchall()]
+        self.env.cr.execute("""
+            SELECT line.partner_id, MIN(COALESCE(line.date_maturity, line.date) + delay)
+            {open_lines}
+               AND line.partner_id IN %(partner_ids)s
+               AND line.blocked IS NOT TRUE
+               AND COALESCE(line.date_maturity, line.date) + delay > %(today)s
+          GROUP BY line.partner_id
+        """.format(open_lines=open_lines.replace(
+            'FROM account_move_line line', 'FROM account_move_line line, unnest(%(delays)s::integer[]) delay',
+        )), params)
+        valid_until = dict(self.env.cr.fetchall())
+        # as well as when the next action date is reached
+        for partner in partners.with_company(company):
+            next_action_date = partner.payment_next_action_date
+            if next_action_date and next_action_date > today:
+                valid_until[partner.id] = min(valid_until.get(partner.id, next_action_date), next_action_date)
+
+        # upsert the states in a stable order, so that concurrent refreshes of the same partners wait on each other
+        values_list = [
+            (partner_id, company.id,
+             followup_data.get(partner_id, {}).get('followup_level'),
+             followup_data.get(partner_id, {}).get('followup_status'),
+             *totals.get(partner_id, (0.0, 0.0)), valid_until.get(partner_id))
+            for partner_id in sorted(set(partner_ids))
+        ]
+        if values_list:
+            self.env.cr.execute("""
+                INSERT INTO account_followup_partner_status
+                    (partner_id, company_id, followup_level, followup_status, total_due, total_overdue, valid_until)
+                VALUES %s
+                ON CONFLICT (partner_id, company_id) DO UPDATE
+                   SET followup_level = EXCLUDED.followup_level,
+                       followup_status = EXCLUDED.followup_status,
+                       total_due = EXCLUDED.total_due,
+                       total_overdue = EXCLUDED.total_overdue,
+                       valid_until = EXCLUDED.valid_until
+            """ % ', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(values_list)), [value for row in values_list for value in row])
+        self.invalidate_cache(list(self._fields))
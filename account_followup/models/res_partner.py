@@ -2,15 +2,20 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 import logging
+import threading
+from collections import defaultdict
 from odoo import api, fields, models, _
 from odoo.tools.misc import format_date
 from odoo.osv import expression
 from datetime import date, datetime, timedelta
-from odoo.tools import DEFAULT_SERVER_DATE_FORMAT
+from odoo.tools import DEFAULT_SERVER_DATE_FORMAT, split_every
 from odoo.exceptions import UserError
 
 _logger = logging.getLogger(__name__)
 
+# Number of partners followed up between two commits of the cron
+FOLLOWUP_BATCH_SIZE = 100
+
 class ResPartner(models.Model):
     _name = 'res.partner'
     _inherit = 'res.partner'
@@ -35,6 +40,12 @@ class ResPartner(models.Model):
                                              help="Optionally you can assign a user to this field, which will make him responsible for the action.",
                                              tracking=True, copy=False, company_dependent=True)
 
+    def write(self, vals):
+        res = super().write(vals)
+        if 'payment_next_action_date' in vals:
+            self.env['account_followup.partner.status']._invalidate_partners(self.ids)
+        return res
+
     def _search_status(self, operator, value):
         """
         Compute the search on the field 'followup_status'
@@ -44,45 +55,35 @@ class ResPartner(models.Model):
         value = [v for v in value if v in ['in_need_of_action', 'with_overdue_invoices', 'no_action_needed']]
         if operator not in ('in', '=') or not value:
             return []
-        followup_data = self._query_followup_level(all_partners=True)
-        return [('id', 'in', [d['partner_id'] for d in followup_data.values() if d['followup_status'] in value])]
+        return [('id', 'in', self.env['account_followup.partner.status']._search_partner_ids(value))]
 
     def _compute_for_followup(self):
         """
         Compute the fields 'total_due', 'total_overdue','followup_level' and 'followup_status'
+        from the follow-up states of the partners, see `account_followup.partner.status`
         """
         first_followup_level = self.env['account_followup.followup.line'].search([('company_id', '=', self.env.company.id)], order="delay asc", limit=1)
-        followup_data = self._query_followup_level()
-        today = fields.Date.context_today(self)
+        states = self.env['account_followup.partner.status']._get_states(self._origin)
         for record in self:
-            total_due = 0
-            total_overdue = 0
-            followup_status = "no_action_needed"
-            for aml in record.unreconciled_aml_ids:
-                if aml.company_id == self.env.company:
-                    amount = aml.amount_residual
-                    total_due += amount
-                    is_overdue = today > aml.date_maturity if aml.date_maturity else today > aml.date
-                    if is_overdue and not aml.blocked:
-                        total_overdue += amount
-            record.total_due = total_due
-            record.total_overdue = total_overdue
-            if record.id in followup_data:
-                record.followup_status = followup_data[record.id]['followup_status']
-                record.followup_level = self.env['account_followup.followup.line'].browse(followup_data[record.id]['followup_level']) or first_followup_level
-            else:
-                record.followup_status = 'no_action_needed'
-                record.followup_level = first_followup_level
+            state = states.get(record._origin.id) or {}
+            record.total_due = state.get('total_due', 0.0)
+            record.total_overdue = state.get('total_overdue', 0.0)
+            record.followup_status = state.get('followup_status') or 'no_action_needed'
+            record.followup_level = self.env['account_followup.followup.line'].browse(state.get('followup_level')) or first_followup_level
 
     def _compute_unpaid_invoices(self):
+        unpaid_invoices = self.env['account.move'].search([
+            ('company_id', '=', self.env.company.id),
+            ('commercial_partner_id', 'in', self._origin.ids),
+            ('state', '=', 'posted'),
+            ('payment_state', 'in', ('not_paid', 'partial')),
+            ('move_type', 'in', self.env['account.move'].get_sale_types())
+        ]).filtered(lambda inv: not any(inv.line_ids.mapped('blocked')))
+        invoices_per_partner = defaultdict(lambda: self.env['account.move'])
+        for invoice in unpaid_invoices:
+            invoices_per_partner[invoice.commercial_partner_id.id] |= invoice
         for record in self:
-            record.unpaid_invoices = self.env['account.move'].search([
-                ('company_id', '=', self.env.company.id),
-                ('commercial_partner_id', '=', record.id),
-                ('state', '=', 'posted'),
-                ('payment_state', 'in', ('not_paid', 'partial')),
-                ('move_type', 'in', self.env['account.move'].get_sale_types())
-            ]).filtered(lambda inv: not any(inv.line_ids.mapped('blocked')))
+            record.unpaid_invoices = invoices_per_partner[record._origin.id]
 
     def get_next_action(self, followup_line):
         """
@@ -131,11 +132,16 @@ class ResPartner(models.Model):
         """
         Send a follow-up report by email to customers in self
         """
-        for record in self:
+        partners = self
+        if len(partners) > 1:
+            # the emails are queued and sent by the mail queue instead of one after the other
+            partners = partners.with_context(mail_notify_force_send=False)
+            partners.env['account.followup.report']._prefetch_followup_data(partners)
+        for record in partners:
             options = {
                 'partner_id': record.id,
             }
-            self.env['account.followup.report'].send_email(options)
+            partners.env['account.followup.report'].send_email(options)
 
     def get_followup_html(self):
         """
@@ -300,8 +306,12 @@ class ResPartner(models.Model):
         """
         Execute the actions to do with followups.
         """
+        partners = self
+        if len(partners) > 1:
+            partners = partners.with_context(mail_notify_force_send=False)
+            partners.env['account.followup.report']._prefetch_followup_data(partners)
         to_print = self.env['res.partner']
-        for partner in self:
+        for partner in partners:
             partner_tmp = partner._execute_followup_partner()
             if partner_tmp:
                 to_print += partner_tmp
@@ -310,13 +320,19 @@ class ResPartner(models.Model):
         return self.env['account.followup.report'].print_followups(to_print)
 
     def _cron_execute_followup(self):
-        followup_data = self._query_followup_level(all_partners=True)
-        in_need_of_action = self.env['res.partner'].browse([d['partner_id'] for d in followup_data.values() if d['followup_status'] == 'in_need_of_action'])
-        in_need_of_action_auto = in_need_of_action.filtered(lambda p: p.followup_level.auto_execute)
-        for partner in in_need_of_action_auto:
-            try:
-                partner._execute_followup_partner()
-            except UserError as e:
-                # followup may raise exception due to configuration issues
-                # i.e. partner missing email
-                _logger.exception(e)
+        """ Execute the automatic follow-ups of the partners in need of action, committing after each batch. """
+        auto_commit = not getattr(threading.currentThread(), 'testing', False)
+        partner_ids = self.env['account_followup.partner.status']._search_partner_ids(['in_need_of_action'])
+        for ids in split_every(FOLLOWUP_BATCH_SIZE, partner_ids):
+            partners = self.env['res.partner'].browse(ids).with_context(mail_notify_force_send=False)
+            self.env['account.followup.report']._prefetch_followup_data(partners)
+            for partner in partners.filtered(lambda p: p.followup_level.auto_execute):
+                try:
+                    partner._execute_followup_partner()
+                except UserError as e:
+                    # followup may raise exception due to configuration issues
+                    # i.e. partner missing email
+                    _logger.exception(e)
+            if auto_commit:
+                self.env.cr.commit()
+            partners.invalidate_cache()
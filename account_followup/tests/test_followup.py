@@ -203,3 +203,105 @@ class TestAccountFollowupReports(TestAccountReportsCommon):
 
         with freeze_time('2016-01-20'):
             self.assertPartnerFollowup(self.partner_a, 'with_overdue_invoices', self.second_followup_level)
+
+    def test_followup_status(self):
+        ''' Test the follow-up states of the partners are kept up to date with the entries and the current day. '''
+        invoice = self.env['account.move'].create({
+            'move_type': 'out_invoice',
+            'invoice_date': '2016-01-01',
+            'partner_id': self.partner_a.id,
+            'invoice_line_ids': [(0, 0, {'quantity': 1, 'price_unit': 500})]
+        })
+        invoice.action_post()
+
+        with freeze_time('2016-01-05'):
+            self.partner_a.invalidate_cache()
+            self.assertRecordValues(self.partner_a, [{
+                'total_due': 500.0,
+                'total_overdue': 500.0,
+                'followup_status': 'with_overdue_invoices',
+            }])
+            self.assertEqual(
+                self.env['res.partner'].search([('followup_status', '=', 'in_need_of_action')]) & self.partner_a,
+                self.env['res.partner'],
+            )
+
+        # The state expires when the first follow-up level is reached.
+        with freeze_time('2016-01-11'):
+            self.partner_a.invalidate_cache()
+            self.assertRecordValues(self.partner_a, [{
+                'followup_status': 'in_need_of_action',
+                'followup_level': self.first_followup_level.id,
+            }])
+            self.assertEqual(
+                self.env['res.partner'].search([('followup_status', '=', 'in_need_of_action')]) & self.partner_a,
+                self.partner_a,
+            )
+
+            # The state is invalidated by the reconciliation of the invoice.
+            self.env['account.payment.register']\
+                .with_context(active_model='account.move', active_ids=invoice.ids)\
+                .create({'payment_date': '2016-01-11'})\
+                ._create_payments()
+            self.partner_a.invalidate_cache()
+            self.assertRecordValues(self.partner_a, [{
+                'total_due': 0.0,
+                'total_overdue': 0.0,
+                'followup_status': 'no_action_needed',
+            }])
+
+            # The draft entries do not impact the state, contrary to their posting.
+            Status = self.env['account_followup.partner.status']
+            draft_invoice = self.env['account.move'].create({
+                'move_type': 'out_invoice',
+                'invoice_date': '2016-01-01',
+                'partner_id': self.partner_a.id,
+                'invoice_line_ids': [(0, 0, {'quantity': 1, 'price_unit': 200})]
+            })
+            draft_invoice.invoice_line_ids.price_unit = 300
+            self.assertIn(self.partner_a.id, Status._read_states(self.partner_a.ids))
+            draft_invoice.action_post()
+            self.assertNotIn(self.partner_a.id, Status._read_states(self.partner_a.ids))
+            self.partner_a.invalidate_cache()
+            self.assertRecordValues(self.partner_a, [{
+                'total_due': 300.0,
+                'total_overdue': 300.0,
+            }])
+
+    def test_unpaid_invoices_batch(self):
+        ''' Test the unpaid invoices of several partners are computed together. '''
+        invoices = self.env['account.move'].create([{
+            'move_type': 'out_invoice',
+            'invoice_date': '2016-01-01',
+            'partner_id': partner.id,
+            'invoice_line_ids': [(0, 0, {'quantity': 1, 'price_unit': 500})]
+        } for partner in self.partner_a + self.partner_b + self.partner_b])
+        invoices.action_post()
+        invoices[2].line_ids.filtered(lambda line: line.account_id.internal_type == 'receivable').blocked = True
+
+        partners = self.partner_a + self.partner_b
+        partners.invalidate_cache(['unpaid_invoices'])
+        self.assertEqual(self.partner_a.unpaid_invoices, invoices[0])
+        self.assertEqual(self.partner_b.unpaid_invoices, invoices[1])
+
+    def test_prefetch_followup_data(self):
+        ''' Test the follow-up data of several partners is loaded at once and kept when one of them is followed up. '''
+        invoices = self.env['account.move'].create([{
+            'move_type': 'out_invoice',
+            'invoice_date': '2016-01-01',
+            'partner_id': partner.id,
+            'invoice_line_ids': [(0, 0, {'quantity': 1, 'price_unit': 500})]
+        } for partner in self.partner_a + self.partner_b])
+        invoices.action_post()
+
+        partners = self.partner_a + self.partner_b
+        partners.invalidate_cache()
+        self.env['account.followup.report']._prefetch_followup_data(partners)
+        # the follow-up of a partner only invalidates its own state
+        self.partner_a.payment_next_action_date = '2016-02-01'
+
+        with self.assertQueryCount(0):
+            self.partner_b.unreconciled_aml_ids.move_id.mapped('name')
+            self.partner_b.unreconciled_aml_ids.currency_id.mapped('name')
+            self.partner_b.unpaid_invoices.mapped('name')
+            self.partner_b.followup_level.mapped('name')
@@ -1,3 +1,4 @@
 # -*- encoding: utf-8 -*-
 
+from . import account_bill_predict_history
 from . import account_invoice
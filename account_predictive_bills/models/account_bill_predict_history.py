@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, fields, models
+
+# Text search configurations used for the predictions, see `_get_predict_postgres_dictionary`
+PREDICT_DICTIONARIES = ('english', 'french')
+
+
+class AccountBillPredictHistory(models.Model):
+    """ The posted vendor bill lines used to predict the product, account and taxes of the new lines.
+
+    The lines are copied here when their bill is posted and removed when it is reset to draft or
+    cancelled. The ranked documents (description and partner) are indexed with a GIN index per text
+    search configuration, so a prediction only reads the lines matching the description instead of
+    building the documents of the whole history.
+    """
+    _name = 'account.bill.predict.history'
+    _description = 'Vendor Bill Prediction History'
+    _log_access = False
+
+    move_line_id = fields.Many2one('account.move.line', required=True, ondelete='cascade')
+    move_id = fields.Many2one('account.move', required=True, ondelete='cascade', index=True)
+    company_id = fields.Many2one('res.company', required=True, ondelete='cascade')
+    partner_id = fields.Many2one('res.partner', ondelete='cascade')
+    invoice_date = fields.Date()
+    name = fields.Char()
+    product_id = fields.Many2one('product.product', ondelete='set null')
+    account_id = fields.Many2one('account.account', ondelete='cascade')
+    tax_ids = fields.Many2many('account.tax', 'account_bill_predict_history_tax_rel', 'history_id', 'tax_id')
+
+    _sql_constraints = [
+        ('move_line_uniq', 'unique (move_line_id)', "A move line can only be once in the history."),
+    ]
+
+    def init(self):
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS account_bill_predict_history_company_date_idx
+                ON account_bill_predict_history (company_id, invoice_date DESC)
+        """)
+        for dictionary in PREDICT_DICTIONARIES:
+            self._cr.execute("""
+                CREATE INDEX IF NOT EXISTS account_bill_predict_history_%s_idx
+                    ON account_bill_predict_history USING gin ((%s))
+            """ % (dictionary, self._get_document_sql(dictionary)))
+        self._cr.execute("SELECT 1 FROM account_bill_predict_history LIMIT 1")
+        if not self._cr.fetchone():
+            self._insert_moves_lines()
+
+    @api.model
+    def _get_document_sql(self, dictionary):
+        """ The document ranked for the predictions, with some more weight to the partner. """
+        assert dictionary in PREDICT_DICTIONARIES
+        return """
+            setweight(to_tsvector('%s'::regconfig, name), 'B')
+            || setweight(to_tsvector('simple'::regconfig, 'partnerid' || replace(partner_id::text, '-', 'x')), 'A')
+        """ % dictionary
+
+    @api.model
+    def _insert_moves_lines(self, move_ids=None):
+        """ Adds the lines of the posted vendor bills ``move_ids`` (all of them if not given). """
+        self._cr.execute("""
+            WITH history AS (
+                INSERT INTO account_bill_predict_history
+                    (move_line_id, move_id, company_id, partner_id, invoice_date, name, product_id, account_id)
+                SELECT line.id, move.id, line.company_id, line.partner_id, move.invoice_date, line.name,
+                       line.product_id, line.account_id
+                  FROM account_move_line line
+                  JOIN account_move move ON move.id = line.move_id
+                 WHERE move.move_type = 'in_invoice'
+                   AND move.state = 'posted'
+                   AND line.display_type IS NULL
+                   AND line.exclude_from_invoice_tab IS NOT TRUE
+                   AND (%s IS NULL OR move.id = ANY(%s))
+                ON CONFLICT DO NOTHING
+             RETURNING id, move_line_id
+            )
+            INSERT INTO account_bill_predict_history_tax_rel (history_id, tax_id)
+            SELECT history.id, rel.account_tax_id
+              FROM history
+              JOIN account_move_line_account_tax_rel rel ON rel.account_move_line_id = history.move_line_id
+        """, [move_ids and list(move_ids), move_ids and list(move_ids)])
+        self.invalidate_cache(list(self._fields))
+
+    @api.model
+    def _update_moves(self, moves):
+        """ Synchronizes the history with the lines of ``moves`` after they are created, posted, reset or edited. """
+        moves = moves.filtered(lambda move: move.move_type == 'in_invoice')
+        if not moves:
+            return
+        self.env['account.move.line'].flush(['name', 'partner_id', 'product_id', 'account_id', 'tax_ids', 'display_type', 'exclude_from_invoice_tab'])
+        moves.flush(['state', 'move_type', 'invoice_date'])
+        self._cr.execute("DELETE FROM account_bill_predict_history WHERE move_id IN %s", [tuple(moves.ids)])
+        self.invalidate_cache(list(self._fields))
+        posted_moves = moves.filtered(lambda move: move.state == 'posted')
+        if posted_moves:
+            self._insert_moves_lines(posted_moves.ids)
+
+    @api.model
+    def _predict(self, description, company, dictionary, limit):
+        """ Ranks the history against ``description`` (a tsquery with the words of the line's
+        label and its partner), in one query.
+
+        Only the ``limit`` most recent lines of the company are considered.
+
+        :return: dict with the best 'product_id', 'account_id' and 'tax_ids' (None if nothing matched)
+        """
+        self._cr.execute("""
+            SELECT invoice_date
+              FROM account_bill_predict_history
+             WHERE company_id = %s
+          ORDER BY invoice_date DESC
+            OFFSET %s
+             LIMIT 1
+        """, [company.id, max(limit - 1, 0)])
+        row = self._cr.fetchone()
+        date_from = row and row[0]
+
+        document = self._get_document_sql(dictionary)
+        self._cr.execute(f"""
+            WITH matching AS (
+                SELECT history.product_id, history.account_id,
+                       ARRAY(
+                           SELECT rel.tax_id
+                             FROM account_bill_predict_history_tax_rel rel
+                            WHERE rel.history_id = history.id
+                         ORDER BY rel.tax_id
+                       ) AS tax_ids,
+                       (SELECT deprecated IS TRUE FROM account_account WHERE id = history.account_id) AS deprecated,
+                       ts_rank({document}, query_plain) AS rank
+                  FROM account_bill_predict_history history,
+                       to_tsquery(%(lang)s, %(description)s) query_plain
+                 WHERE history.company_id = %(company_id)s
+                   AND (%(date_from)s IS NULL OR history.invoice_date >= %(date_from)s)
+                   AND ({document}) @@ query_plain
+            ),
+
+            -- the expense accounts are used as starting values for the account prediction
+            matching_accounts AS (
+                SELECT account_id, rank
+                  FROM matching
+                 WHERE NOT deprecated
+             UNION ALL
+                SELECT account.id, ts_rank(setweight(to_tsvector(%(lang)s, account.name), 'B'), query_plain)
+                  FROM account_account account,
+                       to_tsquery(%(lang)s, %(description)s) query_plain
+                 WHERE account.deprecated IS NOT TRUE
+                   AND account.user_type_id IN (
+                           SELECT id
+                             FROM account_account_type
+                            WHERE internal_group = 'expense'
+                       )
+                   AND account.company_id = %(company_id)s
+                   AND setweight(to_tsvector(%(lang)s, account.name), 'B') @@ query_plain
+            )
+
+            SELECT 'product_id', ARRAY[product_id], MAX(rank) AS ranking, COUNT(*) AS count
+              FROM matching
+          GROUP BY product_id
+         UNION ALL
+            SELECT 'account_id', ARRAY[account_id], MAX(rank), COUNT(*)
+              FROM matching_accounts
+          GROUP BY account_id
+         UNION ALL
+            SELECT 'tax_ids', tax_ids, MAX(rank), COUNT(*)
+              FROM matching
+          GROUP BY tax_ids
+          ORDER BY ranking DESC, count DESC
+        """, {
+            'lang': dictionary,
+            'description': description,
+            'company_id': company.id,
+            'date_from': date_from,
+        })
+        predictions = {}
+        for field, prediction, _ranking, _count in self._cr.fetchall():
+            predictions.setdefault(field, prediction)
+        return {
+            'product_id': predictions.get('product_id', [None])[0],
+            'account_id': predictions.get('account_id', [None])[0],
+            'tax_ids': predictions.get('tax_ids'),
+        }
@@ -19,9 +19,12 @@ class AccountMove(models.Model):
             to_predict_lines = self.invoice_line_ids.filtered(lambda line: line.predict_from_name)
             to_predict_lines.predict_from_name = False
             for line in to_predict_lines:
+                # The product, account and taxes are predicted at once
+                predictions = line._get_predictions()
+
                 # Predict product.
                 if not line.product_id:
-                    predicted_product_id = line._predict_product()
+                    predicted_product_id = predictions.get('product_id')
                     if predicted_product_id and predicted_product_id != line.product_id.id:
                         line.product_id = predicted_product_id
                         line._onchange_product_id()
@@ -31,22 +34,36 @@ class AccountMove(models.Model):
                 # Product may or may not have been set above, if it has been set, account and taxes are set too
                 if not line.product_id:
                     # Predict account.
-                    predicted_account_id = line._predict_account()
+                    predicted_account_id = predictions.get('account_id')
                     if predicted_account_id and predicted_account_id != line.account_id.id:
                         line.account_id = predicted_account_id
                         line._onchange_account_id()
                         line.recompute_tax_line = True
 
                     # Predict taxes
-                    predicted_tax_ids = line._predict_taxes()
-                    if predicted_tax_ids == [None]:
-                        predicted_tax_ids = []
+                    predicted_tax_ids = predictions.get('tax_ids', False)
                     if predicted_tax_ids is not False and set(predicted_tax_ids) != set(line.tax_ids.ids):
                         line.tax_ids = self.env['account.tax'].browse(predicted_tax_ids)
                         line.recompute_tax_line = True
 
         return super(AccountMove, self)._onchange_recompute_dynamic_lines()
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        moves = super().create(vals_list)
+        # The bills may be created already posted
+        self.env['account.bill.predict.history']._update_moves(moves.filtered(lambda move: move.state == 'posted'))
+        return moves
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'state' in vals:
+            # Keep the history used by the predictions in sync with the posted bills.
+            self.env['account.bill.predict.history']._update_moves(self)
+        elif 'invoice_date' in vals:
+            self.env['account.bill.predict.history']._update_moves(self.filtered(lambda move: move.state == 'posted'))
+        return res
+
 
 class AccountMoveLine(models.Model):
     _inherit = 'account.move.line'
@@ -54,6 +71,14 @@ class AccountMoveLine(models.Model):
     predict_from_name = fields.Boolean(store=False,
         help="Technical field used to know on which lines the prediction must be done.")
 
+    def write(self, vals):
+        res = super().write(vals)
+        # Keep the history in sync with the lines of the posted bills, see `account.move.write`
+        if {'name', 'partner_id', 'product_id', 'account_id', 'tax_ids', 'display_type', 'exclude_from_invoice_tab'} & vals.keys():
+            self.env['account.bill.predict.history']._update_moves(
+                self.move_id.filtered(lambda move: move.state == 'posted' and move.move_type == 'in_invoice'))
+        return res
+
     def _get_predict_postgres_dictionary(self):
         lang = self._context.get('lang') and self._context.get('lang')[:2]
         return {'fr': 'french'}.get(lang, 'english')
@@ -175,45 +200,61 @@ class AccountMoveLine(models.Model):
             return False
         return False
 
+    def _get_predictions(self):
+        """ Predict the product, the account and the taxes of the line from the posted vendor bills.
+
+        Same ranking as `_predicted_field`, but the three fields are predicted by a single query on
+        `account.bill.predict.history`, whose documents are indexed.
+
+        :return: dict with the predicted 'product_id', 'account_id' and 'tax_ids', empty if there is
+            nothing to predict
+        """
+        if not self.name or not self.partner_id:
+            return {}
+
+        description = self.name + ' partnerid' + str(self.partner_id.id or '').replace('-', 'x')
+        parsed_description = re.sub(r"[*&()|!':<>=%/~@,.;$\[\]]+", " ", description)
+        parsed_description = ' | '.join(parsed_description.split())
+        limit = int(self.env["ir.config_parameter"].sudo().get_param("account.bill.predict.history.limit", '10000'))
+        try:
+            with self.env.cr.savepoint():
+                predictions = self.env['account.bill.predict.history']._predict(
+                    parsed_description,
+                    self.move_id.journal_id.company_id or self.env.company,
+                    self._get_predict_postgres_dictionary(),
+                    limit,
+                )
+        except Exception:
+            # In case there is an error while parsing the to_tsquery (wrong character for example)
+            # We don't want to have a blocking traceback, instead return no prediction
+            _logger.exception('Error while predicting invoice line fields')
+            return {}
+        if predictions['tax_ids'] is None:
+            del predictions['tax_ids']
+        else:
+            predictions['tax_ids'] = self.env['account.tax'].browse(predictions['tax_ids']).filtered('active').ids
+        return predictions
+
     def _predict_taxes(self, description=None):
         if description is not None:
             warnings.warn((
                 "`description` is a deprecated parameter on `_predict_taxes`"
             ), DeprecationWarning)
-        field = 'array_agg(account_move_line__tax_rel__tax_ids.id ORDER BY account_move_line__tax_rel__tax_ids.id)'
-        query = self._build_query()
-        query.left_join('account_move_line', 'id', 'account_move_line_account_tax_rel', 'account_move_line_id', 'tax_rel')
-        query.left_join('account_move_line__tax_rel', 'account_tax_id', 'account_tax', 'id', 'tax_ids')
-        query.add_where('account_move_line__tax_rel__tax_ids.active IS NOT FALSE')
-        return self._predicted_field(field, query)
+        return self._get_predictions().get('tax_ids', False)
 
     def _predict_product(self, description=None):
         if description is not None:
             warnings.warn((
                 "`description` is a deprecated parameter on `_predict_product`"
             ), DeprecationWarning)
-        return self._predicted_field('account_move_line.product_id')
+        return self._get_predictions().get('product_id') or False
 
     def _predict_account(self, description=None, partner=None):
         if description is not None or partner is not None:
             warnings.warn((
                 "`description` and `partner` are deprecated parameters on `_predict_account`"
             ), DeprecationWarning)
-        field = 'account_move_line.account_id'
-        additional_queries = ["""
-                SELECT id as account_id,
-                       setweight(to_tsvector(%(lang)s, name), 'B') AS document
-                  FROM account_account account
-                 WHERE account.deprecated IS NOT TRUE
-                   AND user_type_id IN (
-                           SELECT id
-                             FROM account_account_type
-                            WHERE internal_group = 'expense'
-                       )
-                   AND company_id = %(company_id)s
-        """]
-        query = self._build_query([('account_id.deprecated', '=', False)])
-        return self._predicted_field(field, query, additional_queries)
+        return self._get_predictions().get('account_id') or False
 
     @api.onchange('name')
     def _onchange_enable_predictive(self):
@@ -130,3 +130,59 @@ class TestBillsPrediction(AccountTestInvoicingCommon):
             'price_subtotal': 800.0,
             'balance': 800.0,
         }])
+
+    def test_prediction_history(self):
+        History = self.env['account.bill.predict.history']
+        invoice = self._create_bill(self.test_partners[0], "Maintenance and repair", self.test_accounts[0])
+        history = History.search([('move_id', '=', invoice.id)])
+        self.assertRecordValues(history, [{
+            'move_line_id': invoice.invoice_line_ids.id,
+            'partner_id': self.test_partners[0].id,
+            'name': "Maintenance and repair",
+            'account_id': self.test_accounts[0].id,
+        }])
+
+        # the product, account and taxes are predicted at once
+        line = self.env['account.move.line'].new({
+            'move_id': invoice.id,
+            'name': "Repair",
+            'partner_id': self.test_partners[0].id,
+        })
+        predictions = line._get_predictions()
+        self.assertEqual(predictions['account_id'], self.test_accounts[0].id)
+        self.assertEqual(set(predictions['tax_ids']), set(invoice.invoice_line_ids.tax_ids.ids))
+
+        # the edits of the lines of the posted bills are used
+        invoice.invoice_line_ids.name = "Cleaning"
+        self.assertRecordValues(History.search([('move_id', '=', invoice.id)]), [{
+            'name': "Cleaning",
+            'account_id': self.test_accounts[0].id,
+        }])
+
+        # the draft bills are not used anymore
+        invoice.button_draft()
+        self.assertFalse(History.search([('move_id', '=', invoice.id)]))
+
+    def test_prediction_history_posted_at_creation(self):
+        History = self.env['account.bill.predict.history']
+        tax = self.company_data['default_tax_purchase']
+        bill = self.env['account.move'].with_context(account_predictive_bills_disable_prediction=True).create({
+            'move_type': 'in_invoice',
+            'partner_id': self.test_partners[0].id,
+            'invoice_date': self.frozen_today,
+            'invoice_line_ids': [(0, 0, {
+                'name': "Office rent",
+                'account_id': self.test_accounts[0].id,
+                'quantity': 1.0,
+                'price_unit': 100.0,
+                'tax_ids': [(6, 0, tax.ids)],
+            })],
+            'state': 'posted',
+        })
+        self.assertRecordValues(History.search([('move_id', '=', bill.id)]), [{
+            'move_line_id': bill.invoice_line_ids.id,
+            'name': "Office rent",
+            'account_id': self.test_accounts[0].id,
+            'tax_ids': tax.ids,
+        }])
+
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+from collections import defaultdict
+
 from odoo import models, api, fields
 from odoo.models import MAGIC_COLUMNS
 from odoo.osv import expression
@@ -37,17 +39,36 @@ class DataMergeGroup(models.Model):
 
     @api.depends('record_ids')
     def _compute_similarity(self):
+        # Read the original records of all the groups at once, per model
+        res_ids_per_model = defaultdict(set)
+        for group in self:
+            res_ids_per_model[group.res_model_name].update(group.record_ids.mapped('res_id'))
+
+        read_fields_per_model = {}
+        values_per_model = {}
+        for res_model_name, res_ids in res_ids_per_model.items():
+            if not res_ids:
+                continue
+            model = self.env[res_model_name]
+            read_fields = [name for name, field in model._fields.items() if field.type == 'char']
+            read_fields_per_model[res_model_name] = read_fields
+            values_per_model[res_model_name] = {
+                values['id']: values
+                for values in model.browse(res_ids).read(read_fields)
+            }
+
         for group in self:
-            if not group.record_ids:
+            records = [
+                values_per_model[group.res_model_name][res_id]
+                for res_id in group.record_ids.mapped('res_id')
+                if res_id in values_per_model.get(group.res_model_name, {})
+            ]
+            if not records:
                 group.divergent_fields = ''
                 group.similarity = 1
                 continue
 
-            group_fields = self.env[group.res_model_name]._fields.items()
-            read_fields = [name for name, field in group_fields if field.type == 'char']
-
-            record_ids = group.record_ids.mapped('res_id')
-            records = self.env[group.res_model_name].browse(record_ids).read(read_fields)
+            read_fields = read_fields_per_model[group.res_model_name]
             # YTI What about unaccent ? Should be taken into account IMO if the
             # rule was computed from that.
             data = set(records[0].items())
@@ -84,7 +105,7 @@ class DataMergeGroup(models.Model):
 
             records = group.record_ids._original_records()
             if not records:
-                return
+                continue
 
             master = elect_master(records)
             if master:
@@ -173,6 +194,77 @@ class DataMergeGroup(models.Model):
             'back_to_model': is_merge_action
         }
 
+    def _merge_records_batch(self):
+        """
+        Merge all the records of the groups at once.
+
+        The (source -> master) mapping of all the groups is gathered first, so that the foreign keys are
+        rewritten with one query per referencing column instead of one query per record and per column.
+        Groups of models with their own `_merge_method`, or sharing records with another group of the batch,
+        are merged one by one with `merge_records`.
+
+        :return dict with the number of updated rows per table
+        """
+        rowcounts = defaultdict(int)
+        for dm_model in self.model_id:
+            model_groups = self.filtered(lambda g: g.model_id == dm_model)
+            if hasattr(self.env[dm_model.res_model_name], '_merge_method'):
+                for group in model_groups:
+                    group.merge_records()
+                continue
+
+            domain = [
+                ('group_id', 'in', model_groups.ids),
+                ('is_discarded', '=', self.env.context.get('show_discarded', False)),
+            ]
+            records_per_group = defaultdict(lambda: self.env['data_merge.record'])
+            for record in self.env['data_merge.record'].with_context(active_test=False).search(domain, order='id'):
+                records_per_group[record.group_id] |= record
+
+            mapping = {}
+            used_res_ids = set()
+            merged = []
+            to_merge_one_by_one = self.env['data_merge.group']
+            for group in model_groups:
+                to_merge = records_per_group[group]
+                if len(to_merge) <= 1:
+                    continue
+                res_ids = set(to_merge.mapped('res_id'))
+                if not used_res_ids.isdisjoint(res_ids):
+                    to_merge_one_by_one |= group
+                    continue
+                master_record = to_merge.filtered('is_master') or to_merge[0]
+                to_merge = to_merge - master_record
+                if not master_record._original_records():
+                    _logger.warning('The master record does not exist')
+                    continue
+
+                used_res_ids |= res_ids
+                for record in to_merge:
+                    mapping[record.res_id] = master_record.res_id
+                # Keep the chatter data, in case the merged records are deleted during the merge procedure
+                chatter_data = {rec.res_id: dict(res_id=rec.res_id, merged_record=str(rec.name), changes=rec._record_snapshot()) for rec in to_merge}
+                merged.append((group, master_record, to_merge, chatter_data))
+
+            _logger.info('Merging %s groups of %s records', len(merged), dm_model.res_model_name)
+            for table, count in self.env['data_merge.record']._update_foreign_keys_batch(dm_model.res_model_name, mapping).items():
+                rowcounts[table] += count
+
+            merged_records = self.env['data_merge.record']
+            master_records = self.env['data_merge.record']
+            for group, master_record, to_merge, chatter_data in merged:
+                group._log_merge(master_record, to_merge, chatter_data)
+                merged_records |= to_merge
+                master_records |= master_record
+            if merged:
+                merged[0][0]._post_merge(master_records, merged_records)
+            (master_records + merged_records).unlink()
+
+            for group in to_merge_one_by_one:
+                group.merge_records()
+
+        return dict(rowcounts)
+
     def _log_merge(self, master_record, merged_records, chatter_data):
         """
         Post a snapshot of each merged records on the master record
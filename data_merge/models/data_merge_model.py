@@ -6,6 +6,7 @@ from odoo.exceptions import UserError, ValidationError
 
 from psycopg2 import ProgrammingError, errorcodes
 
+from collections import defaultdict
 from dateutil.relativedelta import relativedelta
 
 import ast
@@ -19,26 +20,36 @@ _logger = logging.getLogger(__name__)
 
 # Merge list of list based on their common element
 #   Input: [['a', 'b'], ['b', 'c'], ['d', 'e']]
-#   Output: [['a', 'b', 'c'], ['d', 'e']]
-# https://stackoverflow.com/a/9112588
+#   Output: [{'a', 'b', 'c'}, {'d', 'e'}]
+# The lists are merged with a union-find (disjoint-set) structure, which
+# is linear in the total number of elements.
 def merge_common_lists(lsts):
-    sets = [set(lst) for lst in lsts if lst]
-    merged = True
-    while merged:
-        merged = False
-        results = []
-        while sets:
-            common, rest = sets[0], sets[1:]
-            sets = []
-            for x in rest:
-                if x.isdisjoint(common):
-                    sets.append(x)
-                else:
-                    merged = True
-                    common |= x
-            results.append(common)
-        sets = results
-    return sets
+    parent = {}
+
+    def find(x):
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        # Path compression
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    for lst in lsts:
+        if not lst:
+            continue
+        for x in lst:
+            parent.setdefault(x, x)
+        root = find(lst[0])
+        for x in lst[1:]:
+            x_root = find(x)
+            if x_root != root:
+                parent[x_root] = root
+
+    sets = defaultdict(set)
+    for x in parent:
+        sets[find(x)].add(x)
+    return list(sets.values())
 
 
 class DataMergeModel(models.Model):
@@ -191,6 +202,10 @@ class DataMergeModel(models.Model):
                 if rule.match_mode == 'accent':
                     # Since unaccent is case sensitive, we must add a lower to make field_name insensitive
                     field_name = unaccent('lower(%s)' % field_name)
+                elif rule.match_mode == 'fuzzy':
+                    # Blocking key: case/accent insensitive value stripped from spaces and punctuation
+                    # e.g. "Deco Addict, Inc." and "deco-addict inc" share the key "decoaddictinc"
+                    field_name = "regexp_replace(%s, '[^[:alnum:]]+', '', 'g')" % unaccent('lower(%s)' % field_name)
 
                 group_by = ''
                 company_field = res_model._fields.get('company_id')
@@ -240,7 +255,13 @@ class DataMergeModel(models.Model):
                 FROM data_merge_record
                 WHERE model_id = %s
                 GROUP BY group_id""", [dm_model.id])
-            done_groups_res_ids = [set(x[0]) for x in self._cr.fetchall()]
+            # Index the existing groups by member, so that a group to create only
+            # has to be compared with the existing groups sharing its records
+            done_groups_per_res_id = defaultdict(list)
+            for res_ids, in self._cr.fetchall():
+                done_group = set(res_ids)
+                for res_id in done_group:
+                    done_groups_per_res_id[res_id].append(done_group)
 
             _logger.info('Query identification done after %s' % str(timeit.default_timer() - t1))
             t1 = timeit.default_timer()
@@ -250,42 +271,60 @@ class DataMergeModel(models.Model):
                 merge_list = lambda x: x
             groups_to_create = [set(r) for r in merge_list(ids) if len(r) > 1]
             _logger.info('Merging lists done after %s' % str(timeit.default_timer() - t1))
+
+            # Check if the IDs of the group to create is already part of an existing group
+            # e.g.
+            #   The group with records A B C already exists:
+            #       1/ If group_to_create equals A B, do not create a new group
+            #       2/ If group_to_create equals A D, create the new group (A D is not a subset of A B C)
+            # An existing group containing group_to_create contains in particular its smallest ID.
+            groups_to_create = [
+                group_to_create for group_to_create in groups_to_create
+                if not any(group_to_create <= x for x in done_groups_per_res_id.get(min(group_to_create), []))
+            ]
+
             t1 = timeit.default_timer()
             _logger.info('Record creation started at %s', str(t1))
-            groups_created = 0
             groups_to_create_count = len(groups_to_create)
-            for group_to_create in groups_to_create:
-                groups_created += 1
-                if groups_created % 100 == 0:
-                    _logger.info('Created groups %s / %s' % (groups_created, groups_to_create_count))
-
-                # Check if the IDs of the group to create is already part of an existing group
-                # e.g.
-                #   The group with records A B C already exists:
-                #       1/ If group_to_create equals A B, do not create a new group
-                #       2/ If group_to_create equals A D, create the new group (A D is not a subset of A B C)
-                if any(group_to_create <= x for x in done_groups_res_ids):
-                    continue
-
-                group = self.env['data_merge.group'].with_context(prefetch_fields=False).create({'model_id': dm_model.id})
-                d = [{'group_id': group.id, 'res_id': rec} for rec in group_to_create]
-                self.env['data_merge.record'].with_context(prefetch_fields=False).create(d)
-
-                if groups_created % 1000 == 0 and batch_commits:
+            batch_size = 1000
+            for index in range(0, groups_to_create_count, batch_size):
+                dm_model._create_duplicate_groups(groups_to_create[index:index + batch_size])
+                _logger.info('Created groups %s / %s' % (min(index + batch_size, groups_to_create_count), groups_to_create_count))
+                if batch_commits:
                     self.env.cr.commit()
 
-                group._elect_master_record()
+            _logger.info('Record creation done after %s' % str(timeit.default_timer() - t1))
+
+    def _create_duplicate_groups(self, groups_to_create):
+        """
+        Create the data_merge.group and their data_merge.record in batch, then elect their master record
+        and apply the suggestion and automatic merge thresholds.
+
+        :param groups_to_create: list of sets of record IDs, one per group
+        :return the created groups that were kept
+        """
+        self.ensure_one()
+        groups = self.env['data_merge.group'].with_context(prefetch_fields=False).create(
+            [{'model_id': self.id}] * len(groups_to_create))
+        self.env['data_merge.record'].with_context(prefetch_fields=False).create([
+            {'group_id': group.id, 'res_id': res_id}
+            for group, group_to_create in zip(groups, groups_to_create)
+            for res_id in group_to_create
+        ])
+        groups._elect_master_record()
 
-                if dm_model.create_threshold > 0 and group.similarity * 100 <= dm_model.create_threshold:
-                    group.unlink()
-                    continue
+        if self.create_threshold > 0:
+            groups_to_delete = groups.filtered(lambda g: g.similarity * 100 <= self.create_threshold)
+            groups_to_delete.unlink()
+            groups -= groups_to_delete
 
-                if dm_model.merge_mode == 'automatic':
-                    if group.similarity * 100 >= dm_model.merge_threshold:
-                        group.merge_records()
-                        group.unlink()
+        if self.merge_mode == 'automatic':
+            groups_to_merge = groups.filtered(lambda g: g.similarity * 100 >= self.merge_threshold)
+            groups_to_merge._merge_records_batch()
+            groups_to_merge.unlink()
+            groups -= groups_to_merge
 
-            _logger.info('Record creation done after %s' % str(timeit.default_timer() - t1))
+        return groups
 
     ##############
     ### Overrides
@@ -8,6 +8,7 @@ from odoo.osv.expression import OR
 from odoo.tools import get_lang
 from odoo.tools.misc import format_datetime, format_date
 
+from collections import defaultdict
 from datetime import datetime, date
 import psycopg2
 import ast
@@ -334,8 +335,9 @@ class DataMergeRecord(models.Model):
 
     ## Manual merge of ir.attachment & mail.activity
     @api.model
-    def _merge_additional_models(self, destination, source_ids):
-        models_to_adapt = [
+    def _get_additional_models(self):
+        """ Tables referencing records through a (model, res_id) pair instead of a foreign key """
+        return [
             {
                 'table': 'ir_attachment',
                 'id_field': 'res_id',
@@ -358,6 +360,10 @@ class DataMergeRecord(models.Model):
                 'model_field': 'res_model',
             }
         ]
+
+    @api.model
+    def _merge_additional_models(self, destination, source_ids):
+        models_to_adapt = self._get_additional_models()
         query = """
             UPDATE %(table)s
             SET %(id_field)s = %%(destination_id)s
@@ -384,17 +390,195 @@ class DataMergeRecord(models.Model):
                 except psycopg2.Error:
                     raise ValidationError('Query Failed.')
 
+    ## Bulk merge
+    @api.model
+    def _create_mapping_table(self, mapping):
+        """
+        Load the (source ID -> destination ID) `mapping` into the `data_merge_mapping` temporary table.
+
+        :param dict mapping: destination record ID for each source record ID
+        """
+        self._cr.execute("""
+            CREATE TEMPORARY TABLE IF NOT EXISTS data_merge_mapping (
+                source_id INTEGER PRIMARY KEY,
+                destination_id INTEGER NOT NULL
+            ) ON COMMIT DROP""")
+        self._cr.execute("TRUNCATE data_merge_mapping")
+        self._cr.execute("""
+            INSERT INTO data_merge_mapping (source_id, destination_id)
+            SELECT * FROM unnest(%s::integer[], %s::integer[])""", (list(mapping.keys()), list(mapping.values())))
+        self._cr.execute("ANALYZE data_merge_mapping")
+
+    @api.model
+    def _get_unique_columns(self, table, column):
+        """
+        Get the unique indexes of `table` involving `column`.
+
+        :return a list with, for each unique index, the list of its other columns
+        """
+        self._cr.execute("""
+            SELECT array_agg(att.attname::text)
+            FROM pg_index idx
+            JOIN pg_class cl ON cl.oid = idx.indrelid
+            JOIN pg_attribute att ON att.attrelid = cl.oid AND att.attnum = ANY(idx.indkey)
+            WHERE cl.relname = %s
+                AND idx.indisunique
+            GROUP BY idx.indexrelid
+            HAVING bool_or(att.attname = %s)""", (table, column))
+        return [[col for col in columns if col != column] for columns, in self._cr.fetchall()]
+
+    @api.model
+    def _update_references_from_mapping(self, table, column, unique_columns, model_field=None, model=None):
+        """
+        Replace in `table`.`column` every source ID of the `data_merge_mapping` table by its destination ID,
+        with a single query.
+
+        The rows that would violate one of the unique indexes are left untouched, like the per record queries
+        of `_update_foreign_keys` do: the rows whose destination value already exists are filtered out, and
+        only one row is updated among the rows that would end up with the same values.
+
+        :param list unique_columns: for each unique index involving `column`, its other columns
+        :param str model_field: column holding the model name, when `column` is a `res_id`
+        :param str model: model name to match `model_field` against
+        :return the number of updated rows
+        """
+        query_dict = {
+            'table': table,
+            'column': column,
+            'model_clause': model_field and 'AND o."%s" = %%(model)s' % model_field or '',
+        }
+        if not unique_columns:
+            query = """
+                UPDATE "%(table)s" o
+                SET "%(column)s" = m.destination_id
+                FROM data_merge_mapping m
+                WHERE o."%(column)s" = m.source_id
+                %(model_clause)s""" % query_dict
+        else:
+            not_exists = []
+            row_numbers = []
+            first_rows = []
+            for index, columns in enumerate(unique_columns):
+                not_exists.append("""
+                    AND NOT EXISTS (
+                        SELECT 1
+                        FROM "%(table)s" i
+                        WHERE i."%(column)s" = m.destination_id%(match)s
+                    )""" % dict(query_dict, match=''.join(' AND i."%s" = o."%s"' % (col, col) for col in columns)))
+                row_numbers.append(', ROW_NUMBER() OVER (PARTITION BY m.destination_id%s ORDER BY o."%s") AS rn_%s' % (
+                    ''.join(', o."%s"' % col for col in columns), column, index))
+                first_rows.append('AND c.rn_%s = 1' % index)
+            query = """
+                WITH candidates AS (
+                    SELECT o.ctid AS row_ctid, m.destination_id %(row_numbers)s
+                    FROM "%(table)s" o
+                    JOIN data_merge_mapping m ON o."%(column)s" = m.source_id
+                    WHERE TRUE %(model_clause)s %(not_exists)s
+                )
+                UPDATE "%(table)s" o
+                SET "%(column)s" = c.destination_id
+                FROM candidates c
+                WHERE o.ctid = c.row_ctid
+                %(first_rows)s""" % dict(
+                    query_dict,
+                    row_numbers=''.join(row_numbers),
+                    not_exists=''.join(not_exists),
+                    first_rows=' '.join(first_rows),
+                )
+
+        try:
+            with self._cr.savepoint():
+                self._cr.execute(query, {'model': model})
+                return self._cr.rowcount
+        except psycopg2.IntegrityError:
+            # A constraint we could not anticipate (e.g. on an expression), fall back on the
+            # per record updates, ignoring the ones that fail
+            _logger.warning('Bulk update of %s.%s failed, updating the records one by one', table, column)
+
+        query = """
+            UPDATE "%(table)s" o
+            SET "%(column)s" = %%(destination_id)s
+            WHERE "%(column)s" = %%(record_id)s
+            %(model_clause)s""" % query_dict
+        self._cr.execute("SELECT source_id, destination_id FROM data_merge_mapping")
+        rowcount = 0
+        for source_id, destination_id in self._cr.fetchall():
+            try:
+                with self._cr.savepoint():
+                    self._cr.execute(query, {'destination_id': destination_id, 'record_id': source_id, 'model': model})
+                    rowcount += self._cr.rowcount
+            except psycopg2.IntegrityError:
+                _logger.warning('Query %s failed, due to a constraint', query)
+        return rowcount
+
+    @api.model
+    def _update_foreign_keys_batch(self, model, mapping):
+        """
+        Bulk version of `_update_foreign_keys`: update all the foreign keys referring to the source records of
+        `mapping` with their destination record, using a single query per referencing column.
+
+        :param str model: name of the model of the merged records
+        :param dict mapping: destination record ID for each source record ID
+        :return dict with the number of updated rows per table
+        """
+        if not mapping:
+            return {}
+
+        Model = self.env[model]
+        references = self._get_model_references(Model._table)
+        self._create_mapping_table(mapping)
+
+        rowcounts = defaultdict(int)
+        for table, columns in references.items():
+            # Query to check the number of columns in the referencing table
+            query = """SELECT COUNT(column_name) FROM information_schema.columns WHERE table_name ILIKE %s"""
+            self._cr.execute(query, (table, ))
+            column_count = self._cr.fetchone()[0]
+
+            for column in columns:
+                ## Relation table for M2M
+                if column_count == 2:
+                    # Retrieve the "other" column
+                    self._cr.execute("""
+                        SELECT column_name
+                        FROM information_schema.columns
+                        WHERE table_name = %s
+                        AND column_name <> %s""", (table, column))
+                    unique_columns = [[self._cr.fetchone()[0]]]
+                else:
+                    unique_columns = self._get_unique_columns(table, column)
+                rowcounts[table] += self._update_references_from_mapping(table, column, unique_columns)
+
+        for additional_model in self._get_additional_models():
+            table = additional_model['table']
+            rowcounts[table] += self._update_references_from_mapping(
+                table, additional_model['id_field'], self._get_unique_columns(table, additional_model['id_field']),
+                model_field=additional_model['model_field'], model=model)
+
+        Model.browse(set(mapping.values())).recompute()
+        self.invalidate_cache()
+
+        rowcounts = {table: count for table, count in rowcounts.items() if count}
+        _logger.info('Merged %s %s records, updated rows per table: %s', len(mapping), model, rowcounts)
+        return rowcounts
+
     #############
     ### Override
     #############
-    @api.model
-    def create(self, vals):
-        group = self.env['data_merge.group'].browse(vals.get('group_id', 0))
-        record = self.env[group.res_model_name].browse(vals.get('res_id', 0))
-
-        if not record.exists():
-            raise ValidationError('The referenced record does not exist')
-        return super(DataMergeRecord, self).create(vals)
+    @api.model_create_multi
+    def create(self, vals_list):
+        res_ids_per_group = defaultdict(set)
+        for vals in vals_list:
+            res_ids_per_group[vals.get('group_id', 0)].add(vals.get('res_id', 0))
+
+        res_ids_per_model = defaultdict(set)
+        for group in self.env['data_merge.group'].browse(res_ids_per_group.keys()):
+            res_ids_per_model[group.res_model_name] |= res_ids_per_group[group.id]
+
+        for res_model_name, res_ids in res_ids_per_model.items():
+            if len(self.env[res_model_name].browse(res_ids).exists()) != len(res_ids):
+                raise ValidationError('The referenced record does not exist')
+        return super(DataMergeRecord, self).create(vals_list)
 
 
     def write(self, vals):
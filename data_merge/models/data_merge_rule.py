@@ -27,4 +27,5 @@ class DataMergeRule(models.Model):
         # can't conditionally set demo data...
         if self.env.context.get('install_mode') or self.env.registry.has_unaccent:
             modes.append(('accent', _("Case/Accent Insensitive Match")))
+        modes.append(('fuzzy', _("Similar Match (ignoring case, spaces and punctuation)")))
         return modes
@@ -2,6 +2,7 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 from . import test_common
+from odoo.addons.data_merge.models.data_merge_model import merge_common_lists
 
 class TestDeduplication(test_common.TestCommon):
     def test_deduplication_exact(self):
@@ -38,6 +39,26 @@ class TestDeduplication(test_common.TestCommon):
 
         self.assertEqual(self.MyModel.records_to_merge_count, 2, '2 records should have been found')
 
+    def test_deduplication_fuzzy(self):
+        self._create_rule('x_name', 'fuzzy')
+
+        self._create_record('x_dm_test_model', x_name='Deco Addict, Inc.')
+        self._create_record('x_dm_test_model', x_name='Deco Addicts')
+        self.MyModel.find_duplicates()
+        self.MyModel._compute_records_to_merge_count()
+
+        self.assertEqual(self.MyModel.records_to_merge_count, 0, '0 record should have been found')
+
+        self._create_record('x_dm_test_model', x_name='deco-addict inc')
+        self.MyModel.find_duplicates()
+        self.MyModel._compute_records_to_merge_count()
+
+        self.assertEqual(self.MyModel.records_to_merge_count, 2, '2 records should have been found')
+
+    def test_merge_common_lists(self):
+        merged = merge_common_lists([[1, 2], [3, 4], [2, 5], [], [6], [5, 3], [7, 8]])
+        self.assertCountEqual(merged, [{1, 2, 3, 4, 5}, {6}, {7, 8}])
+
     def test_deduplication_multiple(self):
         self._create_rule('x_name', 'exact')
         self._create_rule('x_email', 'exact')
@@ -38,3 +38,24 @@ class TestMerge(test_common.TestCommon):
         self.assertEqual(len(groups), 1, 'Should have found 1 group')
         self.assertEqual(len(groups.record_ids), 3, 'First group must contains three records: ("accentuée", "accentue", "Accentuée")')
         self.assertNotIn('Accentué', groups[0].record_ids.mapped('display_name'), 'Group must not contains "Accentué"')
+
+    def test_generic_merge_batch(self):
+        self._create_rule('x_name', 'exact')
+
+        rec = self._create_record('x_dm_test_model', x_name='toto')
+        rec2 = self._create_record('x_dm_test_model', x_name='toto')
+        rec3 = self._create_record('x_dm_test_model', x_name='titi')
+        rec4 = self._create_record('x_dm_test_model', x_name='titi')
+        ref = self._create_record('x_dm_test_model_ref', x_name='ref toto', x_test_id=rec2.id)
+        ref2 = self._create_record('x_dm_test_model_ref', x_name='ref titi', x_test_id=rec4.id)
+        self.MyModel.find_duplicates()
+
+        groups = self.env['data_merge.group'].search([('model_id', '=', self.MyModel.id)])
+        self.assertEqual(len(groups), 2, 'Should have found 2 groups')
+
+        rowcounts = groups._merge_records_batch()
+        self.assertEqual(rowcounts.get('x_dm_test_model_ref'), 2, 'Both references should be updated at once')
+        self.assertFalse(groups.record_ids.exists(), 'records should be unlinked')
+        self.assertEqual(ref.x_test_id, rec, 'The reference should be to rec')
+        self.assertEqual(ref2.x_test_id, rec3, 'The reference should be to rec3')
+        self.assertFalse((rec2 | rec4).exists(), 'The merged records should be deleted')
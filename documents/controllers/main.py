@@ -5,17 +5,59 @@ import zipfile
 import io
 import json
 import logging
+import mimetypes
 import os
+import time
 from contextlib import ExitStack
 
 from odoo import http
 from odoo.exceptions import AccessError
-from odoo.http import request, content_disposition
+from odoo.http import request, content_disposition, Response
 from odoo.tools.translate import _
 from odoo.tools import image_process
 
 logger = logging.getLogger(__name__)
 
+ZIP_CHUNK_SIZE = 64 * 1024
+
+# Files which are already compressed and are stored as is in the zip files
+COMPRESSED_MIMETYPES = {
+    'application/pdf',
+    'application/zip',
+    'application/x-zip-compressed',
+    'application/gzip',
+    'application/x-7z-compressed',
+    'application/x-rar-compressed',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    'application/vnd.oasis.opendocument.text',
+    'application/vnd.oasis.opendocument.spreadsheet',
+    'application/vnd.oasis.opendocument.presentation',
+}
+
+
+class ZipStream(io.RawIOBase):
+    """ Unseekable file object buffering what a ZipFile writes until it is popped,
+    which allows to send a zip file while it is being written. """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self):
+        """ Return the data written since the last call, as a list of at most one non-empty chunk """
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return [data] if data else []
+
 
 class ShareRoute(http.Controller):
 
@@ -79,32 +121,79 @@ class ShareRoute(http.Controller):
     def _make_zip(self, name, documents):
         """returns zip files for the Document Inspector and the portal.
 
+        The archive is streamed: the files are read from the filestore chunk by chunk and the zip
+        entries are sent as they are written, so that the memory used does not depend on the size
+        of the archive.
+
         :param name: the name to give to the zip file.
         :param documents: files (documents.document) to be zipped.
         :return: a http response to download a zip file.
         """
-        stream = io.BytesIO()
-        try:
-            with zipfile.ZipFile(stream, 'w') as doc_zip:
-                for document in self._get_downloadable_documents(documents):
-                    if document.type != 'binary':
-                        continue
-                    status, content, filename, mimetype, filehash = request.env['ir.http']._binary_record_content(
-                        document, field='datas', filename=None, filename_field='name',
-                        default_mimetype='application/octet-stream')
-                    doc_zip.writestr(filename, base64.b64decode(content),
-                                     compress_type=zipfile.ZIP_DEFLATED)
-        except zipfile.BadZipfile:
-            logger.exception("BadZipfile exception")
+        documents = self._get_downloadable_documents(documents).filtered(lambda d: d.type == 'binary')
+        documents.check_access_rights('read')
+        documents.check_access_rule('read')
+
+        # The stream is consumed once the request is over: everything that needs the database
+        # has to be fetched beforehand.
+        entries = []
+        for document in documents:
+            attachment = document.attachment_id.sudo()
+            if not attachment:
+                continue
+            mimetype = attachment.mimetype or 'application/octet-stream'
+            filename = document.name or '%s-%s-datas' % (document._name, document.id)
+            if not os.path.splitext(filename)[1]:
+                filename += mimetypes.guess_extension(mimetype) or ''
+            if attachment.store_fname:
+                entries.append((filename, mimetype, attachment._full_path(attachment.store_fname), None))
+            else:
+                entries.append((filename, mimetype, None, attachment.raw or b''))
 
-        content = stream.getvalue()
         headers = [
             ('Content-Type', 'zip'),
             ('X-Content-Type-Options', 'nosniff'),
-            ('Content-Length', len(content)),
             ('Content-Disposition', content_disposition(name))
         ]
-        return request.make_response(content, headers)
+        return Response(self._zip_stream(entries), headers=headers, direct_passthrough=True)
+
+    def _zip_stream(self, entries):
+        """ Generate the content of a zip file, chunk by chunk.
+
+        :param entries: list of (filename, mimetype, path, content) tuples, where either the path
+            of the file to read or its content is given.
+        """
+        stream = ZipStream()
+        try:
+            with zipfile.ZipFile(stream, 'w') as doc_zip:
+                for filename, mimetype, path, content in entries:
+                    is_compressed = mimetype in COMPRESSED_MIMETYPES or (
+                        mimetype.startswith(('image/', 'video/', 'audio/'))
+                        and mimetype not in ('image/svg+xml', 'image/bmp', 'image/tiff')
+                    )
+                    if is_compressed:
+                        compress_type = zipfile.ZIP_STORED
+                    else:
+                        compress_type = zipfile.ZIP_DEFLATED
+                    zip_info = zipfile.ZipInfo(filename, date_time=time.localtime(time.time())[:6])
+                    zip_info.compress_type = compress_type
+                    try:
+                        with ExitStack() as stack:
+                            if path:
+                                content_file = stack.enter_context(open(path, 'rb'))
+                                zip_info.file_size = os.fstat(content_file.fileno()).st_size
+                            else:
+                                content_file = io.BytesIO(content)
+                                zip_info.file_size = len(content)
+                            entry = stack.enter_context(doc_zip.open(zip_info, 'w'))
+                            for chunk in iter(lambda: content_file.read(ZIP_CHUNK_SIZE), b''):
+                                entry.write(chunk)
+                                yield from stream.pop()
+                    except OSError:
+                        logger.exception("Unable to read the file %s of the zip", filename)
+                    yield from stream.pop()
+        except zipfile.BadZipfile:
+            logger.exception("BadZipfile exception")
+        yield from stream.pop()
 
     # Download & upload routes #####################################################################
 
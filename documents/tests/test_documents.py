@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 from odoo.tests.common import TransactionCase, new_test_user
+from odoo.addons.documents.controllers.main import ShareRoute
 import base64
+import io
+import zipfile
 
 GIF = b"R0lGODdhAQABAIAAAP///////ywAAAAAAQABAAACAkQBADs="
 TEXT = base64.b64encode(bytes("TEST", 'utf-8'))
@@ -531,3 +534,17 @@ class TestCaseDocuments(TransactionCase):
         self.assertEqual(attachment_document.owner_id.id, self.doc_user.id, 'Should assign owner from share')
         self.assertEqual(attachment_document.partner_id.id, partner.id, 'Should assign partner from share')
         self.assertEqual(attachment_document.tag_ids.ids, [self.tag_b.id], 'Should assign tags from share')
+
+    def test_zip_stream(self):
+        entries = [
+            ('invoice.pdf', 'application/pdf', None, b'%PDF-1.4 ' * 1000),
+            ('notes.txt', 'text/plain', None, b'TEST ' * 1000),
+        ]
+        content = b''.join(ShareRoute()._zip_stream(entries))
+        with zipfile.ZipFile(io.BytesIO(content)) as doc_zip:
+            self.assertIsNone(doc_zip.testzip(), 'The streamed zip file should be valid')
+            self.assertEqual(doc_zip.read('invoice.pdf'), b'%PDF-1.4 ' * 1000)
+            self.assertEqual(doc_zip.read('notes.txt'), b'TEST ' * 1000)
+            self.assertEqual(doc_zip.getinfo('invoice.pdf').compress_type, zipfile.ZIP_STORED,
+                             'Already compressed files should not be compressed again')
+            self.assertEqual(doc_zip.getinfo('notes.txt').compress_type, zipfile.ZIP_DEFLATED)
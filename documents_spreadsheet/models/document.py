@@ -2,6 +2,7 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 import json
+import gzip
 import logging
 import base64
 import psycopg2
@@ -17,6 +18,14 @@ _logger = logging.getLogger(__name__)
 
 CollaborationMessage = Dict[str, Any]
 
+# A snapshot is requested when joining a session once the revisions since the
+# last snapshot reach one of these limits, or when nobody edited for a while.
+SNAPSHOT_REVISION_COUNT = 1000
+SNAPSHOT_REVISION_SIZE = 5 * 1024 * 1024  # bytes of revision commands
+SNAPSHOT_IDLE_DELAY = timedelta(hours=12)
+# Number of revisions sent to the client per request
+REVISIONS_PAGE_SIZE = 500
+
 
 class Document(models.Model):
     _inherit = "documents.document"
@@ -25,6 +34,7 @@ class Document(models.Model):
         [("spreadsheet", "Spreadsheet")], ondelete={"spreadsheet": "cascade"}
     )
     raw = fields.Binary(related="attachment_id.raw", readonly=False)
+    # gzip compressed in place, see `_get_spreadsheet_snapshot`
     spreadsheet_snapshot = fields.Binary()
     spreadsheet_revision_ids = fields.One2many(
         "spreadsheet.revision", "document_id",
@@ -103,7 +113,8 @@ class Document(models.Model):
         """Join a spreadsheet session.
         Returns the following data::
         - the last snapshot
-        - pending revisions since the last snapshot
+        - the first page of pending revisions since the last snapshot, the
+          next ones are fetched with `get_spreadsheet_revisions`
         - the spreadsheet name
         - whether the user favorited the spreadsheet or not
         - whether the user can edit the content of the spreadsheet or not
@@ -111,16 +122,43 @@ class Document(models.Model):
         self.ensure_one()
         self._check_collaborative_spreadsheet_access("read")
         can_write = self._check_collaborative_spreadsheet_access("write", raise_exception=False)
+        revisions = self.sudo()._build_spreadsheet_messages(limit=REVISIONS_PAGE_SIZE + 1)
         return {
             "id": self.id,
             "name": self.name,
             "is_favorited": self.is_favorited,
             "raw": self._get_spreadsheet_snapshot(),
-            "revisions": self.sudo()._build_spreadsheet_messages(),
+            "revisions": revisions[:REVISIONS_PAGE_SIZE],
+            "has_more_revisions": len(revisions) > REVISIONS_PAGE_SIZE,
             "snapshot_requested": can_write and self._should_be_snapshotted(),
             "isReadonly": not can_write,
         }
 
+    def get_spreadsheet_revisions(self, last_revision_id, limit=REVISIONS_PAGE_SIZE):
+        """Fetch the next page of pending revisions of a spreadsheet session.
+
+        :param last_revision_id: the last revision known by the client
+        :param limit: maximum number of revisions to return
+        :return: a dict with the ``revisions`` following ``last_revision_id``
+            and whether there are more of them (``has_more_revisions``).
+            ``outdated`` is set if ``last_revision_id`` is no longer pending,
+            i.e. a snapshot was saved meanwhile: the session must be joined again.
+        """
+        self.ensure_one()
+        self._check_collaborative_spreadsheet_access("read")
+        last_revision = self.env["spreadsheet.revision"].sudo().search([
+            ("document_id", "=", self.id),
+            ("revision_id", "=", last_revision_id),
+        ], limit=1)
+        if not last_revision:
+            return {"revisions": [], "has_more_revisions": False, "outdated": True}
+        revisions = self.sudo()._build_spreadsheet_messages(after_id=last_revision.id, limit=limit + 1)
+        return {
+            "revisions": revisions[:limit],
+            "has_more_revisions": len(revisions) > limit,
+            "outdated": False,
+        }
+
     def dispatch_spreadsheet_message(self, message: CollaborationMessage):
         """This is the entry point of collaborative editing.
         Collaboration messages arrive here. For each received messages,
@@ -195,7 +233,7 @@ class Document(models.Model):
             {"type": "SNAPSHOT_CREATED", "version": 1},
         )
         if is_accepted:
-            self.spreadsheet_snapshot = base64.encodebytes(json.dumps(spreadsheet_snapshot).encode("utf-8"))
+            self._set_spreadsheet_snapshot(json.dumps(spreadsheet_snapshot).encode("utf-8"))
             self._delete_spreadsheet_revisions()
             self._broadcast_spreadsheet_message({
                 "type": "SNAPSHOT_CREATED",
@@ -204,16 +242,39 @@ class Document(models.Model):
             })
         return is_accepted
 
-    def _get_spreadsheet_snapshot(self):
+    def _set_spreadsheet_snapshot(self, data: bytes):
+        self.spreadsheet_snapshot = base64.b64encode(gzip.compress(data))
+
+    def _get_spreadsheet_snapshot(self) -> bytes:
+        """Return the uncompressed snapshot data. The snapshots saved before
+        they were compressed are returned as is."""
         if not self.spreadsheet_snapshot:
-            self.spreadsheet_snapshot = base64.encodebytes(self.raw)
-        return base64.decodebytes(self.spreadsheet_snapshot)
+            self._set_spreadsheet_snapshot(self.raw)
+        data = base64.b64decode(self.spreadsheet_snapshot)
+        if data[:2] == b"\x1f\x8b":  # gzip magic number, never the start of a json document
+            data = gzip.decompress(data)
+        return data
 
     def _should_be_snapshotted(self):
-        if not self.spreadsheet_revision_ids:
+        """A snapshot is requested when the pending revisions are too many or
+        too large to be replayed quickly by the clients, or when nobody edited
+        the spreadsheet for a while (see snapshotting.md)."""
+        self.ensure_one()
+        self.env["spreadsheet.revision"].flush(["document_id", "commands", "active"])
+        self.env.cr.execute("""
+            SELECT COUNT(*), COALESCE(SUM(octet_length(commands)), 0), MAX(create_date)
+              FROM spreadsheet_revision
+             WHERE document_id = %s
+               AND active
+        """, [self.id])
+        count, size, last_activity = self.env.cr.fetchone()
+        if not count:
             return False
-        last_activity = max(self.spreadsheet_revision_ids.mapped("create_date"))
-        return last_activity < fields.Datetime.now() - timedelta(hours=12)
+        return (
+            count >= SNAPSHOT_REVISION_COUNT
+            or size >= SNAPSHOT_REVISION_SIZE
+            or last_activity < fields.Datetime.now() - SNAPSHOT_IDLE_DELAY
+        )
 
     def _save_concurrent_revision(self, next_revision_id, parent_revision_id, commands):
         """Save the given revision if no concurrency issue is found.
@@ -256,17 +317,27 @@ class Document(models.Model):
         message.pop("clientId", None)
         return json.dumps(message)
 
-    def _build_spreadsheet_messages(self) -> List[CollaborationMessage]:
+    def _build_spreadsheet_messages(self, after_id=None, limit=None) -> List[CollaborationMessage]:
         """Build spreadsheet collaboration messages from the saved
-        revision data"""
+        revision data
+
+        :param after_id: only build the revisions following the revision with this database id
+        :param limit: maximum number of messages to build
+        """
         self.ensure_one()
+        domain = [("document_id", "=", self.id)]
+        if after_id:
+            domain.append(("id", ">", after_id))
+        revisions = self.env["spreadsheet.revision"].search_read(
+            domain, ["commands", "parent_revision_id", "revision_id"], order="id", limit=limit,
+        )
         return [
             dict(
-                json.loads(rev.commands),
-                serverRevisionId=rev.parent_revision_id,
-                nextRevisionId=rev.revision_id,
+                json.loads(rev["commands"]),
+                serverRevisionId=rev["parent_revision_id"],
+                nextRevisionId=rev["revision_id"],
             )
-            for rev in self.spreadsheet_revision_ids
+            for rev in revisions
         ]
 
     def _check_collaborative_spreadsheet_access(
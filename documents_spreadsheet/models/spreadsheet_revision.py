@@ -9,7 +9,7 @@ class SpreadsheetRevision(models.Model):
     _description = "Collaborative spreadsheet revision"
 
     active = fields.Boolean(default=True)
-    document_id = fields.Many2one("documents.document", required=True, readonly=True)
+    document_id = fields.Many2one("documents.document", required=True, readonly=True, index=True)
     commands = fields.Char(required=True)
     revision_id = fields.Char(required=True)
     parent_revision_id = fields.Char(required=True)
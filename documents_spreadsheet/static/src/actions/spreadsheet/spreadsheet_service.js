@@ -117,12 +117,31 @@ class SpreadsheetService {
     }
 
     /**
-     * Fetch all the necessary data to join a collaborative spreadsheet
+     * Fetch all the necessary data to join a collaborative spreadsheet.
+     * The pending revisions are fetched page by page.
      * @param {number} documentId
      * @returns {Object}
      */
     async fetchData(documentId) {
-        return this.orm.call("documents.document", "join_spreadsheet_session", [documentId]);
+        const record = await this.orm.call("documents.document", "join_spreadsheet_session", [
+            documentId,
+        ]);
+        let hasMoreRevisions = record.has_more_revisions;
+        while (hasMoreRevisions) {
+            const lastRevision = record.revisions[record.revisions.length - 1];
+            const page = await this.orm.call(
+                "documents.document",
+                "get_spreadsheet_revisions",
+                [documentId, lastRevision.nextRevisionId]
+            );
+            if (page.outdated) {
+                // a snapshot was saved meanwhile, the revisions fetched so far are obsolete
+                return this.fetchData(documentId);
+            }
+            record.revisions.push(...page.revisions);
+            hasMoreRevisions = page.has_more_revisions;
+        }
+        return record;
     }
 
     /**
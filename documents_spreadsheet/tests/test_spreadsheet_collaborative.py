@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 import json
+import gzip
+import psycopg2
 import base64
 
 from freezegun import freeze_time
+from unittest.mock import patch
 from uuid import uuid4
 
 from .common import SpreadsheetTestCommon, TEXT
@@ -87,6 +90,63 @@ class SpreadsheetCollaborative(SpreadsheetTestCommon):
         self.assertEqual(data["raw"], TEXT)
         self.assertEqual(data["revisions"], [commands], "It should have past revisions")
 
+    def test_join_spreadsheet_session_revisions_pages(self):
+        spreadsheet = self.create_spreadsheet()
+        revisions = []
+        for _i in range(5):
+            revision = self.new_revision_data(spreadsheet)
+            spreadsheet.dispatch_spreadsheet_message(revision)
+            del revision["clientId"]
+            revisions.append(revision)
+        with patch("odoo.addons.documents_spreadsheet.models.document.REVISIONS_PAGE_SIZE", 2):
+            data = spreadsheet.join_spreadsheet_session()
+        self.assertEqual(data["revisions"], revisions[:2])
+        self.assertTrue(data["has_more_revisions"])
+        page = spreadsheet.get_spreadsheet_revisions(revisions[1]["nextRevisionId"], limit=2)
+        self.assertEqual(page["revisions"], revisions[2:4])
+        self.assertTrue(page["has_more_revisions"])
+        page = spreadsheet.get_spreadsheet_revisions(revisions[3]["nextRevisionId"], limit=2)
+        self.assertEqual(page["revisions"], revisions[4:])
+        self.assertFalse(page["has_more_revisions"])
+        self.assertFalse(page["outdated"])
+
+        self.snapshot(spreadsheet, self.get_revision(spreadsheet), "snapshot-revision-id", {"sheets": []})
+        page = spreadsheet.get_spreadsheet_revisions(revisions[3]["nextRevisionId"])
+        self.assertTrue(page["outdated"], "The revisions should have been archived by the snapshot")
+
+    def test_snapshot_request_revision_count(self):
+        spreadsheet = self.create_spreadsheet()
+        for _i in range(3):
+            spreadsheet.dispatch_spreadsheet_message(self.new_revision_data(spreadsheet))
+        self.assertFalse(spreadsheet.join_spreadsheet_session()["snapshot_requested"])
+        with patch("odoo.addons.documents_spreadsheet.models.document.SNAPSHOT_REVISION_COUNT", 3):
+            self.assertTrue(spreadsheet.join_spreadsheet_session()["snapshot_requested"])
+
+    def test_snapshot_request_revision_size(self):
+        spreadsheet = self.create_spreadsheet()
+        spreadsheet.dispatch_spreadsheet_message(
+            self.new_revision_data(spreadsheet, commands=[{"type": "A_COMMAND", "text": "x" * 1000}])
+        )
+        self.assertFalse(spreadsheet.join_spreadsheet_session()["snapshot_requested"])
+        with patch("odoo.addons.documents_spreadsheet.models.document.SNAPSHOT_REVISION_SIZE", 1000):
+            self.assertTrue(spreadsheet.join_spreadsheet_session()["snapshot_requested"])
+
+    def test_uncompressed_snapshot(self):
+        spreadsheet = self.create_spreadsheet()
+        spreadsheet.spreadsheet_snapshot = base64.encodebytes(b'{"sheets": []}')
+        self.assertEqual(spreadsheet._get_spreadsheet_snapshot(), b'{"sheets": []}')
+
+    def test_snapshot_stored_before_compression(self):
+        spreadsheet = self.create_spreadsheet()
+        spreadsheet.flush()
+        # the snapshots were stored uncompressed in the column of the document
+        self.env.cr.execute(
+            "UPDATE documents_document SET spreadsheet_snapshot = %s WHERE id = %s",
+            [psycopg2.Binary(base64.encodebytes(b'{"sheets": [], "revisionId": "old"}')), spreadsheet.id],
+        )
+        spreadsheet.invalidate_cache(['spreadsheet_snapshot'])
+        self.assertEqual(spreadsheet._get_spreadsheet_snapshot(), b'{"sheets": [], "revisionId": "old"}')
+
     def test_snapshot_spreadsheet_save_data(self):
         spreadsheet = self.create_spreadsheet()
         spreadsheet.dispatch_spreadsheet_message(self.new_revision_data(spreadsheet))
@@ -103,7 +163,12 @@ class SpreadsheetCollaborative(SpreadsheetTestCommon):
             0,
             "It should have archived the revision history",
         )
-        self.assertEqual(base64.decodebytes(spreadsheet.spreadsheet_snapshot), b'{"sheets": []}', "It should have saved the data")
+        self.assertEqual(spreadsheet._get_spreadsheet_snapshot(), b'{"sheets": []}', "It should have saved the data")
+        self.assertEqual(
+            gzip.decompress(base64.b64decode(spreadsheet.spreadsheet_snapshot)),
+            b'{"sheets": []}',
+            "It should have compressed the data",
+        )
         self.assertEqual(
             self.get_revision(spreadsheet),
             "snapshot-revision-id",
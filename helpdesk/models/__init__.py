@@ -4,6 +4,7 @@
 from . import digest
 from . import ir_module
 from . import helpdesk
+from . import helpdesk_dashboard
 from . import helpdesk_ticket
 from . import res_users
 from . import res_partner
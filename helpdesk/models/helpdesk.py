@@ -10,7 +10,6 @@ from odoo import api, fields, models, _
 from odoo.addons.helpdesk.models.helpdesk_ticket import TICKET_PRIORITY
 from odoo.addons.http_routing.models.ir_http import slug
 from odoo.addons.web.controllers.main import clean_action
-from odoo.osv import expression
 
 
 class HelpdeskTeam(models.Model):
@@ -134,20 +133,14 @@ class HelpdeskTeam(models.Model):
         self.has_external_mail_server = self.env['ir.config_parameter'].sudo().get_param('base_setup.default_external_email_server')
 
     def _compute_upcoming_sla_fail_tickets(self):
-        ticket_data = self.env['helpdesk.ticket'].read_group([
-            ('team_id', 'in', self.ids),
-            ('sla_deadline', '!=', False),
-            ('sla_deadline', '<=', fields.Datetime.to_string((datetime.date.today() + relativedelta.relativedelta(days=1)))),
-        ], ['team_id'], ['team_id'])
-        mapped_data = dict((data['team_id'][0], data['team_id_count']) for data in ticket_data)
+        counters = self.env['helpdesk.dashboard.counter'].sudo()._get_team_counters(self)
         for team in self:
-            team.upcoming_sla_fail_tickets = mapped_data.get(team.id, 0)
+            team.upcoming_sla_fail_tickets = counters[team.id].get('upcoming_sla_fail', 0)
 
     def _compute_unassigned_tickets(self):
-        ticket_data = self.env['helpdesk.ticket'].read_group([('user_id', '=', False), ('team_id', 'in', self.ids), ('stage_id.is_close', '!=', True)], ['team_id'], ['team_id'])
-        mapped_data = dict((data['team_id'][0], data['team_id_count']) for data in ticket_data)
+        counters = self.env['helpdesk.dashboard.counter'].sudo()._get_team_counters(self)
         for team in self:
-            team.unassigned_tickets = mapped_data.get(team.id, 0)
+            team.unassigned_tickets = counters[team.id].get('unassigned', 0)
 
     def _compute_open_ticket_count(self):
         ticket_data = self.env['helpdesk.ticket'].read_group([
@@ -297,23 +290,11 @@ class HelpdeskTeam(models.Model):
 
     @api.model
     def retrieve_dashboard(self):
-        domain = [('user_id', '=', self.env.uid)]
-        group_fields = ['priority', 'create_date', 'stage_id', 'close_hours']
-        list_fields = ['priority', 'create_date', 'stage_id', 'close_hours']
         #TODO: remove SLA calculations if user_uses_sla is false.
         user_uses_sla = self.user_has_groups('helpdesk.group_use_sla') and\
             bool(self.env['helpdesk.team'].search([('use_sla', '=', True), ('member_ids', 'in', self._uid)]))
 
-        if user_uses_sla:
-            group_fields.insert(1, 'sla_deadline:year')
-            group_fields.insert(2, 'sla_deadline:hour')
-            group_fields.insert(3, 'sla_reached_late')
-            list_fields.insert(1, 'sla_deadline')
-            list_fields.insert(2, 'sla_reached_late')
-
         HelpdeskTicket = self.env['helpdesk.ticket']
-        tickets = HelpdeskTicket.search_read(expression.AND([domain, [('stage_id.is_close', '=', False)]]), ['sla_deadline', 'open_hours', 'sla_reached_late', 'priority'])
-
         result = {
             'helpdesk_target_closed': self.env.user.helpdesk_target_closed,
             'helpdesk_target_rating': self.env.user.helpdesk_target_rating,
@@ -328,37 +309,18 @@ class HelpdeskTeam(models.Model):
             'success_rate_enable': user_uses_sla
         }
 
-        def _is_sla_failed(data):
-            deadline = data.get('sla_deadline')
-            sla_deadline = fields.Datetime.now() > deadline if deadline else False
-            return sla_deadline or data.get('sla_reached_late')
-
-        def add_to(ticket, key="my_all"):
-            result[key]['count'] += 1
-            result[key]['hours'] += ticket['open_hours']
-            if _is_sla_failed(ticket):
-                result[key]['failed'] += 1
-
-        for ticket in tickets:
-            add_to(ticket, 'my_all')
-            if ticket['priority'] == '2':
-                add_to(ticket, 'my_high')
-            if ticket['priority'] == '3':
-                add_to(ticket, 'my_urgent')
-
-        dt = fields.Date.today()
-        tickets = HelpdeskTicket.read_group(domain + [('stage_id.is_close', '=', True), ('close_date', '>=', dt)], list_fields, group_fields, lazy=False)
-        for ticket in tickets:
-            result['today']['count'] += ticket['__count']
-            if not _is_sla_failed(ticket):
-                result['today']['success'] += ticket['__count']
-
-        dt = fields.Datetime.to_string((datetime.date.today() - relativedelta.relativedelta(days=6)))
-        tickets = HelpdeskTicket.read_group(domain + [('stage_id.is_close', '=', True), ('close_date', '>=', dt)], list_fields, group_fields, lazy=False)
-        for ticket in tickets:
-            result['7days']['count'] += ticket['__count']
-            if not _is_sla_failed(ticket):
-                result['7days']['success'] += ticket['__count']
+        # the counters are materialized, see helpdesk.dashboard.counter
+        counters = self.env['helpdesk.dashboard.counter'].sudo()._get_user_counters(self.env.user)
+        for key in ['my_all', 'my_high', 'my_urgent']:
+            result[key].update({
+                'count': counters[key]['count'],
+                'hours': counters[key]['hours'],
+                'failed': counters[key]['failed'],
+            })
+        for key in ['today', '7days']:
+            result[key]['count'] = counters[key]['count']
+            # the tickets reached late only count as failed when the SLA are used
+            result[key]['success'] = counters[key]['count'] - (counters[key]['failed'] if user_uses_sla else 0)
 
         result['today']['success'] = fields.Float.round(result['today']['success'] * 100 / (result['today']['count'] or 1), 2)
         result['7days']['success'] = fields.Float.round(result['7days']['success'] * 100 / (result['7days']['count'] or 1), 2)
@@ -621,6 +583,8 @@ class HelpdeskStage(models.Model):
     def write(self, vals):
         if 'active' in vals and not vals['active']:
             self.env['helpdesk.ticket'].search([('stage_id', 'in', self.ids)]).write({'active': False})
+        if 'is_close' in vals:
+            self.env['helpdesk.dashboard.counter'].sudo()._invalidate_all()
         return super(HelpdeskStage, self).write(vals)
 
     def unlink(self):
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import datetime
+
+from collections import defaultdict
+from dateutil import relativedelta
+from odoo import api, fields, models
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+USER_COUNTERS = ['my_all', 'my_high', 'my_urgent', 'today', '7days']
+TEAM_COUNTERS = ['upcoming_sla_fail', 'unassigned']
+
+
+class HelpdeskDashboardCounter(models.Model):
+    """ Counters displayed on the helpdesk overview, materialized per user and per team.
+
+        The counters are invalidated when a ticket changes in a way that impacts them
+        (stage, user, priority, SLA, ...), and recomputed for the invalidated users and
+        teams only when the dashboard is displayed. As some of them depend on the current
+        time, each counter also expires at the next SLA deadline or at midnight.
+        A nightly cron reconciles all of them with the tickets.
+
+        The counters of a user are split by company, so that only the ones of the allowed
+        companies are displayed, as the multi-company rules of the tickets do. The tickets
+        of a team all belong to its company.
+    """
+    _name = 'helpdesk.dashboard.counter'
+    _description = 'Helpdesk Dashboard Counter'
+
+    user_id = fields.Many2one('res.users', ondelete='cascade', index=True)
+    team_id = fields.Many2one('helpdesk.team', ondelete='cascade', index=True)
+    company_id = fields.Many2one('res.company', ondelete='cascade', help="Company of the tickets counted for the user")
+    key = fields.Selection([
+        ('my_all', 'My Tickets'),
+        ('my_high', 'My High Priority Tickets'),
+        ('my_urgent', 'My Urgent Tickets'),
+        ('today', 'Closed Today'),
+        ('7days', 'Closed in the Last 7 Days'),
+        ('upcoming_sla_fail', 'Upcoming SLA Fail Tickets'),
+        ('unassigned', 'Unassigned Tickets'),
+    ], required=True)
+    count = fields.Integer()
+    failed = fields.Integer(help="Number of tickets which failed their SLA")
+    running_count = fields.Integer(help="Number of tickets without close date, whose open hours grow with the time")
+    create_date_sum = fields.Float(help="Sum of the creation dates of the tickets without close date, in seconds since epoch, used to compute their open hours")
+    closed_hours = fields.Float(help="Open hours of the tickets with a close date, counted until their close date")
+    valid_until = fields.Datetime(help="The counter has to be recomputed after this date. Empty if it has been invalidated.")
+
+    _sql_constraints = [
+        ('team_key_uniq', 'unique (team_id, key)', "A counter already exists for this team."),
+    ]
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS helpdesk_dashboard_counter_user_company_key_uniq
+                ON helpdesk_dashboard_counter (user_id, (COALESCE(company_id, 0)), key)
+        """)
+
+    # ------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------
+
+    @api.model
+    def _get_user_counters(self, user):
+        """ :returns: dict {key: {'count', 'failed', 'hours'}} for the open and closed tickets of ``user``
+            in the allowed companies of the environment
+        """
+        now = fields.Datetime.now()
+        counters = self.search([('user_id', '=', user.id)])
+        # the counters without company are always stored, they tell whether the ones of the user exist
+        if len(counters.filtered(lambda c: not c.company_id)) < len(USER_COUNTERS) \
+                or any(not c.valid_until or c.valid_until <= now for c in counters):
+            self._refresh_user_counters(user.ids)
+            counters = self.search([('user_id', '=', user.id)])
+        now_seconds = (now - EPOCH).total_seconds()
+        result = {key: {'count': 0, 'failed': 0, 'hours': 0.0} for key in USER_COUNTERS}
+        for counter in counters:
+            if counter.company_id and counter.company_id not in self.env.companies:
+                continue
+            result[counter.key]['count'] += counter.count
+            result[counter.key]['failed'] += counter.failed
+            result[counter.key]['hours'] += counter.closed_hours + (counter.running_count * now_seconds - counter.create_date_sum) / 3600
+        return result
+
+    @api.model
+    def _get_team_counters(self, teams):
+        """ :returns: dict {team_id: {key: count}} """
+        now = fields.Datetime.now()
+        counters = self.search([('team_id', 'in', teams.ids)])
+        counters_per_team = defaultdict(list)
+        for counter in counters:
+            counters_per_team[counter.team_id.id].append(counter)
+        stale_teams = [
+            team_id for team_id in teams.ids
+            if len(counters_per_team[team_id]) < len(TEAM_COUNTERS)
+            or any(not c.valid_until or c.valid_until <= now for c in counters_per_team[team_id])
+        ]
+        if stale_teams:
+            self._refresh_team_counters(stale_teams)
+            counters = self.search([('team_id', 'in', teams.ids)])
+        result = defaultdict(dict)
+        for counter in counters:
+            result[counter.team_id.id][counter.key] = counter.count
+        return result
+
+    # ------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------
+
+    @api.model
+    def _invalidate(self, user_ids=(), team_ids=()):
+        user_ids, team_ids = tuple(set(user_ids) - {False}), tuple(set(team_ids) - {False})
+        if user_ids:
+            self.env.cr.execute("UPDATE helpdesk_dashboard_counter SET valid_until = NULL WHERE user_id IN %s", [user_ids])
+        if team_ids:
+            self.env.cr.execute("UPDATE helpdesk_dashboard_counter SET valid_until = NULL WHERE team_id IN %s", [team_ids])
+        if user_ids or team_ids:
+            self.invalidate_cache(['valid_until'])
+
+    @api.model
+    def _invalidate_all(self):
+        self.env.cr.execute("UPDATE helpdesk_dashboard_counter SET valid_until = NULL")
+        self.invalidate_cache(['valid_until'])
+
+    # ------------------------------------------------------------
+    # Computation
+    # ------------------------------------------------------------
+
+    def _flush_tickets(self):
+        self.env['helpdesk.ticket'].flush([
+            'user_id', 'team_id', 'company_id', 'stage_id', 'priority', 'active', 'create_date', 'close_date',
+            'sla_deadline', 'sla_reached_late',
+        ])
+        self.env['helpdesk.stage'].flush(['is_close'])
+
+    def _store_counters(self, conflict, values_list):
+        """ Upsert the counters ``values_list``, identified by the columns ``conflict``. """
+        if values_list:
+            query = """
+                INSERT INTO helpdesk_dashboard_counter
+                    (user_id, team_id, company_id, key, count, failed, running_count, create_date_sum, closed_hours,
+                     valid_until, create_uid, create_date, write_uid, write_date)
+                VALUES %s
+                ON CONFLICT (%s) DO UPDATE
+                   SET count = EXCLUDED.count,
+                       failed = EXCLUDED.failed,
+                       running_count = EXCLUDED.running_count,
+                       create_date_sum = EXCLUDED.create_date_sum,
+                       closed_hours = EXCLUDED.closed_hours,
+                       valid_until = EXCLUDED.valid_until,
+                       write_uid = EXCLUDED.write_uid,
+                       write_date = EXCLUDED.write_date
+            """ % (', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'] * len(values_list)), conflict)
+            now = fields.Datetime.now()
+            params = []
+            for values in values_list:
+                params += values + [self.env.uid, now, self.env.uid, now]
+            self.env.cr.execute(query, params)
+        self.invalidate_cache(list(self._fields))
+
+    @api.model
+    def _refresh_user_counters(self, user_ids):
+        """ Recompute the counters of ``user_ids`` per company from the tickets, in two grouped queries. """
+        self._flush_tickets()
+        now = fields.Datetime.now()
+        today = fields.Date.today()
+        midnight = datetime.datetime.combine(today + relativedelta.relativedelta(days=1), datetime.time.min)
+        counters = {}
+
+        def counter(user_id, company_id, key):
+            return counters.setdefault((user_id, company_id, key), {
+                'count': 0, 'failed': 0, 'running_count': 0, 'create_date_sum': 0.0, 'closed_hours': 0.0,
+                'valid_until': midnight,
+            })
+
+        # the counters of the companies without tickets anymore are reset
+        self.env.cr.execute("""
+            SELECT DISTINCT user_id, company_id
+              FROM helpdesk_dashboard_counter
+             WHERE user_id IN %s
+        """, [tuple(user_ids)])
+        user_companies = set(self.env.cr.fetchall()) | {(user_id, None) for user_id in user_ids}
+        for user_id, company_id in user_companies:
+            for key in USER_COUNTERS:
+                counter(user_id, company_id, key)
+
+        # open tickets: they fail when their SLA deadline is over, so the counters expire at the next deadline
+        self.env.cr.execute("""
+            SELECT ticket.user_id, ticket.company_id, ticket.priority,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE ticket.sla_reached_late IS TRUE OR ticket.sla_deadline < %(now)s),
+                   COUNT(*) FILTER (WHERE ticket.close_date IS NULL),
+                   COALESCE(SUM(EXTRACT(EPOCH FROM ticket.create_date)) FILTER (WHERE ticket.close_date IS NULL), 0),
+                   COALESCE(SUM(FLOOR(EXTRACT(EPOCH FROM ticket.close_date - ticket.create_date) / 3600)), 0),
+                   MIN(ticket.sla_deadline) FILTER (WHERE ticket.sla_reached_late IS NOT TRUE AND ticket.sla_deadline >= %(now)s)
+              FROM helpdesk_ticket ticket
+              JOIN helpdesk_stage stage ON stage.id = ticket.stage_id
+             WHERE ticket.user_id IN %(user_ids)s
+               AND ticket.active
+               AND stage.is_close IS NOT TRUE
+          GROUP BY ticket.user_id, ticket.company_id, ticket.priority
+        """, {'now': now, 'user_ids': tuple(user_ids)})
+        for user_id, company_id, priority, count, failed, running_count, create_date_sum, closed_hours, next_deadline in self.env.cr.fetchall():
+            keys = ['my_all']
+            if priority == '2':
+                keys.append('my_high')
+            elif priority == '3':
+                keys.append('my_urgent')
+            for key in keys:
+                values = counter(user_id, company_id, key)
+                values['count'] += count
+                values['failed'] += failed
+                values['running_count'] += running_count
+                values['create_date_sum'] += float(create_date_sum)
+                values['closed_hours'] += float(closed_hours)
+                if next_deadline:
+                    values['valid_until'] = min(values['valid_until'], next_deadline)
+
+        # tickets closed today and during the last 7 days (6 days + today)
+        self.env.cr.execute("""
+            SELECT ticket.user_id, ticket.company_id, ticket.close_date >= %(today)s,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE ticket.sla_reached_late IS TRUE)
+              FROM helpdesk_ticket ticket
+              JOIN helpdesk_stage stage ON stage.id = ticket.stage_id
+             WHERE ticket.user_id IN %(user_ids)s
+               AND ticket.active
+               AND stage.is_close IS TRUE
+               AND ticket.close_date >= %(seven_days)s
+          GROUP BY 1, 2, 3
+        """, {
+            'today': today,
+            'seven_days': today - relativedelta.relativedelta(days=6),
+            'user_ids': tuple(user_ids),
+        })
+        for user_id, company_id, closed_today, count, failed in self.env.cr.fetchall():
+            for key in (['today', '7days'] if closed_today else ['7days']):
+                values = counter(user_id, company_id, key)
+                values['count'] += count
+                values['failed'] += failed
+
+        self._store_counters('user_id, (COALESCE(company_id, 0)), key', [
+            [user_id, None, company_id, key, c['count'], c['failed'], c['running_count'], c['create_date_sum'],
+             c['closed_hours'], c['valid_until']]
+            for (user_id, company_id, key), c in counters.items()
+        ])
+
+    @api.model
+    def _refresh_team_counters(self, team_ids):
+        """ Recompute the counters of ``team_ids`` from the tickets, in one grouped query. """
+        self._flush_tickets()
+        tomorrow = fields.Date.today() + relativedelta.relativedelta(days=1)
+        counters = {(team_id, key): 0 for team_id in team_ids for key in TEAM_COUNTERS}
+        self.env.cr.execute("""
+            SELECT ticket.team_id,
+                   COUNT(*) FILTER (WHERE ticket.sla_deadline <= %(tomorrow)s),
+                   COUNT(*) FILTER (WHERE ticket.user_id IS NULL AND stage.is_close IS NOT TRUE AND stage.id IS NOT NULL)
+              FROM helpdesk_ticket ticket
+         LEFT JOIN helpdesk_stage stage ON stage.id = ticket.stage_id
+             WHERE ticket.team_id IN %(team_ids)s
+               AND ticket.active
+          GROUP BY ticket.team_id
+        """, {'tomorrow': tomorrow, 'team_ids': tuple(team_ids)})
+        for team_id, upcoming_sla_fail, unassigned in self.env.cr.fetchall():
+            counters[team_id, 'upcoming_sla_fail'] = upcoming_sla_fail
+            counters[team_id, 'unassigned'] = unassigned
+
+        # the upcoming SLA fails are those of tomorrow: they change at midnight
+        midnight = datetime.datetime.combine(tomorrow, datetime.time.min)
+        self._store_counters('team_id, key', [
+            [None, team_id, None, key, count, 0, 0, 0.0, 0.0, midnight]
+            for (team_id, key), count in counters.items()
+        ])
+
+    @api.model
+    def _cron_reconcile_counters(self):
+        """ Recompute all the materialized counters from the tickets. """
+        self.env.cr.execute("SELECT DISTINCT user_id FROM helpdesk_dashboard_counter WHERE user_id IS NOT NULL")
+        user_ids = [row[0] for row in self.env.cr.fetchall()]
+        if user_ids:
+            self._refresh_user_counters(user_ids)
+        self.env.cr.execute("SELECT DISTINCT team_id FROM helpdesk_dashboard_counter WHERE team_id IS NOT NULL")
+        team_ids = [row[0] for row in self.env.cr.fetchall()]
+        if team_ids:
+            self._refresh_team_counters(team_ids)
@@ -2,11 +2,16 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 import math
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import timedelta
 from dateutil.relativedelta import relativedelta
+from pytz import timezone
 from random import randint
 
 from odoo import api, Command, fields, models, tools, _
 from odoo.addons.iap.tools import iap_tools
+from odoo.addons.resource.models.resource import make_aware
 from odoo.osv import expression
 from odoo.exceptions import AccessError
 
@@ -47,6 +52,108 @@ class HelpdeskTicketType(models.Model):
     ]
 
 
+class CalendarPlanner:
+    """ Work intervals of a calendar, computed once by chunks and kept sorted in memory,
+        in order to plan many deadlines on the same calendar.
+
+        ``plan_days``, ``plan_hours`` and ``get_work_hours_count`` give the same results as the
+        methods of ``resource.calendar`` (without resource nor domain): the intervals are split
+        the same way those methods browse them, i.e. by steps of 14 days from the given datetime,
+        and are expressed in the timezone of the calendar, in which the days are counted.
+    """
+    CHUNK = timedelta(days=90)
+    PLAN_STEP = timedelta(days=14)
+    PLAN_STEPS = 100
+
+    def __init__(self, calendar, start_dt, compute_leaves=True):
+        self.calendar = calendar
+        self.tz = timezone(calendar.tz)
+        self.compute_leaves = compute_leaves
+        self.start_dt = self.end_dt = make_aware(start_dt)[0]
+        self.starts = []
+        self.stops = []
+
+    def _extend(self):
+        end_dt = self.end_dt + self.CHUNK
+        if self.compute_leaves:
+            intervals = self.calendar._work_intervals_batch(self.end_dt, end_dt)[False]
+        else:
+            intervals = self.calendar._attendance_intervals_batch(self.end_dt, end_dt)[False]
+        for start, stop, _meta in intervals:
+            if self.stops and self.stops[-1] == start:
+                # interval split by the previous chunk
+                self.stops[-1] = stop
+            else:
+                self.starts.append(start)
+                self.stops.append(stop)
+        self.end_dt = end_dt
+
+    def _intervals(self, start_dt, end_dt):
+        """ Yield the work intervals between ``start_dt`` and ``end_dt``, split by steps of
+            ``PLAN_STEP`` from ``start_dt``, in the timezone of the calendar.
+        """
+        while self.end_dt <= start_dt:
+            self._extend()
+        index = bisect_right(self.stops, start_dt)
+        cursor, step_end = start_dt, start_dt + self.PLAN_STEP
+        while True:
+            # make sure the next interval is complete, it may continue in the next chunk
+            while self.end_dt < end_dt and (index == len(self.stops) or self.stops[index] >= self.end_dt):
+                self._extend()
+            if index == len(self.stops):
+                return
+            start, stop = max(self.starts[index], cursor), min(self.stops[index], end_dt)
+            if start >= end_dt:
+                return
+            while start >= step_end:
+                step_end += self.PLAN_STEP
+            if stop > step_end:
+                stop = step_end
+            else:
+                index += 1
+            yield start.astimezone(self.tz), stop.astimezone(self.tz)
+            cursor = stop
+
+    def plan_days(self, days, day_dt):
+        if days <= 0 or make_aware(day_dt)[0] < self.start_dt:
+            return self.calendar.plan_days(days, day_dt, compute_leaves=self.compute_leaves)
+        day_dt, revert = make_aware(day_dt)
+        found = set()
+        for start, stop in self._intervals(day_dt, day_dt + self.PLAN_STEP * self.PLAN_STEPS):
+            found.add(start.date())
+            if len(found) == days:
+                return revert(stop)
+        return False
+
+    def plan_hours(self, hours, day_dt):
+        if hours < 0 or make_aware(day_dt)[0] < self.start_dt:
+            return self.calendar.plan_hours(hours, day_dt, compute_leaves=self.compute_leaves)
+        day_dt, revert = make_aware(day_dt)
+        for start, stop in self._intervals(day_dt, day_dt + self.PLAN_STEP * self.PLAN_STEPS):
+            interval_hours = (stop - start).total_seconds() / 3600
+            if hours <= interval_hours:
+                return revert(start + timedelta(hours=hours))
+            hours -= interval_hours
+        return False
+
+    def get_work_hours_count(self, start_dt, end_dt):
+        start_dt, end_dt = make_aware(start_dt)[0], make_aware(end_dt)[0]
+        if end_dt <= start_dt:
+            return 0
+        if start_dt < self.start_dt:
+            return self.calendar.get_work_hours_count(start_dt, end_dt, compute_leaves=self.compute_leaves)
+        while self.end_dt <= max(start_dt, end_dt):
+            self._extend()
+        # unlike plan_days and plan_hours, the intervals are not split
+        index = bisect_right(self.stops, start_dt)
+        hours = 0
+        for start, stop in zip(self.starts[index:], self.stops[index:]):
+            if start >= end_dt:
+                break
+            hours += (min(stop, end_dt) - max(start, start_dt)).total_seconds() / 3600
+        return hours
+
+
 class HelpdeskSLAStatus(models.Model):
     _name = 'helpdesk.sla.status'
     _description = "Ticket SLA Status"
@@ -65,14 +172,15 @@ class HelpdeskSLAStatus(models.Model):
 
     @api.depends('ticket_id.create_date', 'sla_id', 'ticket_id.stage_id')
     def _compute_deadline(self):
+        statuses_per_calendar_sla = defaultdict(list)
+        start_dt_per_calendar = {}
         for status in self:
             if (status.deadline and status.reached_datetime) or (status.deadline and not status.sla_id.exclude_stage_ids) or (status.status == 'failed'):
                 continue
-            deadline = status.ticket_id.create_date
             working_calendar = status.ticket_id.team_id.resource_calendar_id
             if not working_calendar:
                 # Normally, having a working_calendar is mandatory
-                status.deadline = deadline
+                status.deadline = status.ticket_id.create_date
                 continue
 
             if status.sla_id.exclude_stage_ids:
@@ -80,29 +188,45 @@ class HelpdeskSLAStatus(models.Model):
                     # We are in the freezed time stage: No deadline
                     status.deadline = False
                     continue
+            statuses_per_calendar_sla[working_calendar, status.sla_id].append(status)
+            create_dt = status.ticket_id.create_date
+            start_dt_per_calendar[working_calendar] = min(create_dt, start_dt_per_calendar.get(working_calendar, create_dt))
+
+        # The work intervals of each calendar are computed once for all its statuses
+        planners = {}
+        for (working_calendar, sla), statuses in statuses_per_calendar_sla.items():
+            if working_calendar not in planners:
+                start_dt = start_dt_per_calendar[working_calendar]
+                planners[working_calendar] = (
+                    CalendarPlanner(working_calendar, start_dt),
+                    CalendarPlanner(working_calendar, start_dt, compute_leaves=False),
+                )
+            work_planner, attendance_planner = planners[working_calendar]
 
             avg_hour = working_calendar.hours_per_day or 8 #default to 8 working hours/day
-            time_days = math.floor(status.sla_id.time / avg_hour)
-            if time_days > 0:
-                deadline = working_calendar.plan_days(time_days + 1, deadline, compute_leaves=True)
-                # We should also depend on ticket creation time, otherwise for 1 day SLA, all tickets
-                # created on monday will have their deadline filled with tuesday 8:00
-                create_dt = status.ticket_id.create_date
-                deadline = deadline.replace(hour=create_dt.hour, minute=create_dt.minute, second=create_dt.second, microsecond=create_dt.microsecond)
-
-            sla_hours = status.sla_id.time % avg_hour
-
-            if status.sla_id.exclude_stage_ids:
-                sla_hours += status._get_freezed_hours(working_calendar)
-
-                # Except if ticket creation time is later than the end time of the working day
-                deadline_for_working_cal = working_calendar.plan_hours(0, deadline)
-                if deadline_for_working_cal and deadline.day < deadline_for_working_cal.day:
-                    deadline = deadline.replace(hour=0, minute=0, second=0, microsecond=0)
-            # We should execute the function plan_hours in any case because, in a 1 day SLA environment,
-            # if I create a ticket knowing that I'm not working the day after at the same time, ticket
-            # deadline will be set at time I don't work (ticket creation time might not be in working calendar).
-            status.deadline = working_calendar.plan_hours(sla_hours, deadline, compute_leaves=True)
+            time_days = math.floor(sla.time / avg_hour)
+            for status in statuses:
+                deadline = status.ticket_id.create_date
+                if time_days > 0:
+                    deadline = work_planner.plan_days(time_days + 1, deadline)
+                    # We should also depend on ticket creation time, otherwise for 1 day SLA, all tickets
+                    # created on monday will have their deadline filled with tuesday 8:00
+                    create_dt = status.ticket_id.create_date
+                    deadline = deadline.replace(hour=create_dt.hour, minute=create_dt.minute, second=create_dt.second, microsecond=create_dt.microsecond)
+
+                sla_hours = sla.time % avg_hour
+
+                if sla.exclude_stage_ids:
+                    sla_hours += status._get_freezed_hours(work_planner)
+
+                    # Except if ticket creation time is later than the end time of the working day
+                    deadline_for_working_cal = attendance_planner.plan_hours(0, deadline)
+                    if deadline_for_working_cal and deadline.day < deadline_for_working_cal.day:
+                        deadline = deadline.replace(hour=0, minute=0, second=0, microsecond=0)
+                # We should execute the function plan_hours in any case because, in a 1 day SLA environment,
+                # if I create a ticket knowing that I'm not working the day after at the same time, ticket
+                # deadline will be set at time I don't work (ticket creation time might not be in working calendar).
+                status.deadline = work_planner.plan_hours(sla_hours, deadline)
 
     @api.depends('deadline', 'reached_datetime')
     def _compute_status(self):
@@ -161,6 +285,7 @@ class HelpdeskSLAStatus(models.Model):
                 status.exceeded_days = False
 
     def _get_freezed_hours(self, working_calendar):
+        """ :param working_calendar: the ``resource.calendar`` of the ticket or its ``CalendarPlanner`` """
         self.ensure_one()
         hours_freezed = 0
 
@@ -562,6 +687,8 @@ class HelpdeskTicket(models.Model):
         # apply SLA
         tickets.sudo()._sla_apply()
 
+        self.env['helpdesk.dashboard.counter'].sudo()._invalidate(tickets.user_id.ids, tickets.team_id.ids)
+
         return tickets
 
     def write(self, vals):
@@ -580,6 +707,10 @@ class HelpdeskTicket(models.Model):
 
         now = fields.Datetime.now()
 
+        dashboard_users = dashboard_teams = None
+        if any(field_name in self._dashboard_counter_trigger() for field_name in vals):
+            dashboard_users, dashboard_teams = self.user_id, self.team_id
+
         # update last stage date when changing stage
         if 'stage_id' in vals:
             vals['date_last_stage_update'] = now
@@ -608,12 +739,25 @@ class HelpdeskTicket(models.Model):
         if 'stage_id' in vals:
             self.sudo()._sla_reach(vals['stage_id'])
 
+        if dashboard_users is not None:
+            self.env['helpdesk.dashboard.counter'].sudo()._invalidate(
+                (dashboard_users | self.user_id).ids, (dashboard_teams | self.team_id).ids)
+
         return res
 
+    def unlink(self):
+        self.env['helpdesk.dashboard.counter'].sudo()._invalidate(self.user_id.ids, self.team_id.ids)
+        return super(HelpdeskTicket, self).unlink()
+
     # ------------------------------------------------------------
     # Actions and Business methods
     # ------------------------------------------------------------
 
+    @api.model
+    def _dashboard_counter_trigger(self):
+        """ Get the list of field for which we have to invalidate the dashboard counters """
+        return ['user_id', 'team_id', 'stage_id', 'priority', 'active'] + self._sla_reset_trigger()
+
     @api.model
     def _sla_reset_trigger(self):
         """ Get the list of field for which we have to reset the SLAs (regenerate) """
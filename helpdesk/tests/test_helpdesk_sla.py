@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
+import math
 from contextlib import contextmanager
 from unittest.mock import patch
 from dateutil.relativedelta import relativedelta
 from datetime import datetime
 
 from odoo import fields
+from odoo.addons.helpdesk.models.helpdesk_ticket import CalendarPlanner
 from odoo.tests.common import TransactionCase
 
 NOW = datetime(2018, 10, 10, 9, 18)
@@ -244,3 +246,100 @@ class HelpdeskSLA(TransactionCase):
         data = self.env['helpdesk.team'].retrieve_dashboard()
         self.assertEqual(data['my_all']['count'], 2, "There should be 2 tickets")
         self.assertEqual(data['my_all']['failed'], 1, "There should be 1 failed ticket")
+
+    @patch.object(fields.Date, 'today', lambda: NOW.date())
+    @patch.object(fields.Datetime, 'today', lambda: NOW.replace(hour=0, minute=0, second=0))
+    @patch.object(fields.Datetime, 'now', lambda: NOW)
+    def test_dashboard_counters(self):
+        self.sla.time = 3
+        ticket = self.create_ticket(user_id=self.env.user.id, create_date=NOW - relativedelta(hours=2, minutes=2))
+        data = self.env['helpdesk.team'].retrieve_dashboard()
+        self.assertEqual(data['my_all']['count'], 1)
+        self.assertEqual(data['my_all']['failed'], 0)
+        self.assertEqual(data['today']['count'], 0)
+
+        # the counters are invalidated when a ticket changes
+        counters = self.env['helpdesk.dashboard.counter'].sudo().search([('user_id', '=', self.env.user.id)])
+        self.assertTrue(all(counters.mapped('valid_until')))
+        self.create_ticket(user_id=self.env.user.id, priority='3')
+        self.assertFalse(any(counters.mapped('valid_until')))
+        data = self.env['helpdesk.team'].retrieve_dashboard()
+        self.assertEqual(data['my_all']['count'], 2)
+        self.assertEqual(data['my_urgent']['count'], 1)
+        ticket.write({'stage_id': self.stage_done.id})
+        data = self.env['helpdesk.team'].retrieve_dashboard()
+        self.assertEqual(data['my_all']['count'], 1)
+        self.assertEqual(data['today']['count'], 1)
+
+        # and expire when an SLA deadline is over
+        with patch.object(fields.Datetime, 'now', lambda: NOW + relativedelta(days=1)):
+            data = self.env['helpdesk.team'].retrieve_dashboard()
+        self.assertEqual(data['my_all']['failed'], 1)
+
+    @patch.object(fields.Date, 'today', lambda: NOW.date())
+    @patch.object(fields.Datetime, 'today', lambda: NOW.replace(hour=0, minute=0, second=0))
+    @patch.object(fields.Datetime, 'now', lambda: NOW)
+    def test_dashboard_counters_companies(self):
+        """ The counters of a user should only include the tickets of the allowed companies """
+        company_2 = self.env['res.company'].create({'name': 'Company 2'})
+        self.env.user.company_ids |= company_2
+        team_2 = self.env['helpdesk.team'].create({'name': 'Team 2', 'company_id': company_2.id})
+        ticket_1 = self.create_ticket(user_id=self.env.user.id)
+        ticket_2 = self.create_ticket(user_id=self.env.user.id, team_id=team_2.id)
+        self._utils_set_create_date(ticket_1, NOW - relativedelta(hours=2))
+        self._utils_set_create_date(ticket_2, NOW - relativedelta(hours=5))
+        # the open hours of a ticket with a close date stop at its close date
+        ticket_2.close_date = NOW - relativedelta(hours=1)
+
+        Team = self.env['helpdesk.team']
+        data = Team.with_context(allowed_company_ids=[self.main_company_id]).retrieve_dashboard()
+        self.assertEqual(data['my_all']['count'], 1)
+        self.assertAlmostEqual(data['my_all']['hours'], 2)
+        data = Team.with_context(allowed_company_ids=[self.main_company_id, company_2.id]).retrieve_dashboard()
+        self.assertEqual(data['my_all']['count'], 2)
+        # the average of the open hours
+        self.assertAlmostEqual(data['my_all']['hours'], 3)
+
+    def test_sla_deadline_batch(self):
+        """ Deadlines computed for many tickets at once should match the ones given by the calendar """
+        calendar = self.test_team.resource_calendar_id
+        self.env['resource.calendar.leaves'].create({
+            'name': 'Public Holiday',
+            'calendar_id': calendar.id,
+            'date_from': datetime(2019, 1, 15, 0, 0),
+            'date_to': datetime(2019, 1, 15, 23, 59),
+        })
+        self.sla.tag_ids = [(5,)]
+        tickets = self.env['helpdesk.ticket']
+        for _i in range(6):
+            tickets |= self.create_ticket(tag_ids=self.tag_urgent)
+        create_dates = ['2019-01-07 08:00:00', '2019-01-08 17:30:00', '2019-01-11 13:12:14', '2019-01-12 10:00:00', '2019-01-14 23:00:00', '2019-03-01 09:45:00']
+        for ticket, create_date in zip(tickets, create_dates):
+            self._utils_set_create_date(ticket, create_date)
+        statuses = tickets.sla_status_ids.filtered(lambda status: status.sla_id == self.sla)
+        statuses.deadline = False
+        statuses._compute_deadline()
+
+        avg_hour = calendar.hours_per_day or 8
+        for status in statuses:
+            create_date = status.ticket_id.create_date
+            deadline = calendar.plan_days(math.floor(self.sla.time / avg_hour) + 1, create_date, compute_leaves=True)
+            deadline = deadline.replace(hour=create_date.hour, minute=create_date.minute, second=create_date.second, microsecond=create_date.microsecond)
+            deadline = calendar.plan_hours(self.sla.time % avg_hour, deadline, compute_leaves=True)
+            self.assertEqual(status.deadline, deadline)
+
+    def test_calendar_planner_timezone(self):
+        """ The planner should count the days in the timezone of the calendar, as the calendar does """
+        calendar = self.test_team.resource_calendar_id.copy({'tz': 'Asia/Tokyo'})
+        planner = CalendarPlanner(calendar, datetime(2019, 1, 1))
+        # the working hours of Tokyo cross the UTC midnight
+        for day_dt in [datetime(2019, 1, 7, 1, 0), datetime(2019, 1, 8, 23, 30), datetime(2019, 1, 11, 15, 0)]:
+            for days in [1, 2, 5, 20]:
+                self.assertEqual(planner.plan_days(days, day_dt), calendar.plan_days(days, day_dt, compute_leaves=True))
+            for hours in [1, 10, 100]:
+                self.assertEqual(planner.plan_hours(hours, day_dt), calendar.plan_hours(hours, day_dt, compute_leaves=True))
+            end_dt = day_dt + relativedelta(days=3)
+            self.assertAlmostEqual(
+                planner.get_work_hours_count(day_dt, end_dt),
+                calendar.get_work_hours_count(day_dt, end_dt, compute_leaves=True),
+            )
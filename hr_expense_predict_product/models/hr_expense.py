@@ -6,6 +6,10 @@ from odoo import api, fields, models, _
 from psycopg2 import ProgrammingError, errorcodes
 import re
 
+# Text search configurations used for the predictions, see `_get_predict_postgres_dictionary`
+PREDICT_DICTIONARIES = ('english', 'french')
+
+
 class HrExpense(models.Model):
     _inherit = ['hr.expense']
 
@@ -52,63 +56,58 @@ class HrExpense(models.Model):
         return False
 
 
+    def init(self):
+        # The documents of the done expenses are indexed, see `_predict_product`
+        for lang in PREDICT_DICTIONARIES:
+            for column in ('name', 'predicted_category'):
+                self._cr.execute("""
+                    CREATE INDEX IF NOT EXISTS hr_expense_predict_%(column)s_%(lang)s_idx
+                        ON hr_expense USING gin (to_tsvector('%(lang)s'::regconfig, %(column)s))
+                     WHERE state = 'done'
+                """ % {'column': column, 'lang': lang})
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS hr_expense_predict_company_date_idx
+                ON hr_expense (company_id, date DESC)
+             WHERE state = 'done'
+        """)
+
     def _predict_product(self, description, category = False):
         if not description:
             return False
-        if not category: 
-            sql_query = """
-                SELECT
-                    max(f.rel) AS ranking,
-                    f.product_id,
-                    count(coalesce(f.product_id, 1)) AS count
-                FROM (
-                    SELECT
-                        p_search.product_id,
-                        ts_rank(p_search.document, query_plain) AS rel
-                    FROM (
-                        SELECT
-                            expense.product_id,
-                            (setweight(to_tsvector(%(lang)s, expense.name), 'B'))
-                            AS document
-                        FROM hr_expense expense
-                        WHERE expense.state = 'done'
-                            AND expense.company_id = %(company_id)s
-                        ORDER BY expense.date DESC
-                        LIMIT %(limit_parameter)s
-                    ) p_search,
-                    to_tsquery(%(lang)s, %(description)s) query_plain
-                    WHERE (p_search.document @@ query_plain)
-                ) AS f
-                GROUP BY f.product_id
-                ORDER BY ranking desc, count desc
-            """
-        else:
-            sql_query = """
+        # Only the most recent expenses are used: instead of building the documents of all of
+        # them, the matching ones are found with the indexes, from the date of the oldest one.
+        column = 'predicted_category' if category else 'name'
+        weight = 'A' if category else 'B'
+        psql_lang = self._get_predict_postgres_dictionary()
+        document = "to_tsvector('%s'::regconfig, expense.%s)" % (psql_lang, column)
+        sql_query = """
+            WITH oldest AS (
+                SELECT expense.date
+                  FROM hr_expense expense
+                 WHERE expense.state = 'done'
+                   AND expense.company_id = %%(company_id)s
+              ORDER BY expense.date DESC
+                OFFSET GREATEST(%%(limit_parameter)s - 1, 0)
+                 LIMIT 1
+            )
+            SELECT
+                max(f.rel) AS ranking,
+                f.product_id,
+                count(coalesce(f.product_id, 1)) AS count
+            FROM (
                 SELECT
-                    max(f.rel) AS ranking,
-                    f.product_id,
-                    count(coalesce(f.product_id, 1)) AS count
-                FROM (
-                    SELECT
-                        p_search.product_id,
-                        ts_rank(p_search.document, query_plain) AS rel
-                    FROM (
-                        SELECT
-                            expense.product_id,
-                            (setweight(to_tsvector(%(lang)s, expense.predicted_category), 'A'))
-                            AS document
-                        FROM hr_expense expense
-                        WHERE expense.state = 'done'
-                            AND expense.company_id = %(company_id)s
-                        ORDER BY expense.date DESC
-                        LIMIT %(limit_parameter)s
-                    ) p_search,
-                    to_tsquery(%(lang)s,  %(description)s) query_plain
-                    WHERE (p_search.document @@ query_plain)
-                ) AS f
-                GROUP BY f.product_id
-                ORDER BY ranking desc, count desc
-            """
+                    expense.product_id,
+                    ts_rank(setweight(%(document)s, '%(weight)s'), query_plain) AS rel
+                FROM hr_expense expense,
+                    to_tsquery(%%(lang)s, %%(description)s) query_plain
+                WHERE expense.state = 'done'
+                    AND expense.company_id = %%(company_id)s
+                    AND expense.date >= COALESCE((SELECT date FROM oldest), '-infinity'::date)
+                    AND %(document)s @@ query_plain
+            ) AS f
+            GROUP BY f.product_id
+            ORDER BY ranking desc, count desc
+        """ % {'document': document, 'weight': weight}
         return self._predict_field(sql_query, description, category)
 
     @api.onchange('name')
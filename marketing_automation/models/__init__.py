@@ -2,6 +2,7 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 from . import marketing_activity
+from . import marketing_activity_execution
 from . import marketing_campaign
 from . import marketing_participant
 from . import marketing_trace
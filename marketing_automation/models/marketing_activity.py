@@ -4,8 +4,10 @@
 import json
 import logging
 import threading
+import time
 
 from ast import literal_eval
+from collections import defaultdict, deque
 from datetime import timedelta, date, datetime
 from dateutil.relativedelta import relativedelta
 
@@ -16,6 +18,8 @@ from odoo.osv import expression
 
 _logger = logging.getLogger(__name__)
 
+EXECUTE_BATCH_SIZE = 500  # same batch size as the MailComposer
+
 
 
 class MarketingActivity(models.Model):
@@ -38,6 +42,10 @@ class MarketingActivity(models.Model):
     server_action_id = fields.Many2one(
         'ir.actions.server', string='Server Action', compute='_compute_server_action_id',
         readonly=False, store=True)
+    server_action_batch = fields.Boolean(
+        'Run in Batch',
+        help='Run the server action once for all the records processed together instead of once per record. '
+             'If it fails, it is run again record by record.')
     utm_source_id = fields.Many2one('utm.source', 'Source', ondelete='cascade', required=True)
     campaign_id = fields.Many2one(
         'marketing.campaign', string='Campaign',
@@ -306,34 +314,96 @@ class MarketingActivity(models.Model):
         return graph_data
 
     def execute(self, domain=None):
+        """ Execute the due traces of the activities, by batches.
+
+        Campaigns are served in a round-robin way, one batch of one of their
+        activities at a time, so that a large wave of traces in a campaign
+        does not delay the other ones. Each batch is claimed with a
+        ``FOR UPDATE SKIP LOCKED`` lock: several cron workers can execute the
+        activities at the same time without processing a trace twice.
+        """
         # auto-commit except in testing mode
         auto_commit = not getattr(threading.currentThread(), 'testing', False)
+        now = Datetime.now()
         trace_domain = [
-            ('schedule_date', '<=', Datetime.now()),
+            ('schedule_date', '<=', now),
             ('state', '=', 'scheduled'),
-            ('activity_id', 'in', self.ids),
             ('participant_id.state', '=', 'running'),
         ]
         if domain:
             trace_domain += domain
 
-        traces = self.env['marketing.trace'].search(trace_domain)
+        # traces created while executing (children traces) are left to the next run
+        self.env.cr.execute("SELECT MAX(id) FROM marketing_trace")
+        max_trace_id = self.env.cr.fetchone()[0]
+        if not max_trace_id:
+            return
 
-        # organize traces by activity
-        trace_to_activities = dict()
-        for trace in traces:
-            if trace.activity_id not in trace_to_activities:
-                trace_to_activities[trace.activity_id] = trace
-            else:
-                trace_to_activities[trace.activity_id] |= trace
-
-        # execute activity on their traces
-        BATCH_SIZE = 500  # same batch size as the MailComposer
-        for activity, traces in trace_to_activities.items():
-            for traces_batch in (traces[i:i + BATCH_SIZE] for i in range(0, len(traces), BATCH_SIZE)):
-                activity.execute_on_traces(traces_batch)
+        activities_per_campaign = defaultdict(deque)
+        for activity in self:
+            activities_per_campaign[activity.campaign_id].append(activity)
+        campaigns = deque(activities_per_campaign)
+        # id of the last trace claimed by activity, the next batch starts after it
+        last_trace_ids = dict.fromkeys(self.ids, 0)
+        workers_triggered = False
+
+        while campaigns:
+            campaign = campaigns.popleft()
+            activities = activities_per_campaign[campaign]
+            activity = activities.popleft()
+            traces = activity._claim_traces(expression.AND([
+                trace_domain,
+                [('id', '>', last_trace_ids[activity.id]), ('id', '<=', max_trace_id)],
+            ]), EXECUTE_BATCH_SIZE)
+            if traces:
+                last_trace_ids[activity.id] = max(traces.ids)
+                activities.append(activity)
+                if auto_commit and not workers_triggered and len(traces) == EXECUTE_BATCH_SIZE:
+                    self._trigger_execute_workers()
+                    workers_triggered = True
+                activity._execute_on_traces_with_metrics(traces, now)
                 if auto_commit:
                     self.env.cr.commit()
+            if activities:
+                campaigns.append(campaign)
+
+    def _claim_traces(self, domain, limit):
+        """ Lock and return at most ``limit`` traces of the activity matching
+        ``domain``. Traces locked by another transaction are skipped. """
+        self.ensure_one()
+        query = self.env['marketing.trace']._search(
+            expression.AND([domain, [('activity_id', '=', self.id)]]),
+            order='id', limit=limit,
+        )
+        query_str, params = query.select('"marketing_trace"."id"')
+        self.env.cr.execute(query_str + ' FOR UPDATE OF "marketing_trace" SKIP LOCKED', params)
+        return self.env['marketing.trace'].browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _execute_on_traces_with_metrics(self, traces, now):
+        """ Execute the activity on ``traces`` and log the throughput of the batch. """
+        self.ensure_one()
+        latency = sum((now - trace.schedule_date).total_seconds() for trace in traces) / len(traces)
+        start = time.time()
+        self.execute_on_traces(traces)
+        duration = time.time() - start
+        self.env['marketing.activity.execution'].sudo().create({
+            'activity_id': self.id,
+            'execution_date': now,
+            'trace_count': len(traces),
+            'error_count': len(traces.filtered(lambda trace: trace.state == 'error')),
+            'duration': duration,
+            'latency': latency,
+        })
+
+    @api.model
+    def _trigger_execute_workers(self):
+        """ Wake up the additional workers, they share the remaining traces
+        with the current one. """
+        for xmlid in ('marketing_automation.ir_cron_campaign_execute_activities_worker_2',
+                      'marketing_automation.ir_cron_campaign_execute_activities_worker_3'):
+            cron = self.env.ref(xmlid, raise_if_not_found=False)
+            if cron and cron.active:
+                cron._trigger()
 
     def execute_on_traces(self, traces):
         """ Execute current activity on given traces.
@@ -355,10 +425,11 @@ class MarketingActivity(models.Model):
         if self.domain:
             rec_domain = expression.AND([literal_eval(self.campaign_id.domain), literal_eval(self.domain)])
         else:
-            rec_domain = literal_eval(self.campaign_id.filter)
+            rec_domain = literal_eval(self.campaign_id.domain)
         if rec_domain:
-            rec_valid = self.env[self.model_name].search(rec_domain)
-            rec_ids_domain = set(rec_valid.ids)
+            # only check the records of the traces, not the whole model
+            rec_domain = expression.AND([rec_domain, [('id', 'in', list(set(traces.mapped('res_id'))))]])
+            rec_ids_domain = set(self.env[self.model_name].search(rec_domain).ids)
 
             traces_allowed = traces.filtered(lambda trace: trace.res_id in rec_ids_domain or trace.is_test)
             traces_rejected = traces.filtered(lambda trace: trace.res_id not in rec_ids_domain and not trace.is_test)  # either rejected, either deleted record
@@ -385,6 +456,9 @@ class MarketingActivity(models.Model):
         if not self.server_action_id:
             return False
 
+        if self.server_action_batch and len(traces) > 1 and self._execute_action_batch(traces):
+            return True
+
         # Do a loop here because we have to try / catch each execution separately to ensure other traces are executed
         # and proper state message stored
         traces_ok = self.env['marketing.trace']
@@ -413,6 +487,30 @@ class MarketingActivity(models.Model):
         })
         return True
 
+    def _execute_action_batch(self, traces):
+        """ Run the server action once on the records of all ``traces``.
+
+        :return: False if the action failed, in which case nothing has been done
+          and the traces have to be executed one by one
+        """
+        res_ids = list(set(traces.mapped('res_id')))
+        action = self.server_action_id.with_context(
+            active_model=self.model_name,
+            active_ids=res_ids,
+            active_id=res_ids[0],
+        )
+        try:
+            with self.env.cr.savepoint():
+                action.run()
+        except Exception as e:
+            _logger.info('Marketing Automation: activity <%s> encountered server action issue in batch, running it record by record: %s', self.id, str(e))
+            return False
+        traces.write({
+            'state': 'processed',
+            'schedule_date': Datetime.now(),
+        })
+        return True
+
     def _execute_email(self, traces):
         res_ids = [r for r in set(traces.mapped('res_id'))]
 
@@ -470,7 +568,7 @@ class MarketingActivity(models.Model):
     def _generate_children_traces(self, traces):
         """Generate child traces for child activities and compute their schedule date except for mail_open,
         mail_click, mail_reply, mail_bounce which are computed when processing the mail event """
-        child_traces = self.env['marketing.trace']
+        child_traces_vals = []
         cron_trigger_dates = set()
         for activity in self.child_ids:
             activity_offset = relativedelta(**{activity.interval_type: activity.interval_number})
@@ -485,7 +583,8 @@ class MarketingActivity(models.Model):
                     schedule_date = Datetime.from_string(trace.schedule_date) + activity_offset
                     vals['schedule_date'] = schedule_date
                     cron_trigger_dates.add(schedule_date)
-                child_traces |= child_traces.create(vals)
+                child_traces_vals.append(vals)
+        child_traces = self.env['marketing.trace'].create(child_traces_vals)
 
         if cron_trigger_dates:
             # based on created activities, we schedule CRON triggers that match the scheduled_dates
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import fields, models
+
+
+class MarketingActivityExecution(models.Model):
+    """ Throughput metrics of the scheduler, one line per batch of traces
+    executed by an activity. Lines are only inserted, so that the workers
+    executing the same activity never wait on each other. """
+    _name = 'marketing.activity.execution'
+    _description = 'Marketing Activity Execution'
+    _order = 'execution_date DESC, id DESC'
+    _rec_name = 'activity_id'
+
+    activity_id = fields.Many2one(
+        'marketing.activity', string='Activity',
+        index=True, ondelete='cascade', required=True)
+    campaign_id = fields.Many2one(
+        'marketing.campaign', string='Campaign', related='activity_id.campaign_id',
+        index=True, store=True, readonly=True)
+    execution_date = fields.Datetime('Execution Date', required=True, default=fields.Datetime.now)
+    trace_count = fields.Integer('Processed Traces')
+    error_count = fields.Integer('Errors')
+    duration = fields.Float('Duration (seconds)', group_operator='sum')
+    latency = fields.Float(
+        'Latency (seconds)', group_operator='avg',
+        help='Average delay between the scheduled date of the traces and their execution')
@@ -4,11 +4,16 @@
 import threading
 
 from ast import literal_eval
+from datetime import timedelta
 from dateutil.relativedelta import relativedelta
 
 from odoo import api, fields, models, tools, _
 from odoo.fields import Datetime
 from odoo.exceptions import ValidationError
+from odoo.osv import expression
+
+# records written by a transaction are only visible once it is committed
+PARTICIPANTS_SYNC_MARGIN = timedelta(hours=1)
 
 
 class MarketingCampaign(models.Model):
@@ -43,6 +48,7 @@ class MarketingCampaign(models.Model):
     mass_mailing_count = fields.Integer('# Mailings', compute='_compute_mass_mailing_count')
     link_tracker_click_count = fields.Integer('# Clicks', compute='_compute_link_tracker_click_count')
     last_sync_date = fields.Datetime(string='Last activities synchronization')
+    participants_sync_date = fields.Datetime(string='Last participants synchronization', copy=False)
     require_sync = fields.Boolean(string="Sync of participants is required", compute='_compute_require_sync')
     # participants
     participant_ids = fields.One2many('marketing.participant', 'campaign_id', string='Participants', copy=False)
@@ -134,6 +140,12 @@ class MarketingCampaign(models.Model):
             vals.update({'is_auto_campaign': True})
         return super(MarketingCampaign, self).create(vals_list)
 
+    def write(self, vals):
+        # the next synchronization of participants has to consider all the records
+        if any(field_name in vals for field_name in ['model_id', 'domain', 'unique_field_id']):
+            vals['participants_sync_date'] = False
+        return super(MarketingCampaign, self).write(vals)
+
     @api.onchange('model_id')
     def _onchange_model_id(self):
         if any(campaign.marketing_activity_ids for campaign in self):
@@ -266,11 +278,11 @@ class MarketingCampaign(models.Model):
 
     def sync_participants(self):
         """ Creates new participants, taking into account already-existing ones
-        as well as campaign filter and unique field. """
-        def _uniquify_list(seq):
-            seen = set()
-            return [x for x in seq if x not in seen and not seen.add(x)]
+        as well as campaign filter and unique field.
 
+        New and removed participants are computed in SQL against the query of
+        the campaign filter, see ``_get_records_to_sync`` and
+        ``_get_participants_to_unlink``. """
         participants = self.env['marketing.participant']
         # auto-commit except in testing mode
         auto_commit = not getattr(threading.currentThread(), 'testing', False)
@@ -279,33 +291,8 @@ class MarketingCampaign(models.Model):
             if not campaign.last_sync_date:
                 campaign.last_sync_date = now
 
-            RecordModel = self.env[campaign.model_name]
-
-            # Fetch existing participants
-            participants_data = participants.search_read([('campaign_id', '=', campaign.id)], ['res_id'])
-            existing_rec_ids = _uniquify_list([live_participant['res_id'] for live_participant in participants_data])
-
             record_domain = literal_eval(campaign.domain or "[]")
-            db_rec_ids = _uniquify_list(RecordModel.search(record_domain).ids)
-            to_create = [rid for rid in db_rec_ids if rid not in existing_rec_ids]  # keep ordered IDs
-            to_remove = set(existing_rec_ids) - set(db_rec_ids)
-            unique_field = campaign.unique_field_id.sudo()
-            if unique_field.name != 'id':
-                without_duplicates = []
-                existing_records = RecordModel.with_context(prefetch_fields=False).browse(existing_rec_ids).exists()
-                # Split the read in batch of 1000 to avoid the prefetch
-                # crawling the cache for the next 1000 records to fetch
-                unique_field_vals = {rec[unique_field.name]
-                                        for index in range(0, len(existing_records), 1000)
-                                        for rec in existing_records[index:index+1000]}
-
-                for rec in RecordModel.with_context(prefetch_fields=False).browse(to_create):
-                    field_val = rec[unique_field.name]
-                    # we exclude the empty recordset with the first condition
-                    if (not unique_field.relation or field_val) and field_val not in unique_field_vals:
-                        without_duplicates.append(rec.id)
-                        unique_field_vals.add(field_val)
-                to_create = without_duplicates
+            to_create = campaign._get_records_to_sync(record_domain)
 
             BATCH_SIZE = 100
             for to_create_batch in tools.split_every(BATCH_SIZE, to_create, piece_maker=list):
@@ -317,21 +304,152 @@ class MarketingCampaign(models.Model):
                 if auto_commit:
                     self.env.cr.commit()
 
-            if to_remove:
-                participants_to_unlink = participants.search([
-                    ('res_id', 'in', list(to_remove)),
-                    ('campaign_id', '=', campaign.id),
-                    ('state', '!=', 'unlinked'),
-                ])
-                for index in range(0, len(participants_to_unlink), 1000):
-                    participants_to_unlink[index:index+1000].action_set_unlink()
-                    # Commit only every 100 operation to avoid committing to often
-                    # this mean every 10k record. It should be ok, it takes 1sec second to process 10k
-                    if not index % (BATCH_SIZE * 100):
-                        self.env.cr.commit()
+            participants_to_unlink = campaign._get_participants_to_unlink(record_domain)
+            campaign.participants_sync_date = now
+            for index in range(0, len(participants_to_unlink), 1000):
+                participants_to_unlink[index:index+1000].action_set_unlink()
+                # Commit only every 100 operation to avoid committing to often
+                # this mean every 10k record. It should be ok, it takes 1sec second to process 10k
+                if not index % (BATCH_SIZE * 100):
+                    self.env.cr.commit()
 
         return participants
 
+    def _get_participants_sync_start(self, record_domain):
+        """ Return the date from which the modified records have to be considered
+        for new participants, or False if all the records have to be considered.
+
+        Only the records modified since the previous synchronization may start
+        matching the filter, as long as it only depends on stored fields of the
+        target model. The unique field also requires a full synchronization, as
+        removing a duplicate may allow a record which was not modified. """
+        self.ensure_one()
+        RecordModel = self.env[self.model_name]
+        if not self.participants_sync_date or not RecordModel._log_access:
+            return False
+        if self.unique_field_id and self.unique_field_id.name != 'id':
+            return False
+        for leaf in expression.normalize_domain(record_domain):
+            if not expression.is_leaf(leaf) or leaf in (expression.TRUE_LEAF, expression.FALSE_LEAF):
+                continue
+            field = RecordModel._fields.get(leaf[0]) if isinstance(leaf[0], str) else None
+            if not field or not field.store or field.type == 'one2many' or leaf[1] in ('child_of', 'parent_of'):
+                return False
+        return self.participants_sync_date - PARTICIPANTS_SYNC_MARGIN
+
+    def _get_records_to_sync(self, record_domain):
+        """ Return the ordered ids of the records matching ``record_domain`` which
+        are not participants yet, without the duplicates on the unique field. """
+        self.ensure_one()
+        RecordModel = self.env[self.model_name]
+        sync_start = self._get_participants_sync_start(record_domain)
+        if sync_start:
+            record_domain = expression.AND([record_domain, [('write_date', '>=', sync_start)]])
+        records_query, records_params = RecordModel._search(record_domain).subselect()
+        self.env['marketing.participant'].flush(['campaign_id', 'res_id'])
+
+        unique_field = self.unique_field_id.sudo()
+        field = RecordModel._fields.get(unique_field.name) if unique_field else None
+        if not field or field.name == 'id':
+            self.env.cr.execute("""
+                SELECT record.id
+                  FROM (%s) AS record
+                 WHERE NOT EXISTS (
+                        SELECT 1
+                          FROM marketing_participant participant
+                         WHERE participant.campaign_id = %%s AND participant.res_id = record.id)
+              ORDER BY record.id
+            """ % records_query, records_params + [self.id])
+            return [row[0] for row in self.env.cr.fetchall()]
+
+        if not field.store or not field.column_type or getattr(field, 'translate', False):
+            return self._get_records_to_sync_unique_orm(record_domain, field)
+
+        # ORM values of empty integers are 0, empty relational values are never unique
+        value = '"%s"."%s"' if field.type != 'integer' else 'COALESCE("%s"."%s", 0)'
+        self.env.cr.execute("""
+            WITH candidate AS (
+                SELECT record.id, {record_value} AS value
+                  FROM "{table}" record
+                 WHERE record.id IN ({records_query})
+                   AND NOT EXISTS (
+                        SELECT 1
+                          FROM marketing_participant participant
+                         WHERE participant.campaign_id = %s AND participant.res_id = record.id)
+            ), existing AS (
+                SELECT DISTINCT {existing_value} AS value
+                  FROM marketing_participant participant
+                  JOIN "{table}" existing ON existing.id = participant.res_id
+                 WHERE participant.campaign_id = %s
+            ), allowed AS (
+                SELECT candidate.id, candidate.value
+                  FROM candidate
+                 WHERE candidate.value IS NOT NULL
+                   AND NOT EXISTS (SELECT 1 FROM existing WHERE existing.value = candidate.value)
+             UNION ALL
+                SELECT candidate.id, candidate.value
+                  FROM candidate
+                 WHERE candidate.value IS NULL AND %s
+                   AND NOT EXISTS (SELECT 1 FROM existing WHERE existing.value IS NULL)
+            )
+            SELECT unique_candidate.id
+              FROM (SELECT DISTINCT ON (allowed.value) allowed.id FROM allowed ORDER BY allowed.value, allowed.id) AS unique_candidate
+          ORDER BY unique_candidate.id
+        """.format(
+            table=RecordModel._table,
+            records_query=records_query,
+            record_value=value % ('record', field.name),
+            existing_value=value % ('existing', field.name),
+        ), records_params + [self.id, self.id, not field.relational])
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    def _get_records_to_sync_unique_orm(self, record_domain, field):
+        """ Fallback of ``_get_records_to_sync`` when the unique field is not a
+        simple column: the duplicates are filtered on the values read by the ORM. """
+        RecordModel = self.env[self.model_name].with_context(prefetch_fields=False)
+        participants_data = self.env['marketing.participant'].search_read([('campaign_id', '=', self.id)], ['res_id'])
+        existing_rec_ids = {participant['res_id'] for participant in participants_data}
+        to_create = [rec_id for rec_id in RecordModel.search(record_domain, order='id').ids if rec_id not in existing_rec_ids]
+
+        existing_records = RecordModel.browse(existing_rec_ids).exists()
+        # Split the read in batch of 1000 to avoid the prefetch
+        # crawling the cache for the next 1000 records to fetch
+        unique_field_vals = {rec[field.name]
+                                for index in range(0, len(existing_records), 1000)
+                                for rec in existing_records[index:index+1000]}
+        without_duplicates = []
+        for rec in RecordModel.browse(to_create):
+            field_val = rec[field.name]
+            # we exclude the empty recordset with the first condition
+            if (not field.relational or field_val) and field_val not in unique_field_vals:
+                without_duplicates.append(rec.id)
+                unique_field_vals.add(field_val)
+        return without_duplicates
+
+    def _get_participants_to_unlink(self, record_domain):
+        """ Return the participants whose record does not match ``record_domain`` anymore. """
+        self.ensure_one()
+        RecordModel = self.env[self.model_name]
+        from_clause, where_clause, where_params = RecordModel._search(record_domain).get_sql()
+        self.env['marketing.participant'].flush(['campaign_id', 'res_id', 'state'])
+        # anti-join on the records, the main table of the query is aliased by its name
+        self.env.cr.execute("""
+            SELECT participant.id
+              FROM marketing_participant participant
+             WHERE participant.campaign_id = %s
+               AND participant.state != 'unlinked'
+               AND NOT EXISTS (
+                    SELECT 1
+                      FROM {from_clause}
+                     WHERE "{table}".id = participant.res_id
+                       AND {where_clause})
+          ORDER BY participant.id
+        """.format(
+            from_clause=from_clause,
+            table=RecordModel._table,
+            where_clause=where_clause or 'TRUE',
+        ), [self.id] + where_params)
+        return self.env['marketing.participant'].browse([row[0] for row in self.env.cr.fetchall()])
+
     def execute_activities(self):
-        for campaign in self:
-            campaign.marketing_activity_ids.execute()
+        self.marketing_activity_ids.execute()
@@ -85,29 +85,25 @@ class MarketingParticipant(models.Model):
     def create(self, vals_list):
         participants = super().create(vals_list)
         now = Datetime.now()
-        cron_trigger_dates = set()
-        for res in participants:
-            # prepare first traces related to begin activities
-            primary_activities = res.campaign_id.marketing_activity_ids.filtered(lambda act: act.trigger_type == 'begin')
-            trace_ids = [
-                (0, 0, {
-                    'activity_id': activity.id,
-                    'schedule_date': now + relativedelta(**{activity.interval_type: activity.interval_number}),
-                }) for activity in primary_activities]
-            res.write({'trace_ids': trace_ids})
-
-            cron_trigger_dates |= set([
-                now + relativedelta(**{activity.interval_type: activity.interval_number})
-                for activity in primary_activities
-            ])
-
-        if cron_trigger_dates:
+        # prepare first traces related to begin activities, created in batch
+        primary_activities_per_campaign = {
+            campaign: campaign.marketing_activity_ids.filtered(lambda act: act.trigger_type == 'begin')
+            for campaign in participants.campaign_id
+        }
+        trace_vals_list = [{
+            'participant_id': participant.id,
+            'activity_id': activity.id,
+            'schedule_date': now + relativedelta(**{activity.interval_type: activity.interval_number}),
+        } for participant in participants for activity in primary_activities_per_campaign[participant.campaign_id]]
+        if trace_vals_list:
+            self.env['marketing.trace'].create(trace_vals_list)
+
             # based on activities with 'begin' trigger_type, we schedule CRON triggers
             # that match the scheduled_dates of created marketing.traces
             # we use a set to only trigger the CRON once per timeslot event if there are multiple
             # marketing.participants
             cron = self.env.ref('marketing_automation.ir_cron_campaign_execute_activities')
-            cron._trigger(cron_trigger_dates)
+            cron._trigger({trace_vals['schedule_date'] for trace_vals in trace_vals_list})
 
         return participants
 
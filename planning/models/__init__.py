@@ -7,4 +7,5 @@ from . import planning
 from . import planning_template
 from . import res_company
 from . import res_config_settings
+from . import resource_calendar
 from . import resource_resource
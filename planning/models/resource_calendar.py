@@ -0,0 +1,100 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+from itertools import chain
+
+from pytz import timezone, utc
+
+from odoo import api, models, tools
+
+
+def unavailable_intervals(work_intervals, start_dt, end_dt):
+    """ Return the complement of ``work_intervals`` in ``(start_dt, end_dt)`` as a list of UTC (start, stop) tuples,
+        in the same form as ``resource.calendar._unavailable_intervals_batch``.
+    """
+    boundaries = [start_dt] + list(chain.from_iterable(
+        (start, stop) for start, stop, *_meta in work_intervals
+    )) + [end_dt]
+    boundaries = [dt.astimezone(utc) for dt in boundaries]
+    return list(zip(boundaries[0::2], boundaries[1::2]))
+
+
+class ResourceCalendar(models.Model):
+    _inherit = 'resource.calendar'
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.clear_caches()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.clear_caches()
+        return res
+
+    @api.model
+    @tools.ormcache('calendar_id', 'start_dt', 'end_dt')
+    def _get_gantt_work_intervals(self, calendar_id, start_dt, end_dt):
+        """ Return the work intervals shared by every resource of the calendar between ``start_dt`` and ``end_dt``,
+            i.e. the generic attendances minus the leaves that are not linked to a resource, expressed in the
+            calendar timezone.
+
+            The result is cached per (calendar, period) and invalidated when the calendar, its attendances or
+            its global leaves are modified.
+        """
+        calendar = self.browse(calendar_id).sudo()
+        work_intervals = calendar._work_intervals_batch(start_dt, end_dt, tz=timezone(calendar.tz))[False]
+        return tuple((start, stop) for start, stop, _meta in work_intervals)
+
+    def _get_gantt_unavailable_intervals(self, start_dt, end_dt):
+        """ Cached equivalent of ``_unavailable_intervals`` used by the gantt views. """
+        self.ensure_one()
+        start_dt = start_dt if start_dt.tzinfo else start_dt.replace(tzinfo=utc)
+        end_dt = end_dt if end_dt.tzinfo else end_dt.replace(tzinfo=utc)
+        return unavailable_intervals(self._get_gantt_work_intervals(self.id, start_dt, end_dt), start_dt, end_dt)
+
+
+class ResourceCalendarAttendance(models.Model):
+    _inherit = 'resource.calendar.attendance'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        attendances = super().create(vals_list)
+        self.clear_caches()
+        return attendances
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.clear_caches()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.clear_caches()
+        return res
+
+
+class ResourceCalendarLeaves(models.Model):
+    _inherit = 'resource.calendar.leaves'
+
+    # Only the leaves which are not linked to a resource are part of the cached
+    # calendar work intervals, the other ones are applied on each request.
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        leaves = super().create(vals_list)
+        if any(not leave.resource_id for leave in leaves):
+            self.clear_caches()
+        return leaves
+
+    def write(self, vals):
+        global_leaves = any(not leave.resource_id for leave in self)
+        res = super().write(vals)
+        if global_leaves or any(not leave.resource_id for leave in self):
+            self.clear_caches()
+        return res
+
+    def unlink(self):
+        global_leaves = any(not leave.resource_id for leave in self)
+        res = super().unlink()
+        if global_leaves:
+            self.clear_caches()
+        return res
@@ -9,6 +9,8 @@ from odoo.tools.misc import DEFAULT_SERVER_DATETIME_FORMAT
 
 from odoo.addons.resource.models.resource import Intervals
 
+from .resource_calendar import unavailable_intervals
+
 class ResourceResource(models.Model):
     _inherit = 'resource.resource'
 
@@ -148,3 +150,60 @@ class ResourceResource(models.Model):
                 work_intervals_per_resource[resource_id.id] |= work_intervals_batch[resource_id.id] & resource_calendar_validity_intervals[resource_id.id][calendar]
 
         return work_intervals_per_resource
+
+    def _get_gantt_unavailable_intervals(self, start, end):
+        """
+            Batched equivalent of ``_get_unavailable_intervals`` used by the gantt view.
+
+            The work intervals common to all the resources of a calendar are computed (and cached) once per calendar,
+            then the leaves of each resource are subtracted from them. Resources having their own attendances are
+            still handled by the generic computation.
+        """
+        start_dt = start if start.tzinfo else start.replace(tzinfo=pytz.utc)
+        end_dt = end if end.tzinfo else end.replace(tzinfo=pytz.utc)
+        resources_per_calendar = defaultdict(lambda: self.env['resource.resource'])
+        for resource in self:
+            calendar = resource.calendar_id or resource.company_id.resource_calendar_id
+            if calendar:
+                resources_per_calendar[calendar] |= resource
+
+        specific_attendances = self.env['resource.calendar.attendance'].sudo().search([('resource_id', 'in', self.ids)])
+        specific_resources = specific_attendances.resource_id
+        leaves_per_resource = defaultdict(list)
+        for leave in self.env['resource.calendar.leaves'].sudo().search([
+            ('time_type', '=', 'leave'),
+            ('resource_id', 'in', (self - specific_resources).ids),
+            ('date_from', '<=', end_dt.astimezone(pytz.utc).replace(tzinfo=None)),
+            ('date_to', '>=', start_dt.astimezone(pytz.utc).replace(tzinfo=None)),
+        ], order='date_from'):
+            leaves_per_resource[leave.resource_id].append(leave)
+
+        result = {}
+        for calendar, resources in resources_per_calendar.items():
+            if resources & specific_resources:
+                result.update(calendar._unavailable_intervals_batch(
+                    start_dt, end_dt, resources & specific_resources, tz=pytz.timezone(calendar.tz)))
+                resources -= specific_resources
+            calendar_work_intervals = Intervals([
+                (start, stop, self.env['resource.calendar.attendance'])
+                for start, stop in self.env['resource.calendar']._get_gantt_work_intervals(calendar.id, start_dt, end_dt)
+            ])
+            calendar_unavailable_intervals = None
+            for resource in resources:
+                leaves = [
+                    leave for leave in leaves_per_resource[resource]
+                    if leave.calendar_id in (calendar, self.env['resource.calendar'])
+                ]
+                if not leaves:
+                    # most of the resources share the calendar intervals as is
+                    if calendar_unavailable_intervals is None:
+                        calendar_unavailable_intervals = unavailable_intervals(calendar_work_intervals, start_dt, end_dt)
+                    result[resource.id] = calendar_unavailable_intervals
+                    continue
+                leave_intervals = Intervals([(
+                    max(start_dt, pytz.utc.localize(leave.date_from)),
+                    min(end_dt, pytz.utc.localize(leave.date_to)),
+                    leave,
+                ) for leave in leaves])
+                result[resource.id] = unavailable_intervals(calendar_work_intervals - leave_intervals, start_dt, end_dt)
+        return result
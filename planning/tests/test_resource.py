@@ -112,3 +112,31 @@ class TestPlanningResource(TestCommonPlanning):
             'start_datetime': datetime(2021, 7, 15, 8, 0, 0),
             'end_datetime': datetime(2021, 7, 15, 12, 0, 0),
         }, willy_data, 'The dault start/date should adapt to the resource calendar')
+
+    def test_gantt_unavailable_intervals(self):
+        start, end = datetime(2019, 6, 1), datetime(2019, 7, 1)
+        calendar = self.resource_bert.calendar_id or self.resource_bert.company_id.resource_calendar_id
+        resources = self.resource_bert | self.resource_joseph | self.resource_janice | self.res_willywaller
+        self.env['resource.calendar.leaves'].create({
+            'name': 'Bert leave',
+            'date_from': datetime(2019, 6, 10, 0, 0),
+            'date_to': datetime(2019, 6, 14, 23, 0),
+            'resource_id': self.resource_bert.id,
+            'calendar_id': calendar.id,
+        })
+        self.assertEqual(
+            resources._get_gantt_unavailable_intervals(start, end),
+            resources._get_unavailable_intervals(start, end),
+            'The gantt unavailabilities should match the generic computation')
+
+        # the cached calendar intervals are invalidated by the global leaves
+        self.env['resource.calendar.leaves'].create({
+            'name': 'Public holiday',
+            'date_from': datetime(2019, 6, 20, 0, 0),
+            'date_to': datetime(2019, 6, 20, 23, 0),
+            'calendar_id': calendar.id,
+        })
+        self.assertEqual(
+            resources._get_gantt_unavailable_intervals(start, end),
+            resources._get_unavailable_intervals(start, end),
+            'The gantt unavailabilities should take the new global leave into account')
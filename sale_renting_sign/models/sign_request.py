@@ -18,13 +18,18 @@ class SignRequest(models.Model):
                     subtype_id=self.env.ref("mail.mt_note").id,
                     author_id=self.env.user.partner_id.id,
                 )
-                # attach a copy of the signed document to the SO for easy retrieval
-                self.env["ir.attachment"].create(
-                    {
-                        "name": request.reference,
-                        "datas": request.completed_document,
-                        "type": "binary",
-                        "res_model": self.env["sale.order"]._name,
-                        "res_id": request.sale_order_id.id,
-                    }
-                )
+
+    def send_completed_document(self):
+        res = super(SignRequest, self).send_completed_document()
+        if res and self.sale_order_id:
+            # attach a copy of the signed document to the SO for easy retrieval
+            self.env["ir.attachment"].create(
+                {
+                    "name": self.reference,
+                    "datas": self.completed_document,
+                    "type": "binary",
+                    "res_model": self.env["sale.order"]._name,
+                    "res_id": self.sale_order_id.id,
+                }
+            )
+        return res
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from . import sale_subscription
+from . import sale_subscription_mrr_movement
 from . import payment
 from . import product
 from . import res_partner
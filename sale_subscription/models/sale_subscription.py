@@ -3,10 +3,11 @@
 
 import logging
 import datetime
+import time
 import traceback
 
 from ast import literal_eval
-from collections import Counter
+from collections import Counter, defaultdict
 from dateutil.relativedelta import relativedelta
 from markupsafe import Markup
 from uuid import uuid4
@@ -14,7 +15,7 @@ from uuid import uuid4
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
 from odoo.osv import expression
-from odoo.tools import format_date, is_html_empty
+from odoo.tools import format_date, is_html_empty, split_every
 from odoo.tools.float_utils import float_is_zero
 
 _logger = logging.getLogger(__name__)
@@ -28,6 +29,12 @@ INTERVAL_FACTOR = {
 
 PERIODS = {'daily': 'days', 'weekly': 'weeks', 'monthly': 'months', 'yearly': 'years'}
 
+# Number of subscriptions invoiced, resp. charged by token, per run of their cron
+INVOICE_BATCH_SIZE = 500
+PAYMENT_BATCH_SIZE = 50
+# Number of subscriptions whose KPIs are computed at once by the cron
+KPI_BATCH_SIZE = 1000
+
 class SaleSubscription(models.Model):
     _name = "sale.subscription"
     _description = "Subscription"
@@ -123,6 +130,12 @@ class SaleSubscription(models.Model):
         ('bad', 'Bad')], string="Health", copy=False, default='normal', help="Show the health status")
     stage_category = fields.Selection(related='stage_id.category', store=True)
     to_renew = fields.Boolean(string='To Renew', default=False, copy=False)
+    payment_attempt_date = fields.Date(
+        string='Last Payment Attempt', copy=False, readonly=True,
+        help="Date of the last automatic payment attempt, the subscriptions are charged at most once a day.")
+    invoice_attempt_date = fields.Date(
+        string='Last Invoicing Attempt', copy=False, readonly=True,
+        help="Date of the last automatic invoicing attempt which failed or was skipped, such subscriptions are retried the next day.")
     payment_term_id = fields.Many2one('account.payment.term', string='Default Payment Terms', check_company=True, tracking=True, help="These payment terms will be used when generating new invoices and renewal/upsell orders. Note that invoices paid using online payment will use 'Already paid' regardless of this setting.")
 
     _sql_constraints = [
@@ -370,8 +383,27 @@ class SaleSubscription(models.Model):
         result = super(SaleSubscription, self).write(vals)
         if vals.get('stage_id'):
             self._send_subscription_rating_mail(force_send=True)
+        if any(field in vals for field in ('user_id', 'team_id', 'template_id')):
+            self._update_mrr_movements()
         return result
 
+    def _update_mrr_movements(self):
+        """ The movements are reported under the current salesperson, team and template of their subscription. """
+        if not self.ids:
+            return
+        self.flush(['user_id', 'team_id', 'template_id'])
+        self.env['sale.subscription.mrr.movement'].flush(['subscription_id'])
+        self.env.cr.execute("""
+            UPDATE sale_subscription_mrr_movement movement
+               SET user_id = subscription.user_id,
+                   team_id = subscription.team_id,
+                   template_id = subscription.template_id
+              FROM sale_subscription subscription
+             WHERE subscription.id = movement.subscription_id
+               AND subscription.id IN %s
+        """, [tuple(self.ids)])
+        self.env['sale.subscription.mrr.movement'].invalidate_cache(['user_id', 'team_id', 'template_id'])
+
     def _init_column(self, column_name):
         # to avoid generating a single default uuid when installing the module,
         # we need to set the default row by row for this column
@@ -439,10 +471,17 @@ class SaleSubscription(models.Model):
     def _cron_recurring_create_invoice(self):
         return self._recurring_create_invoice(automatic=True)
 
+    @api.model
+    def _cron_recurring_create_payment(self):
+        return self._recurring_create_payment()
+
     @api.model
     def _cron_update_kpi(self):
         subscriptions = self.search([('stage_category', '=', 'progress')])
-        subscriptions._compute_kpi()
+        for ids in split_every(KPI_BATCH_SIZE, subscriptions.ids):
+            self.browse(ids)._compute_kpi()
+            self.flush()
+            self.invalidate_cache()
 
     def _mail_track(self, tracked_fields, initial):
         """ For a given record, fields to check (tuple column name, column info)
@@ -497,39 +536,90 @@ class SaleSubscription(models.Model):
         return res
 
     def _get_subscription_delta(self, date):
+        self.ensure_one()
+        previous_mrr = self.env['sale.subscription.mrr.movement']._get_recurring_monthly(self.ids, date).get(self.id)
+        return self._get_mrr_delta(previous_mrr)
+
+    def _get_mrr_delta(self, previous_mrr):
+        """ Change of MRR since ``previous_mrr``, False if there is no previous MRR. """
         self.ensure_one()
         delta, percentage = False, False
-        subscription_log = self.env['sale.subscription.log'].search([
-            ('subscription_id', '=', self.id), ('event_type', 'in', ['1_change', '0_creation']),
-            ('event_date', '<=', date)], order='event_date desc', limit=1)
-        if subscription_log:
-            delta = self.recurring_monthly - subscription_log.recurring_monthly
-            percentage = delta / subscription_log.recurring_monthly if subscription_log.recurring_monthly != 0 else 100
+        if previous_mrr is not None:
+            delta = self.recurring_monthly - previous_mrr
+            percentage = delta / previous_mrr if previous_mrr != 0 else 100
         return {'delta': delta, 'percentage': percentage}
 
     def _get_subscription_health(self):
         self.ensure_one()
-        domain = [('id', '=', self.id)]
-        if self.template_id.bad_health_domain != '[]' and self.search_count(domain + literal_eval(self.template_id.bad_health_domain)):
-            health = 'bad'
-        elif self.template_id.good_health_domain != '[]' and self.search_count(domain + literal_eval(self.template_id.good_health_domain)):
-            health = 'done'
-        else:
-            health = 'normal'
+        return self._get_subscriptions_health()[self.id]
+
+    def _get_subscriptions_health(self):
+        """ Health of the subscriptions as a dict {subscription_id: health}, evaluated with one
+        search per health domain of their templates. """
+        health = dict.fromkeys(self.ids, 'normal')
+        ids_per_template = defaultdict(list)
+        for subscription in self:
+            ids_per_template[subscription.template_id].append(subscription.id)
+        for template, ids in ids_per_template.items():
+            # the bad health prevails over the good one
+            for value, health_domain in [('done', template.good_health_domain), ('bad', template.bad_health_domain)]:
+                if health_domain and health_domain != '[]':
+                    for subscription_id in self._search([('id', 'in', ids)] + literal_eval(health_domain)):
+                        health[subscription_id] = value
         return health
 
     def _compute_kpi(self):
+        """ Updates the MRR deltas and the health of the subscriptions. Only the changed values
+        are written, with one query for all the subscriptions, and the alerts triggered on the
+        modification of the subscriptions are then evaluated once for all of them. """
+        Movement = self.env['sale.subscription.mrr.movement']
+        mrr_1month = Movement._get_recurring_monthly(self.ids, datetime.date.today() - relativedelta(months=1))
+        mrr_3months = Movement._get_recurring_monthly(self.ids, datetime.date.today() - relativedelta(months=3))
+        health = self._get_subscriptions_health()
+        fnames = ['kpi_1month_mrr_delta', 'kpi_1month_mrr_percentage', 'kpi_3months_mrr_delta', 'kpi_3months_mrr_percentage', 'health']
+        rows = []
         for subscription in self:
-            delta_1month = subscription._get_subscription_delta(datetime.date.today() - relativedelta(months=1))
-            delta_3months = subscription._get_subscription_delta(datetime.date.today() - relativedelta(months=3))
-            health = subscription._get_subscription_health()
-            subscription.write({
-                'kpi_1month_mrr_delta': delta_1month['delta'],
-                'kpi_1month_mrr_percentage': delta_1month['percentage'],
-                'kpi_3months_mrr_delta': delta_3months['delta'],
-                'kpi_3months_mrr_percentage': delta_3months['percentage'],
-                'health': health,
-            })
+            delta_1month = subscription._get_mrr_delta(mrr_1month.get(subscription.id))
+            delta_3months = subscription._get_mrr_delta(mrr_3months.get(subscription.id))
+            values = [
+                delta_1month['delta'] or 0.0,
+                delta_1month['percentage'] or 0.0,
+                delta_3months['delta'] or 0.0,
+                delta_3months['percentage'] or 0.0,
+                health[subscription.id],
+            ]
+            if any(subscription[fname] != value for fname, value in zip(fnames, values)):
+                rows.append([subscription.id] + values)
+        if not rows:
+            return
+        changed = self.browse([row[0] for row in rows])
+
+        # the write of the KPIs triggers the alerts on the modification of the subscriptions
+        actions = self.env['base.automation']._get_actions(changed, ['on_write', 'on_create_or_write'])
+        records = changed.with_env(actions.env)
+        pre = {action: action._filter_pre(records) for action in actions}
+        old_values = {vals.pop('id'): vals for vals in records.read(fnames)} if actions else {}
+
+        self.flush(fnames)
+        self.env.cr.execute("""
+            UPDATE sale_subscription s
+               SET kpi_1month_mrr_delta = v.kpi_1month_mrr_delta,
+                   kpi_1month_mrr_percentage = v.kpi_1month_mrr_percentage,
+                   kpi_3months_mrr_delta = v.kpi_3months_mrr_delta,
+                   kpi_3months_mrr_percentage = v.kpi_3months_mrr_percentage,
+                   health = v.health,
+                   write_uid = %s,
+                   write_date = (now() at time zone 'UTC')
+              FROM (VALUES {}) AS v(id, kpi_1month_mrr_delta, kpi_1month_mrr_percentage,
+                                    kpi_3months_mrr_delta, kpi_3months_mrr_percentage, health)
+             WHERE s.id = v.id
+        """.format(", ".join(["(%s, %s::float8, %s::float8, %s::float8, %s::float8, %s)"] * len(rows))),
+            [self.env.uid] + [value for row in rows for value in row])
+        self.invalidate_cache(fnames + ['write_uid', 'write_date'], changed.ids)
+
+        for action in actions.with_context(old_values=old_values):
+            records, domain_post = action._filter_post_export_domain(pre[action])
+            action._process(records, domain_post=domain_post)
 
     def _send_subscription_rating_mail(self, force_send=False):
         for subscription in self.filtered(lambda subscription: subscription.stage_id.rating_template_id):
@@ -936,19 +1026,33 @@ class SaleSubscription(models.Model):
             return True
         return False
 
-    def _recurring_create_invoice(self, automatic=False, batch_size=20):
+    def _recurring_create_invoice(self, automatic=False, batch_size=INVOICE_BATCH_SIZE):
+        """ Creates the next invoice of the subscriptions (of the due ones when called on an
+        empty recordset by the cron, see `_cron_recurring_create_invoice`).
+
+        The invoices of a company are prepared, created and posted in one batch, see
+        `_create_recurring_invoices`. The subscriptions paid by token are charged one by one,
+        by the cron processing the payments when called on an empty recordset.
+        """
         auto_commit = self.env.context.get('auto_commit', True)
         cr = self.env.cr
         invoices = self.env['account.move']
         current_date = datetime.date.today()
+        start = time.time()
+        stats = Counter()
 
         if len(self) > 0:
             subscriptions = self
             need_cron_trigger = False
         else:
+            # the subscriptions paid by token are charged by `_recurring_create_payment`, the
+            # ones which failed or were skipped today are left to the next day
             subscriptions = self.search([
                 ('recurring_next_date', '<=', current_date),
-                ('template_id.payment_mode', '!=','manual'),
+                ('template_id.payment_mode', 'in', ['draft_invoice', 'validate_send']),
+                '|',
+                ('invoice_attempt_date', '=', False),
+                ('invoice_attempt_date', '<', current_date),
                 '|',
                 ('stage_category', '=', 'progress'),
                 ('to_renew', '=', True),
@@ -962,141 +1066,33 @@ class SaleSubscription(models.Model):
             for company_id in set(data['company_id'][0] for data in sub_data):
                 sub_ids = [s['id'] for s in sub_data if s['company_id'][0] == company_id]
                 subs = self.with_company(company_id).with_context(company_id=company_id).browse(sub_ids)
-                Invoice = self.env['account.move'].with_context(move_type='out_invoice', company_id=company_id).with_company(company_id)
-                subs_order_lines = self.env['sale.order.line'].search([('subscription_id', 'in', sub_ids)])
+                subs_to_invoice = subs.browse()
                 for subscription in subs:
-                    subscription = subscription[0]  # Trick to not prefetch other subscriptions, as the cache is currently invalidated at each iteration
-                    if automatic and auto_commit:
-                        cr.commit()
-
                     # if we reach the end date of the subscription then we close it and avoid to charge it
                     if automatic and subscription.date and subscription.date <= current_date:
                         subscription.set_close()
+                        stats['closed'] += 1
                         continue
 
                     # payment + invoice (only by cron)
                     if subscription.template_id.payment_mode == 'success_payment' and subscription.recurring_total and automatic:
-                        try:
-                            payment_token = subscription.payment_token_id
-                            tx = None
-                            if payment_token:
-                                invoice_values = subscription.with_context(lang=subscription.partner_id.lang)._prepare_invoice()
-                                new_invoice = Invoice.create(invoice_values)
-                                if subscription.analytic_account_id or subscription.tag_ids:
-                                    for line in new_invoice.invoice_line_ids:
-                                        if subscription.analytic_account_id:
-                                            line.analytic_account_id = subscription.analytic_account_id
-                                        if subscription.tag_ids:
-                                            line.analytic_tag_ids = subscription.tag_ids
-                                new_invoice.message_post_with_view(
-                                    'mail.message_origin_link',
-                                    values={'self': new_invoice, 'origin': subscription},
-                                    subtype_id=self.env.ref('mail.mt_note').id)
-                                tx = subscription._do_payment(payment_token, new_invoice)[0]
-                                # commit change as soon as we try the payment so we have a trace somewhere
-                                if auto_commit:
-                                    cr.commit()
-                                if tx.renewal_allowed:
-                                    msg_body = _('Automatic payment succeeded. Payment reference: <a href=# data-oe-model=payment.transaction data-oe-id=%d>%s</a>; Amount: %s. Invoice <a href=# data-oe-model=account.move data-oe-id=%d>View Invoice</a>.') % (tx.id, tx.reference, tx.amount, new_invoice.id)
-                                    subscription.message_post(body=msg_body)
-                                    # success_payment
-                                    if new_invoice.state != 'posted':
-                                        new_invoice._post(False)
-                                    subscription.send_success_mail(tx, new_invoice)
-                                    if auto_commit:
-                                        cr.commit()
-                                else:
-                                    _logger.error('Fail to create recurring invoice for subscription %s', subscription.code)
-                                    if auto_commit:
-                                        cr.rollback()
-                                    # Check that the invoice still exists before unlinking. It might already have been deleted by `reconcile_pending_transaction`.
-                                    new_invoice.exists().unlink()
-                            if tx is None or not tx.renewal_allowed:
-                                amount = subscription.recurring_total
-                                auto_close_limit = subscription.template_id.auto_close_limit or 15
-                                date_close = (
-                                    subscription.recurring_next_date +
-                                    relativedelta(days=auto_close_limit)
-                                )
-                                close_subscription = current_date >= date_close
-                                email_context = self.env.context.copy()
-                                email_context.update({
-                                    'payment_token': subscription.payment_token_id and subscription.payment_token_id.name,
-                                    'renewed': False,
-                                    'total_amount': amount,
-                                    'email_to': subscription.partner_id.email,
-                                    'code': subscription.code,
-                                    'currency': subscription.pricelist_id.currency_id.name,
-                                    'date_end': subscription.date,
-                                    'date_close': date_close,
-                                    'auto_close_limit': auto_close_limit
-                                })
-                                if close_subscription:
-                                    template = self.env.ref('sale_subscription.email_payment_close')
-                                    template.with_context(email_context).send_mail(subscription.id)
-                                    _logger.debug("Sending Subscription Closure Mail to %s for subscription %s and closing subscription", subscription.partner_id.email, subscription.id)
-                                    msg_body = _('Automatic payment failed after multiple attempts. Subscription closed automatically.')
-                                    subscription.message_post(body=msg_body)
-                                    subscription.set_close()
-                                else:
-                                    template = self.env.ref('sale_subscription.email_payment_reminder')
-                                    msg_body = _('Automatic payment failed. Subscription set to "To Renew".')
-                                    if (datetime.date.today() - subscription.recurring_next_date).days in [0, 3, 7, 14]:
-                                        template.with_context(email_context).send_mail(subscription.id)
-                                        _logger.debug("Sending Payment Failure Mail to %s for subscription %s and setting subscription to pending", subscription.partner_id.email, subscription.id)
-                                        msg_body += _(' E-mail sent to customer.')
-                                    subscription.message_post(body=msg_body)
-                                    subscription.set_to_renew()
-                            if auto_commit:
-                                cr.commit()
-                        except Exception:
-                            if auto_commit:
-                                cr.rollback()
-                            # we assume that the payment is run only once a day
-                            traceback_message = traceback.format_exc()
-                            _logger.error(traceback_message)
-                            last_tx = self.env['payment.transaction'].search([('reference', 'like', 'SUBSCRIPTION-%s-%s' % (subscription.id, datetime.date.today().strftime('%y%m%d')))], limit=1)
-                            error_message = "Error during renewal of subscription %s (%s)" % (subscription.code, 'Payment recorded: %s' % last_tx.reference if last_tx and last_tx.state == 'done' else 'No payment recorded.')
-                            _logger.error(error_message)
+                        if auto_commit:
+                            cr.commit()
+                        subscription._recurring_create_payment_invoice(current_date)
+                        stats['payments'] += 1
 
                     # invoice only
                     elif subscription.template_id.payment_mode in ['draft_invoice', 'manual', 'validate_send']:
-                        try:
-                            # We don't allow to create invoice past the end date of the contract.
-                            # The subscription must be renewed in that case
-                            if subscription.date and subscription.recurring_next_date >= subscription.date:
-                                return
-                            else:
-                                invoice_values = subscription.with_context(lang=subscription.partner_id.lang)._prepare_invoice()
-                                new_invoice = Invoice.create(invoice_values)
-                                if subscription.analytic_account_id or subscription.tag_ids:
-                                    for line in new_invoice.invoice_line_ids:
-                                        if subscription.analytic_account_id:
-                                            line.analytic_account_id = subscription.analytic_account_id
-                                        if subscription.tag_ids:
-                                            line.analytic_tag_ids = subscription.tag_ids
-                                sub_so = subs_order_lines.filtered(lambda ol: ol.subscription_id.id == subscription.id).order_id
-                                sub_so_renewal = sub_so.filtered(lambda so: so.subscription_management == 'renew')
-                                reference_so = max(sub_so_renewal, key=lambda so: so.date_order, default=False) or min(sub_so, key=lambda so: so.date_order, default=False)
-                                new_invoice.ref = reference_so.client_order_ref if reference_so else False
-                                new_invoice.message_post_with_view(
-                                    'mail.message_origin_link',
-                                    values={'self': new_invoice, 'origin': subscription},
-                                    subtype_id=self.env.ref('mail.mt_note').id)
-                                invoices += new_invoice
-                                # When `recurring_next_date` is updated by cron or by `Generate Invoice` action button,
-                                # write() will skip resetting `recurring_invoice_day` value based on this context value
-                                subscription.with_context(skip_update_recurring_invoice_day=True).increment_period()
-                                if subscription.template_id.payment_mode == 'validate_send':
-                                    new_invoice.action_post()
-                                if automatic and auto_commit:
-                                    cr.commit()
-                        except Exception:
-                            if automatic and auto_commit:
-                                cr.rollback()
-                                _logger.exception('Fail to create recurring invoice for subscription %s', subscription.code)
-                            else:
-                                raise
+                        # We don't allow to create invoice past the end date of the contract.
+                        # The subscription must be renewed in that case
+                        if not subscription.date or subscription.recurring_next_date < subscription.date:
+                            subs_to_invoice |= subscription
+                        elif automatic:
+                            subscription.invoice_attempt_date = current_date
+
+                invoices += subs_to_invoice._create_recurring_invoices(automatic=automatic, stats=stats)
+                if automatic and auto_commit:
+                    cr.commit()
 
         # Retrieve the invoice to send mails.
         self._cr.execute('''
@@ -1120,12 +1116,238 @@ class SaleSubscription(models.Model):
                 subscription = invoice.line_ids.subscription_id
                 subscription.validate_and_send_invoice(invoice)
 
+        self._log_recurring_run('Recurring invoicing', len(subscriptions), start, stats)
+
         # There is still some subscriptions to process. Then, make sure the CRON will be triggered again asap.
+        # The subscriptions which failed or were skipped are not selected again until tomorrow.
         if need_cron_trigger:
             self.env.ref('sale_subscription.account_analytic_cron_for_invoice')._trigger()
 
         return invoices
 
+    def _create_recurring_invoices(self, automatic=False, stats=None):
+        """ Creates the next invoice of the subscriptions, in one batch. The subscriptions are
+        expected to be of the company of the environment.
+
+        If the batch fails, the subscriptions are retried one by one so that a faulty subscription
+        does not prevent the other ones to be invoiced. The failures are only logged when
+        ``automatic``, and the failed subscriptions are left to the next run of the next day.
+
+        :param stats: Counter of the 'invoices', 'retries' and 'failures', updated in place
+        :return: the created invoices, as an `account.move` recordset
+        """
+        stats = stats if stats is not None else Counter()
+        if not self:
+            return self.env['account.move']
+        try:
+            with self.env.cr.savepoint():
+                invoices = self._create_recurring_invoices_batch()
+        except Exception:
+            if not automatic:
+                raise
+            _logger.warning('Fail to create the recurring invoices of %s subscriptions at once, retrying them one by one', len(self))
+            invoices = self.env['account.move']
+            for subscription in self:
+                stats['retries'] += 1
+                try:
+                    with self.env.cr.savepoint():
+                        invoices += subscription._create_recurring_invoices_batch()
+                except Exception:
+                    stats['failures'] += 1
+                    subscription.invoice_attempt_date = fields.Date.today()
+                    _logger.exception('Fail to create recurring invoice for subscription %s', subscription.code)
+        stats['invoices'] += len(invoices)
+        return invoices
+
+    def _create_recurring_invoices_batch(self):
+        """ Prepares the invoices of the subscriptions, creates them in one `create` and posts
+        the ones to validate in one go, see `_create_recurring_invoices`. """
+        company = self.env.company
+        Invoice = self.env['account.move'].with_context(move_type='out_invoice', company_id=company.id)
+        subs_order_lines = self.env['sale.order.line'].search([('subscription_id', 'in', self.ids)])
+        vals_list = []
+        for subscription in self:
+            invoice_values = subscription.with_context(lang=subscription.partner_id.lang)._prepare_invoice()
+            for command in invoice_values['invoice_line_ids']:
+                if subscription.analytic_account_id:
+                    command[2]['analytic_account_id'] = subscription.analytic_account_id.id
+                if subscription.tag_ids:
+                    command[2]['analytic_tag_ids'] = [(6, 0, subscription.tag_ids.ids)]
+            sub_so = subs_order_lines.filtered(lambda ol: ol.subscription_id.id == subscription.id).order_id
+            sub_so_renewal = sub_so.filtered(lambda so: so.subscription_management == 'renew')
+            reference_so = max(sub_so_renewal, key=lambda so: so.date_order, default=False) or min(sub_so, key=lambda so: so.date_order, default=False)
+            invoice_values['ref'] = reference_so.client_order_ref if reference_so else False
+            vals_list.append(invoice_values)
+        invoices = Invoice.create(vals_list)
+
+        origin_link = self.env.ref('mail.message_origin_link')
+        invoices._message_log_batch(
+            bodies={
+                invoice.id: origin_link._render({'self': invoice, 'origin': subscription}, engine='ir.qweb', minimal_qcontext=True)
+                for subscription, invoice in zip(self, invoices)
+            },
+            subtype_id=self.env.ref('mail.mt_note').id,
+        )
+        # When `recurring_next_date` is updated by cron or by `Generate Invoice` action button,
+        # write() will skip resetting `recurring_invoice_day` value based on this context value
+        self.with_context(skip_update_recurring_invoice_day=True).increment_period()
+        invoices_to_post = invoices.browse([
+            invoice.id for subscription, invoice in zip(self, invoices)
+            if subscription.template_id.payment_mode == 'validate_send'
+        ])
+        if invoices_to_post:
+            invoices_to_post.action_post()
+        return invoices
+
+    @api.model
+    def _recurring_create_payment(self, batch_size=PAYMENT_BATCH_SIZE):
+        """ Charges the due subscriptions paid by token, one by one as each payment request is
+        committed as soon as it is sent. This runs in its own cron, in parallel with the creation
+        of the other invoices. A subscription is charged at most once a day (see
+        `payment_attempt_date`), the failed ones are retried the next days. """
+        auto_commit = self.env.context.get('auto_commit', True)
+        cr = self.env.cr
+        current_date = datetime.date.today()
+        start = time.time()
+        stats = Counter()
+
+        subscriptions = self.search([
+            ('recurring_next_date', '<=', current_date),
+            ('template_id.payment_mode', '=', 'success_payment'),
+            '|',
+            ('payment_attempt_date', '=', False),
+            ('payment_attempt_date', '<', current_date),
+            '|',
+            ('stage_category', '=', 'progress'),
+            ('to_renew', '=', True),
+        ], order='id', limit=batch_size + 1)
+        need_cron_trigger = len(subscriptions) > batch_size
+        if need_cron_trigger:
+            subscriptions = subscriptions[:batch_size]
+
+        for subscription in subscriptions:
+            subscription = subscription.with_company(subscription.company_id).with_context(company_id=subscription.company_id.id)
+            if subscription.date and subscription.date <= current_date:
+                subscription.set_close()
+                stats['closed'] += 1
+            elif subscription.recurring_total:
+                subscription._recurring_create_payment_invoice(current_date)
+                stats['payments'] += 1
+            # the subscriptions with nothing to charge are not selected again today either
+            subscription.payment_attempt_date = current_date
+            if auto_commit:
+                cr.commit()
+
+        self._log_recurring_run('Recurring payments', len(subscriptions), start, stats)
+
+        if need_cron_trigger:
+            self.env.ref('sale_subscription.account_analytic_cron_for_payment')._trigger()
+
+    def _recurring_create_payment_invoice(self, current_date):
+        """ Creates the invoice of the subscription, charges it with the payment token and
+        renews the subscription if the payment succeeds. Otherwise, the subscription is set to
+        renew, or closed if the payment is failing for too long. """
+        self.ensure_one()
+        auto_commit = self.env.context.get('auto_commit', True)
+        cr = self.env.cr
+        subscription = self
+        Invoice = self.env['account.move'].with_context(move_type='out_invoice', company_id=self.env.company.id)
+        try:
+            payment_token = subscription.payment_token_id
+            tx = None
+            if payment_token:
+                invoice_values = subscription.with_context(lang=subscription.partner_id.lang)._prepare_invoice()
+                new_invoice = Invoice.create(invoice_values)
+                if subscription.analytic_account_id or subscription.tag_ids:
+                    for line in new_invoice.invoice_line_ids:
+                        if subscription.analytic_account_id:
+                            line.analytic_account_id = subscription.analytic_account_id
+                        if subscription.tag_ids:
+                            line.analytic_tag_ids = subscription.tag_ids
+                new_invoice.message_post_with_view(
+                    'mail.message_origin_link',
+                    values={'self': new_invoice, 'origin': subscription},
+                    subtype_id=self.env.ref('mail.mt_note').id)
+                tx = subscription._do_payment(payment_token, new_invoice)[0]
+                # commit change as soon as we try the payment so we have a trace somewhere
+                if auto_commit:
+                    cr.commit()
+                if tx.renewal_allowed:
+                    msg_body = _('Automatic payment succeeded. Payment reference: <a href=# data-oe-model=payment.transaction data-oe-id=%d>%s</a>; Amount: %s. Invoice <a href=# data-oe-model=account.move data-oe-id=%d>View Invoice</a>.') % (tx.id, tx.reference, tx.amount, new_invoice.id)
+                    subscription.message_post(body=msg_body)
+                    # success_payment
+                    if new_invoice.state != 'posted':
+                        new_invoice._post(False)
+                    subscription.send_success_mail(tx, new_invoice)
+                    if auto_commit:
+                        cr.commit()
+                else:
+                    _logger.error('Fail to create recurring invoice for subscription %s', subscription.code)
+                    if auto_commit:
+                        cr.rollback()
+                    # Check that the invoice still exists before unlinking. It might already have been deleted by `reconcile_pending_transaction`.
+                    new_invoice.exists().unlink()
+            if tx is None or not tx.renewal_allowed:
+                amount = subscription.recurring_total
+                auto_close_limit = subscription.template_id.auto_close_limit or 15
+                date_close = (
+                    subscription.recurring_next_date +
+                    relativedelta(days=auto_close_limit)
+                )
+                close_subscription = current_date >= date_close
+                email_context = self.env.context.copy()
+                email_context.update({
+                    'payment_token': subscription.payment_token_id and subscription.payment_token_id.name,
+                    'renewed': False,
+                    'total_amount': amount,
+                    'email_to': subscription.partner_id.email,
+                    'code': subscription.code,
+                    'currency': subscription.pricelist_id.currency_id.name,
+                    'date_end': subscription.date,
+                    'date_close': date_close,
+                    'auto_close_limit': auto_close_limit
+                })
+                if close_subscription:
+                    template = self.env.ref('sale_subscription.email_payment_close')
+                    template.with_context(email_context).send_mail(subscription.id)
+                    _logger.debug("Sending Subscription Closure Mail to %s for subscription %s and closing subscription", subscription.partner_id.email, subscription.id)
+                    msg_body = _('Automatic payment failed after multiple attempts. Subscription closed automatically.')
+                    subscription.message_post(body=msg_body)
+                    subscription.set_close()
+                else:
+                    template = self.env.ref('sale_subscription.email_payment_reminder')
+                    msg_body = _('Automatic payment failed. Subscription set to "To Renew".')
+                    if (datetime.date.today() - subscription.recurring_next_date).days in [0, 3, 7, 14]:
+                        template.with_context(email_context).send_mail(subscription.id)
+                        _logger.debug("Sending Payment Failure Mail to %s for subscription %s and setting subscription to pending", subscription.partner_id.email, subscription.id)
+                        msg_body += _(' E-mail sent to customer.')
+                    subscription.message_post(body=msg_body)
+                    subscription.set_to_renew()
+            subscription.payment_attempt_date = current_date
+            if auto_commit:
+                cr.commit()
+        except Exception:
+            if auto_commit:
+                cr.rollback()
+            subscription.payment_attempt_date = current_date
+            if auto_commit:
+                cr.commit()
+            # we assume that the payment is run only once a day
+            traceback_message = traceback.format_exc()
+            _logger.error(traceback_message)
+            last_tx = self.env['payment.transaction'].search([('reference', 'like', 'SUBSCRIPTION-%s-%s' % (subscription.id, datetime.date.today().strftime('%y%m%d')))], limit=1)
+            error_message = "Error during renewal of subscription %s (%s)" % (subscription.code, 'Payment recorded: %s' % last_tx.reference if last_tx and last_tx.state == 'done' else 'No payment recorded.')
+            _logger.error(error_message)
+
+    @api.model
+    def _log_recurring_run(self, name, count, start, stats):
+        duration = time.time() - start
+        _logger.info(
+            "%s: %s subscriptions processed in %.2fs, %s invoices created (%.2f invoices/s), "
+            "%s payments, %s closed, %s failures, %s retries",
+            name, count, duration, stats['invoices'], stats['invoices'] / duration if duration else 0.0,
+            stats['payments'], stats['closed'], stats['failures'], stats['retries'])
+
     def send_success_mail(self, tx, invoice):
         current_date = datetime.date.today()
         next_date = self.recurring_next_date or current_date
@@ -1435,6 +1657,24 @@ class SaleSubscriptionLog(models.Model):
     company_currency_id = fields.Many2one('res.currency', string='Company Currency', related='company_id.currency_id', store=True, readonly=True)
     company_id = fields.Many2one('res.company', string='Company', related='subscription_id.company_id', store=True, readonly=True)
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        logs = super().create(vals_list)
+        self.env['sale.subscription.mrr.movement']._refresh_subscriptions(logs.subscription_id.ids)
+        return logs
+
+    def write(self, vals):
+        subscriptions = self.subscription_id
+        res = super().write(vals)
+        self.env['sale.subscription.mrr.movement']._refresh_subscriptions((subscriptions | self.subscription_id).ids)
+        return res
+
+    def unlink(self):
+        subscriptions = self.subscription_id
+        res = super().unlink()
+        self.env['sale.subscription.mrr.movement']._refresh_subscriptions(subscriptions.exists().ids)
+        return res
+
     @api.depends('company_id', 'company_currency_id', 'amount_signed', 'event_date')
     def _compute_amount_company_currency(self):
         for log in self:
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from itertools import groupby
+
+from odoo import api, fields, models
+from odoo.tools import split_every
+
+
+class SaleSubscriptionMrrMovement(models.Model):
+    """ The MRR movements of the subscriptions, one line per subscription and day.
+
+    The movements are derived from the subscription logs (see `_refresh_subscriptions`)
+    and kept up to date when the logs change, so the dashboards and the KPIs read them
+    instead of replaying the logs on each request:
+
+    * a day when a subscription is started is a new MRR, or a reactivated MRR if the
+      subscription had already been churned;
+    * a day when a subscription is closed is a churned MRR;
+    * the changes of MRR of the other days are merged into an expansion or a contraction.
+
+    The amounts are in the company currency, converted at the date of the movement.
+    """
+    _name = 'sale.subscription.mrr.movement'
+    _description = 'Subscription MRR Movement'
+    _order = 'date, id'
+    _log_access = False
+
+    date = fields.Date(required=True, index=True, readonly=True)
+    subscription_id = fields.Many2one('sale.subscription', required=True, ondelete='cascade', readonly=True)
+    company_id = fields.Many2one('res.company', readonly=True)
+    company_currency_id = fields.Many2one('res.currency', string='Company Currency', readonly=True)
+    user_id = fields.Many2one('res.users', string='Salesperson', index=True, readonly=True)
+    team_id = fields.Many2one('crm.team', string='Sales Team', readonly=True)
+    template_id = fields.Many2one('sale.subscription.template', string='Subscription Template', readonly=True)
+    movement_type = fields.Selection([
+        ('new', 'New'),
+        ('reactivation', 'Reactivation'),
+        ('expansion', 'Expansion'),
+        ('contraction', 'Contraction'),
+        ('churn', 'Churn'),
+    ], readonly=True, help="Empty if the MRR did not change at the end of the day")
+    previous_mrr = fields.Monetary(currency_field='company_currency_id', readonly=True)
+    current_mrr = fields.Monetary(currency_field='company_currency_id', readonly=True)
+    new_mrr = fields.Monetary(currency_field='company_currency_id', readonly=True)
+    reactivated_mrr = fields.Monetary(currency_field='company_currency_id', readonly=True)
+    expansion_mrr = fields.Monetary(currency_field='company_currency_id', readonly=True)
+    contraction_mrr = fields.Monetary(currency_field='company_currency_id', readonly=True)
+    churned_mrr = fields.Monetary(currency_field='company_currency_id', readonly=True)
+    currency_id = fields.Many2one('res.currency', readonly=True)
+    mrr_changed = fields.Boolean(readonly=True, help="The subscription was created or its MRR changed this day")
+    recurring_monthly = fields.Monetary(
+        string='MRR after Change', readonly=True,
+        help="MRR after the last creation or change of MRR of the day, in the currency of the subscription")
+
+    _sql_constraints = [
+        ('subscription_date_uniq', 'unique (subscription_id, date)', "A subscription can only have one movement per day."),
+    ]
+
+    def init(self):
+        # Fills the movements the first time, they are then maintained on the logs' changes.
+        self.env.cr.execute("SELECT 1 FROM sale_subscription_mrr_movement LIMIT 1")
+        if self.env.cr.fetchone():
+            return
+        self.env.cr.execute("SELECT DISTINCT subscription_id FROM sale_subscription_log")
+        subscription_ids = [row[0] for row in self.env.cr.fetchall()]
+        for ids in split_every(1000, subscription_ids):
+            self._refresh_subscriptions(list(ids))
+            self.invalidate_cache(list(self._fields))
+
+    @api.model
+    def _refresh_subscriptions(self, subscription_ids):
+        """ Rebuilds the movements of ``subscription_ids`` from their logs. """
+        if not subscription_ids:
+            return
+        self = self.sudo()
+        self.flush(list(self._fields))
+        self.env.cr.execute(
+            "DELETE FROM sale_subscription_mrr_movement WHERE subscription_id IN %s",
+            [tuple(subscription_ids)])
+        self.invalidate_cache(list(self._fields))
+        logs = self.env['sale.subscription.log'].sudo().search(
+            [('subscription_id', 'in', list(subscription_ids))],
+            order='subscription_id, event_date, create_date, id')
+        rates = {}
+        vals_list = []
+        for subscription, subscription_logs in groupby(logs, key=lambda log: log.subscription_id):
+            churned = False
+            for date, day_logs in groupby(subscription_logs, key=lambda log: log.event_date):
+                day_logs = list(day_logs)
+                vals_list.append(self._prepare_movement_values(subscription, date, day_logs, churned, rates))
+                churned = churned or any(log.event_type == '2_churn' for log in day_logs)
+        self.create(vals_list)
+
+    @api.model
+    def _prepare_movement_values(self, subscription, date, logs, churned, rates):
+        """ Values of the movement of ``subscription`` merging its ``logs`` of ``date``.
+
+        :param churned: whether the subscription was churned before ``date``
+        :param rates: cache of the conversion rates to the company currency, updated in place
+        """
+        last_log = logs[-1]
+        key = (last_log.currency_id, last_log.company_currency_id, last_log.company_id, date)
+        if key not in rates:
+            rates[key] = self.env['res.currency']._get_conversion_rate(*key)
+        rate = rates[key]
+
+        n_creation = sum(log.event_type == '0_creation' for log in logs)
+        n_churn = sum(log.event_type == '2_churn' for log in logs)
+        previous_mrr = (logs[0].recurring_monthly - logs[0].amount_signed) * rate
+        current_mrr = last_log.recurring_monthly * rate
+        amounts = dict.fromkeys(['new_mrr', 'reactivated_mrr', 'expansion_mrr', 'contraction_mrr', 'churned_mrr'], 0.0)
+        if n_creation > n_churn:
+            # started this day: the changes of the day are part of the new MRR
+            movement_type = 'reactivation' if churned else 'new'
+            previous_mrr = 0.0
+            amounts['reactivated_mrr' if churned else 'new_mrr'] = current_mrr
+        elif n_churn > n_creation:
+            movement_type = 'churn'
+            current_mrr = 0.0
+            amounts['churned_mrr'] = previous_mrr
+        elif last_log.company_currency_id.compare_amounts(current_mrr, previous_mrr):
+            movement_type = 'expansion' if current_mrr > previous_mrr else 'contraction'
+            amounts['%s_mrr' % movement_type] = abs(current_mrr - previous_mrr)
+        else:
+            movement_type = False
+
+        mrr_logs = [log for log in logs if log.event_type in ('0_creation', '1_change')]
+        return dict(
+            amounts,
+            date=date,
+            subscription_id=subscription.id,
+            company_id=last_log.company_id.id,
+            company_currency_id=last_log.company_currency_id.id,
+            user_id=subscription.user_id.id,
+            team_id=subscription.team_id.id,
+            template_id=subscription.template_id.id,
+            movement_type=movement_type,
+            previous_mrr=previous_mrr,
+            current_mrr=current_mrr,
+            currency_id=last_log.currency_id.id,
+            mrr_changed=bool(mrr_logs),
+            recurring_monthly=mrr_logs[-1].recurring_monthly if mrr_logs else 0.0,
+        )
+
+    @api.model
+    def _get_recurring_monthly(self, subscription_ids, date):
+        """ The MRR of the subscriptions after their last creation or change of MRR
+        until ``date`` included, as a dict {subscription_id: recurring_monthly}. """
+        if not subscription_ids:
+            return {}
+        self.flush(['subscription_id', 'date', 'mrr_changed', 'recurring_monthly'])
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (subscription_id) subscription_id, recurring_monthly
+              FROM sale_subscription_mrr_movement
+             WHERE subscription_id IN %s
+               AND date <= %s
+               AND mrr_changed
+          ORDER BY subscription_id, date DESC
+        """, [tuple(subscription_ids), date])
+        return dict(self.env.cr.fetchall())
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 import datetime
 from dateutil.relativedelta import relativedelta
+from unittest.mock import patch
 
+from odoo.addons.base_automation.models.base_automation import BaseAutomation
 from odoo.addons.sale_subscription.tests.common_sale_subscription import TestSubscriptionCommon
 from odoo.exceptions import AccessError
 from odoo.tests import Form
@@ -290,6 +292,35 @@ class TestSubscription(TestSubscriptionCommon):
             inv = subscription._recurring_create_invoice()
             self.assertEqual(inv.invoice_line_ids[0].analytic_account_id, subscription.analytic_account_id)
 
+    @mute_logger('odoo.addons.sale_subscription.models.sale_subscription')
+    def test_09_recurring_invoices_batch(self):
+        """ The invoices are created in one batch, a faulty subscription is retried on its own and
+        does not prevent the other ones to be invoiced. """
+        self.subscription_tmpl.payment_mode = 'draft_invoice'
+        today = datetime.date.today()
+        subscriptions = self.env['sale.subscription'].create([{
+            'name': 'TestSubscription %s' % i,
+            'partner_id': self.user_portal.partner_id.id,
+            'pricelist_id': self.company_data['default_pricelist'].id,
+            'template_id': self.subscription_tmpl.id,
+            'analytic_account_id': self.account_1.id,
+            'recurring_next_date': today,
+            'recurring_invoice_line_ids': [(0, 0, {'product_id': self.product.id, 'name': 'TestRecurringLine', 'price_unit': 50, 'uom_id': self.product.uom_id.id})],
+        } for i in range(3)])
+        # no date of next invoice: the invoice can not be prepared
+        subscriptions[1].recurring_next_date = False
+
+        invoices = subscriptions.with_context(auto_commit=False)._recurring_create_invoice(automatic=True)
+        self.assertEqual(len(invoices), 2)
+        self.assertEqual(invoices.invoice_line_ids.subscription_id, subscriptions[0] | subscriptions[2])
+        self.assertEqual(invoices.invoice_line_ids.analytic_account_id, self.account_1)
+        for subscription in subscriptions[0] | subscriptions[2]:
+            self.assertEqual(subscription.recurring_next_date, today + relativedelta(months=1))
+            self.assertFalse(subscription.invoice_attempt_date)
+        self.assertFalse(subscriptions[1].recurring_next_date)
+        # the faulty subscription is left to the next day by the cron
+        self.assertEqual(subscriptions[1].invoice_attempt_date, today)
+
     def test_10_compute_kpi(self):
         self.subscription.template_id.write({
             'good_health_domain': "[('recurring_monthly', '>=', 120.0)]",
@@ -353,6 +384,75 @@ class TestSubscription(TestSubscriptionCommon):
         self.assertEqual(self.subscription.kpi_3months_mrr_percentage, 0.5)
         self.assertEqual(self.subscription.health, 'done')
 
+    def test_10_compute_kpi_batch(self):
+        """ The KPIs of several subscriptions are computed at once, only the changed values are written
+        and the alerts are evaluated once for all of them. """
+        self.subscription_tmpl.write({
+            'good_health_domain': "[('recurring_monthly', '>=', 120.0)]",
+            'bad_health_domain': "[('recurring_monthly', '<=', 80.0)]",
+        })
+        subscriptions = self.env['sale.subscription'].create([{
+            'name': 'TestSubscription %s' % i,
+            'partner_id': self.user_portal.partner_id.id,
+            'pricelist_id': self.company_data['default_pricelist'].id,
+            'template_id': self.subscription_tmpl.id,
+        } for i in range(3)])
+        for subscription, recurring_monthly in zip(subscriptions, [80.0, 100.0, 150.0]):
+            subscription.recurring_monthly = recurring_monthly
+
+        with patch.object(BaseAutomation, '_get_actions', autospec=True, side_effect=BaseAutomation._get_actions) as get_actions:
+            subscriptions._compute_kpi()
+        self.assertEqual(subscriptions.mapped('health'), ['bad', 'normal', 'done'])
+        self.assertEqual(get_actions.call_count, 1)
+
+        with patch.object(BaseAutomation, '_get_actions', autospec=True, side_effect=BaseAutomation._get_actions) as get_actions:
+            subscriptions._compute_kpi()
+        self.assertEqual(get_actions.call_count, 0, "The KPIs did not change, nothing should be written")
+
+    def test_10_mrr_movements(self):
+        today = datetime.date.today()
+
+        def log(days_ago, event_type, recurring_monthly, amount_signed):
+            date_log = today - relativedelta(days=days_ago)
+            self.env['sale.subscription.log'].sudo().create({
+                'event_type': event_type,
+                'event_date': date_log,
+                'create_date': date_log,
+                'subscription_id': self.subscription.id,
+                'recurring_monthly': recurring_monthly,
+                'amount_signed': amount_signed,
+                'currency_id': self.subscription.currency_id.id,
+                'category': 'progress',
+                'user_id': self.subscription.user_id.id,
+                'team_id': self.subscription.team_id.id,
+            })
+
+        log(60, '0_creation', 100, 100)
+        log(40, '1_change', 120, 20)
+        log(20, '1_change', 130, 10)
+        log(20, '1_change', 100, -30)
+        log(10, '2_churn', 0, -100)
+        log(5, '0_creation', 50, 50)
+        log(5, '1_change', 80, 30)
+
+        movements = self.env['sale.subscription.mrr.movement'].search([('subscription_id', '=', self.subscription.id)])
+        self.assertRecordValues(movements, [
+            {'date': today - relativedelta(days=60), 'movement_type': 'new', 'new_mrr': 100, 'previous_mrr': 0, 'current_mrr': 100},
+            {'date': today - relativedelta(days=40), 'movement_type': 'expansion', 'expansion_mrr': 20, 'previous_mrr': 100, 'current_mrr': 120},
+            {'date': today - relativedelta(days=20), 'movement_type': 'contraction', 'contraction_mrr': 20, 'previous_mrr': 120, 'current_mrr': 100},
+            {'date': today - relativedelta(days=10), 'movement_type': 'churn', 'churned_mrr': 100, 'previous_mrr': 100, 'current_mrr': 0},
+            {'date': today - relativedelta(days=5), 'movement_type': 'reactivation', 'reactivated_mrr': 80, 'previous_mrr': 0, 'current_mrr': 80},
+        ])
+        self.assertEqual(set(movements.mapped('template_id')), {self.subscription.template_id})
+        self.assertEqual(
+            self.env['sale.subscription.mrr.movement']._get_recurring_monthly(self.subscription.ids, today - relativedelta(days=7)),
+            {self.subscription.id: 100.0},
+            "The churn should not be taken as the last MRR of the subscription",
+        )
+
+        self.subscription.template_id = self.subscription_tmpl_2
+        self.assertEqual(set(movements.mapped('template_id')), {self.subscription_tmpl_2})
+
     def test_11_onchange_date_start(self):
         recurring_bound_tmpl = self.env['sale.subscription.template'].create({
             'name': 'Recurring Bound Template',
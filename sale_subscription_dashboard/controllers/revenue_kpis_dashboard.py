@@ -74,7 +74,7 @@ class RevenueKPIsDashboard(http.Controller):
 
         end_date = fields.Date.from_string(end_date)
 
-        net_new_mrr = compute_mrr_growth_values(end_date, end_date, filters)['net_new_mrr']
+        net_new_mrr = compute_mrr_growth_values([(end_date, end_date)], filters)[0]['net_new_mrr']
         revenue_churn = self.compute_stat('revenue_churn', end_date, end_date, filters)
 
         result = {
@@ -102,16 +102,16 @@ class RevenueKPIsDashboard(http.Controller):
         start_date = fields.Date.from_string(start_date)
         end_date = fields.Date.from_string(end_date)
 
-        results = {}
+        deltas = [1, 3, 12]
+        values = self._compute_stat_periods(stat_type, [
+            (start_date - relativedelta(months=+delta), end_date - relativedelta(months=+delta))
+            for delta in deltas
+        ], filters)
 
-        for delta in [1, 3, 12]:
-            results['value_' + str(delta) + '_months_ago'] = self.compute_stat(
-                stat_type,
-                start_date - relativedelta(months=+delta),
-                end_date - relativedelta(months=+delta),
-                filters)
-
-        return results
+        return {
+            'value_' + str(delta) + '_months_ago': value
+            for delta, value in zip(deltas, values)
+        }
 
     @http.route('/sale_subscription_dashboard/get_stats_by_plan', type='json', auth='user')
     def get_stats_by_plan(self, stat_type, start_date, end_date, filters):
@@ -160,12 +160,10 @@ class RevenueKPIsDashboard(http.Controller):
         results = defaultdict(list)
 
         # This is rolling month calculation
-        for i in ticks:
-            date = start_date + timedelta(days=i)
+        dates = [start_date + timedelta(days=i) for i in ticks]
+        for date, computed_values in zip(dates, compute_mrr_growth_values([(date, date) for date in dates], filters)):
             date_splitted = str(date).split(' ')[0]
 
-            computed_values = compute_mrr_growth_values(date, date, filters)
-
             for k in ['new_mrr', 'churned_mrr', 'expansion_mrr', 'down_mrr', 'net_new_mrr']:
                 results[k].append({
                     '0': date_splitted,
@@ -196,19 +194,15 @@ class RevenueKPIsDashboard(http.Controller):
 
         ticks = self._get_pruned_tick_values(range(delta.days + 1), points_limit)
 
-        results = []
-        for i in ticks:
-            # METHOD NON-OPTIMIZED (could optimize it using SQL with generate_series)
-            date = start_date + timedelta(days=i)
-            value = self.compute_stat(stat_type, date, date, filters)
+        dates = [start_date + timedelta(days=i) for i in ticks]
+        # all the ticks are computed at once, see `_execute_periods_query`
+        values = self._compute_stat_periods(stat_type, [(date, date) for date in dates], filters)
 
-            # format of results could be changed (we no longer use nvd3)
-            results.append({
-                '0': str(date).split(' ')[0],
-                '1': value,
-            })
-
-        return results
+        # format of results could be changed (we no longer use nvd3)
+        return [{
+            '0': str(date).split(' ')[0],
+            '1': value,
+        } for date, value in zip(dates, values)]
 
     def _compute_stat_trend(self, stat_type, start_date, end_date, filters):
 
@@ -217,8 +211,10 @@ class RevenueKPIsDashboard(http.Controller):
         start_date_delta = start_date - relativedelta(months=+1)
         end_date_delta = end_date - relativedelta(months=+1)
 
-        last_month_value = self.compute_stat(stat_type, start_date_delta, end_date_delta, filters)
-        current_value = self.compute_stat(stat_type, start_date, end_date, filters)
+        last_month_value, current_value = self._compute_stat_periods(stat_type, [
+            (start_date_delta, end_date_delta),
+            (start_date, end_date),
+        ], filters)
         perc = 100 if not last_month_value else round(100 * (current_value - last_month_value) / float(last_month_value), 1)
         perc = 0 if not last_month_value and not current_value else perc
 
@@ -232,10 +228,12 @@ class RevenueKPIsDashboard(http.Controller):
     @http.route('/sale_subscription_dashboard/compute_stat', type='json', auth='user')
     def compute_stat(self, stat_type, start_date, end_date, filters):
 
-        start_date = fields.Date.to_date(start_date)
-        end_date = fields.Date.to_date(end_date)
+        return self._compute_stat_periods(stat_type, [(start_date, end_date)], filters)[0]
 
-        return STAT_TYPES[stat_type]['compute'](start_date, end_date, filters)
+    def _compute_stat_periods(self, stat_type, periods, filters):
+        """ Computes the stat for each (start_date, end_date) of ``periods``, in a few queries whatever their number. """
+        periods = [(fields.Date.to_date(start_date), fields.Date.to_date(end_date)) for start_date, end_date in periods]
+        return STAT_TYPES[stat_type]['compute'](periods, filters)
 
     def _get_pruned_tick_values(self, ticks, nb_desired_ticks):
         if nb_desired_ticks == 0:
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+from collections import defaultdict
 from dateutil.relativedelta import relativedelta
 from odoo.http import request
 from odoo import _lt
@@ -8,25 +9,42 @@ from odoo import _lt
 from datetime import datetime
 
 
-def currency_normalisation(sql_result, sum_name):
-    result = 0
-    currencies = request.env['res.currency'].browse(
-        [row['currency_id'] for row in sql_result if row.get('currency_id')]
-        + [row['company_currency_id'] for row in sql_result if row.get('company_currency_id')])
-    currencies_mapped = {c.id: c for c in currencies}
+def _get_currency_rates(sql_result):
+    """ Returns the rates converting the amounts of ``sql_result`` to the company currency,
+    as a dict {(currency_id, company_currency_id): rate}. The rates are looked up once per
+    couple of currencies, at today's date. """
+    Currency = request.env['res.currency']
+    date = datetime.utcnow().date()
+    rates = {}
+    for row in sql_result:
+        key = (row.get('currency_id'), row.get('company_currency_id'))
+        if key[0] and key not in rates:
+            rates[key] = Currency._get_conversion_rate(
+                Currency.browse(key[0]), Currency.browse(key[1]), request.env.company, date)
+    return rates
+
+
+def currency_normalisation(sql_result, sum_name, rates=None):
+    """ Sums the ``sum_name`` amounts of ``sql_result`` converted to the company currency.
+
+    The amounts are summed per currency before being converted, so the rows can either be
+    the raw lines or already be grouped by currency in the query.
+
+    :param rates: the result of `_get_currency_rates`, computed from ``sql_result`` if not given
+    """
+    if rates is None:
+        rates = _get_currency_rates(sql_result)
+    amounts = defaultdict(float)
     for row in sql_result:
         if not row.get('currency_id'):
             # account move line in the same currency than the company currency
-            amount = row[sum_name]
+            amounts[None] += row[sum_name] or 0
         else:
-            currency_id = currencies_mapped[row['currency_id']]
-            company_currency_id = currencies_mapped[row['company_currency_id']]
-            amount_foreign_cur = row[sum_name]
-            company_id = request.env.company
-            amount = currency_id._convert(
-                from_amount=amount_foreign_cur, to_currency=company_currency_id,
-                company=company_id, date=datetime.utcnow().date())
-        result += amount
+            amounts[row['currency_id'], row['company_currency_id']] += row[sum_name] or 0
+    result = amounts.pop(None, 0)
+    for (currency_id, company_currency_id), amount in amounts.items():
+        company_currency = request.env['res.currency'].browse(company_currency_id)
+        result += company_currency.round(amount * rates[currency_id, company_currency_id])
     return result
 
 def _execute_sql_query(fields, tables, conditions, query_args, filters, groupby=None):
@@ -86,66 +104,114 @@ def _build_sql_query(fields, tables, conditions, query_args, filters, groupby=No
     return base_query, query_args
 
 
-def compute_net_revenue(start_date, end_date, filters):
-    fields = ['account_move_line.price_subtotal,account_move_line.currency_id,account_move_line.company_currency_id']
+# The periods for which the stats are computed, joined to the queries of `_execute_periods_query`
+PERIODS_TABLE = "unnest(%(date_from)s::date[], %(date_to)s::date[]) WITH ORDINALITY AS period(date_from, date_to, index)"
+
+
+def _subscription_active_condition(date, alias='account_move_line'):
+    """ Condition on the subscription lines active at ``date`` (an SQL expression), written
+    to match the GiST index on the subscription period of the lines. """
+    return (
+        "{alias}.subscription_end_date >= {alias}.subscription_start_date"
+        " AND daterange({alias}.subscription_start_date, {alias}.subscription_end_date, '[]') @> ({date})::date"
+    ).format(alias=alias, date=date)
+
+
+def _execute_periods_query(fields, tables, conditions, periods, filters, groupby=None):
+    """ Same as `_execute_sql_query`, for all the ``periods`` at once.
+
+    The ``period`` table (with ``date_from``, ``date_to`` and ``index`` columns) is joined to the
+    query, which is grouped by period: the ``period`` column of the results is the position of
+    their period in ``periods``, starting from 1.
+    """
+    return _execute_sql_query(
+        fields + ['period.index AS period'],
+        tables + [PERIODS_TABLE],
+        conditions,
+        {
+            'date_from': [start_date for start_date, _end_date in periods],
+            'date_to': [end_date for _start_date, end_date in periods],
+        },
+        filters,
+        groupby=', '.join(['period.index'] + ([groupby] if groupby else [])),
+    )
+
+
+def _currency_normalisation_by_period(sql_results, sum_name, periods):
+    rates = _get_currency_rates(sql_results)
+    rows_by_period = [[] for _period in periods]
+    for row in sql_results:
+        rows_by_period[row['period'] - 1].append(row)
+    return [currency_normalisation(rows, sum_name, rates=rates) for rows in rows_by_period]
+
+
+def _count_by_period(sql_results, periods):
+    counts = [0] * len(periods)
+    for row in sql_results:
+        counts[row['period'] - 1] = row['sum'] or 0
+    return counts
+
+
+def compute_net_revenue(periods, filters):
+    fields = ['SUM(account_move_line.price_subtotal) AS price_subtotal', 'account_move_line.currency_id', 'account_move_line.company_currency_id']
     tables = ['account_move_line', 'account_move']
     conditions = [
-        "account_move.invoice_date BETWEEN %(start_date)s AND %(end_date)s",
+        "account_move.invoice_date BETWEEN period.date_from AND period.date_to",
         "account_move_line.move_id = account_move.id",
         "account_move.move_type IN ('out_invoice', 'out_refund')",
         "account_move.state NOT IN ('draft', 'cancel')",
         "account_move_line.exclude_from_invoice_tab = False",
     ]
 
-    sql_results = _execute_sql_query(fields, tables, conditions, {
-        'start_date': start_date,
-        'end_date': end_date,
-    }, filters)
+    sql_results = _execute_periods_query(fields, tables, conditions, periods, filters,
+                                         groupby='account_move_line.currency_id, account_move_line.company_currency_id')
 
-    return currency_normalisation(sql_results, 'price_subtotal')
+    return _currency_normalisation_by_period(sql_results, 'price_subtotal', periods)
 
 
-def compute_arpu(start_date, end_date, filters):
-    mrr = compute_mrr(start_date, end_date, filters)
-    nb_customers = compute_nb_contracts(start_date, end_date, filters)
-    result = 0 if not nb_customers else mrr/float(nb_customers)
-    return int(result)
+def compute_arpu(periods, filters):
+    mrr = compute_mrr(periods, filters)
+    nb_customers = compute_nb_contracts(periods, filters)
+    return [
+        int(0 if not period_nb_customers else period_mrr/float(period_nb_customers))
+        for period_mrr, period_nb_customers in zip(mrr, nb_customers)
+    ]
 
 
-def compute_arr(start_date, end_date, filters):
-    result = 12*compute_mrr(start_date, end_date, filters)
-    return int(result)
+def compute_arr(periods, filters):
+    return [int(12*period_mrr) for period_mrr in compute_mrr(periods, filters)]
 
 
-def compute_ltv(start_date, end_date, filters):
-    fields = ['account_move_line.subscription_mrr', 'account_move_line.subscription_id',
-              'account_move_line.currency_id', 'account_move_line.company_currency_id', 'account_move_line.company_id']
+def compute_ltv(periods, filters):
+    fields = ['SUM(account_move_line.subscription_mrr) AS subscription_mrr',
+              'account_move_line.currency_id', 'account_move_line.company_currency_id']
     tables = ['account_move_line', 'account_move']
     conditions = [
-        "date %(date)s BETWEEN account_move_line.subscription_start_date AND account_move_line.subscription_end_date",
+        _subscription_active_condition("period.date_to"),
         "account_move.id = account_move_line.move_id",
         "account_move.move_type IN ('out_invoice', 'out_refund')",
         "account_move.state NOT IN ('draft', 'cancel')"
     ]
 
-    sql_results = _execute_sql_query(fields, tables, conditions, {
-        'date': end_date,
-    }, filters)
+    sql_results = _execute_periods_query(fields, tables, conditions, periods, filters,
+                                         groupby='account_move_line.currency_id, account_move_line.company_currency_id')
 
-    sum_mrr = currency_normalisation(sql_results, 'subscription_mrr')
-    n_customer = len({x['subscription_id'] for x in sql_results})
-    avg_mrr_per_customer = sum_mrr/n_customer if n_customer else 0
-    logo_churn = compute_logo_churn(start_date, end_date, filters)
-    result = 0 if logo_churn == 0 else avg_mrr_per_customer/float(logo_churn)
-    return int(result)
+    sum_mrr = _currency_normalisation_by_period(sql_results, 'subscription_mrr', periods)
+    n_customers = compute_nb_contracts(periods, filters)
+    logo_churn = compute_logo_churn(periods, filters)
+    result = []
+    for period_sum_mrr, n_customer, period_logo_churn in zip(sum_mrr, n_customers, logo_churn):
+        avg_mrr_per_customer = period_sum_mrr/n_customer if n_customer else 0
+        result.append(int(0 if period_logo_churn == 0 else avg_mrr_per_customer/float(period_logo_churn)))
+    return result
 
 
-def compute_nrr(start_date, end_date, filters):
-    fields = ['account_move_line.price_subtotal', 'account_move_line.currency_id',
-              'account_move_line.company_currency_id', 'account_move_line.company_id']
+def compute_nrr(periods, filters):
+    fields = ['SUM(account_move_line.price_subtotal) AS price_subtotal', 'account_move_line.currency_id',
+              'account_move_line.company_currency_id']
     tables = ['account_move_line', 'account_move']
     conditions = [
-        "(account_move.invoice_date BETWEEN %(start_date)s AND %(end_date)s)",
+        "(account_move.invoice_date BETWEEN period.date_from AND period.date_to)",
         "account_move_line.move_id = account_move.id",
         "account_move.move_type IN ('out_invoice', 'out_refund')",
         "account_move.state NOT IN ('draft', 'cancel')",
@@ -153,71 +219,64 @@ def compute_nrr(start_date, end_date, filters):
         "account_move_line.exclude_from_invoice_tab = false",
     ]
 
-    sql_results = _execute_sql_query(fields, tables, conditions, {
-        'start_date': start_date,
-        'end_date': end_date,
-    }, filters)
-    return currency_normalisation(sql_results, 'price_subtotal')
+    sql_results = _execute_periods_query(fields, tables, conditions, periods, filters,
+                                         groupby='account_move_line.currency_id, account_move_line.company_currency_id')
+    return _currency_normalisation_by_period(sql_results, 'price_subtotal', periods)
 
 
-def compute_nb_contracts(start_date, end_date, filters):
+def compute_nb_contracts(periods, filters):
     fields = ['COUNT(DISTINCT account_move_line.subscription_id) AS sum']
     tables = ['account_move_line', 'account_move']
     conditions = [
-        "date %(date)s BETWEEN account_move_line.subscription_start_date AND account_move_line.subscription_end_date",
+        _subscription_active_condition("period.date_to"),
         "account_move.id = account_move_line.move_id",
         "account_move.move_type IN ('out_invoice', 'out_refund')",
         "account_move.state NOT IN ('draft', 'cancel')",
         #"account_move_line.subscription_id IS NOT NULL"
     ]
 
-    sql_results = _execute_sql_query(fields, tables, conditions, {
-        'date': end_date,
-    }, filters)
+    sql_results = _execute_periods_query(fields, tables, conditions, periods, filters)
 
-    return 0 if not sql_results or not sql_results[0]['sum'] else sql_results[0]['sum']
+    return _count_by_period(sql_results, periods)
 
 
-def compute_mrr(start_date, end_date, filters):
-    fields = ["(CASE WHEN account_move.move_type = 'out_invoice' THEN 1 ELSE -1 END) * account_move_line.subscription_mrr as subscription_mrr",
-              'account_move_line.currency_id', 'account_move_line.company_currency_id', 'account_move_line.company_id']
+def compute_mrr(periods, filters):
+    fields = ["SUM((CASE WHEN account_move.move_type = 'out_invoice' THEN 1 ELSE -1 END) * account_move_line.subscription_mrr) as subscription_mrr",
+              'account_move_line.currency_id', 'account_move_line.company_currency_id']
     tables = ['account_move_line', 'account_move']
     conditions = [
-        "date %(date)s BETWEEN account_move_line.subscription_start_date AND account_move_line.subscription_end_date",
+        _subscription_active_condition("period.date_to"),
         "account_move.id = account_move_line.move_id",
         "account_move.move_type IN ('out_invoice', 'out_refund')",
         "account_move.state NOT IN ('draft', 'cancel')"
     ]
 
-    sql_results = _execute_sql_query(fields, tables, conditions, {
-        'date': end_date,
-    }, filters)
+    sql_results = _execute_periods_query(fields, tables, conditions, periods, filters,
+                                         groupby='account_move_line.currency_id, account_move_line.company_currency_id')
 
-    return currency_normalisation(sql_results, 'subscription_mrr')
+    return _currency_normalisation_by_period(sql_results, 'subscription_mrr', periods)
 
 
-def compute_logo_churn(start_date, end_date, filters):
+def compute_logo_churn(periods, filters):
 
     fields = ['COUNT(DISTINCT account_move_line.subscription_id) AS sum']
     tables = ['account_move_line', 'account_move']
     conditions = [
-        "date %(date)s - interval '1 months' BETWEEN account_move_line.subscription_start_date AND account_move_line.subscription_end_date",
+        _subscription_active_condition("period.date_to - interval '1 months'"),
         "account_move.id = account_move_line.move_id",
         "account_move.move_type IN ('out_invoice', 'out_refund')",
         "account_move.state NOT IN ('draft', 'cancel')",
         "account_move_line.subscription_id IS NOT NULL"
     ]
 
-    sql_results = _execute_sql_query(fields, tables, conditions, {
-        'date': end_date,
-    }, filters)
+    sql_results = _execute_periods_query(fields, tables, conditions, periods, filters)
 
-    active_customers_1_month_ago = 0 if not sql_results or not sql_results[0]['sum'] else sql_results[0]['sum']
+    active_customers_1_month_ago = _count_by_period(sql_results, periods)
 
     fields = ['COUNT(DISTINCT account_move_line.subscription_id) AS sum']
     tables = ['account_move_line', 'account_move']
     conditions = [
-        "date %(date)s - interval '1 months' BETWEEN account_move_line.subscription_start_date AND account_move_line.subscription_end_date",
+        _subscription_active_condition("period.date_to - interval '1 months'"),
         "account_move.id = account_move_line.move_id",
         "account_move.move_type IN ('out_invoice', 'out_refund')",
         "account_move.state NOT IN ('draft', 'cancel')",
@@ -225,61 +284,28 @@ def compute_logo_churn(start_date, end_date, filters):
         """NOT exists (
                     SELECT 1 from account_move_line ail
                     WHERE ail.subscription_id = account_move_line.subscription_id
-                    AND (date %(date)s BETWEEN ail.subscription_start_date AND ail.subscription_end_date)
+                    AND %s
                 )
-        """,
+        """ % _subscription_active_condition("period.date_to", alias='ail'),
     ]
 
-    sql_results = _execute_sql_query(fields, tables, conditions, {
-        'date': end_date,
-    }, filters)
+    sql_results = _execute_periods_query(fields, tables, conditions, periods, filters)
 
-    resigned_customers = 0 if not sql_results or not sql_results[0]['sum'] else sql_results[0]['sum']
+    resigned_customers = _count_by_period(sql_results, periods)
 
-    return 0 if not active_customers_1_month_ago else 100*resigned_customers/float(active_customers_1_month_ago)
-
-
-def compute_revenue_churn(start_date, end_date, filters):
-
-    fields = ['account_move_line.subscription_mrr,account_move_line.currency_id,account_move_line.company_currency_id',
-              'account_move_line.company_id']
-    tables = ['account_move_line', 'account_move']
-    conditions = [
-        "date %(date)s - interval '1 months' BETWEEN account_move_line.subscription_start_date AND account_move_line.subscription_end_date",
-        "account_move.id = account_move_line.move_id",
-        "account_move.move_type IN ('out_invoice', 'out_refund')",
-        "account_move.state NOT IN ('draft', 'cancel')",
-        "account_move_line.subscription_id IS NOT NULL",
-        """NOT exists (
-                    SELECT 1 from account_move_line ail
-                    WHERE ail.subscription_id = account_move_line.subscription_id
-                    AND (date %(date)s BETWEEN ail.subscription_start_date AND ail.subscription_end_date)
-                )
-        """
+    return [
+        0 if not period_active_customers else 100*period_resigned_customers/float(period_active_customers)
+        for period_active_customers, period_resigned_customers in zip(active_customers_1_month_ago, resigned_customers)
     ]
 
-    sql_results = _execute_sql_query(fields, tables, conditions, {
-        'date': end_date,
-    }, filters)
 
-    churned_mrr = currency_normalisation(sql_results, 'subscription_mrr')
-    previous_month_mrr = compute_mrr(start_date, (end_date - relativedelta(months=+1)), filters)
-    return 0 if previous_month_mrr == 0 else 100*churned_mrr/float(previous_month_mrr)
+def compute_revenue_churn(periods, filters):
 
-
-def compute_mrr_growth_values(start_date, end_date, filters):
-    new_mrr = 0
-    expansion_mrr = 0
-    down_mrr = 0
-    churned_mrr = 0
-    net_new_mrr = 0
-
-    # 1. NEW
-    fields = ['account_move_line.subscription_mrr,account_move_line.currency_id,account_move_line.company_currency_id',
-              'account_move_line.company_id']
+    fields = ['SUM(account_move_line.subscription_mrr) AS subscription_mrr', 'account_move_line.currency_id',
+              'account_move_line.company_currency_id']
     tables = ['account_move_line', 'account_move']
     conditions = [
-        "date %(date)s BETWEEN account_move_line.subscription_start_date AND account_move_line.subscription_end_date",
+        _subscription_active_condition("period.date_to - interval '1 months'"),
         "account_move.id = account_move_line.move_id",
         "account_move.move_type IN ('out_invoice', 'out_refund')",
         "account_move.state NOT IN ('draft', 'cancel')",
@@ -287,94 +313,83 @@ def compute_mrr_growth_values(start_date, end_date, filters):
         """NOT exists (
                     SELECT 1 from account_move_line ail
                     WHERE ail.subscription_id = account_move_line.subscription_id
-                    AND (date %(date)s - interval '1 months' BETWEEN ail.subscription_start_date AND ail.subscription_end_date)
+                    AND %s
                 )
-        """
+        """ % _subscription_active_condition("period.date_to", alias='ail'),
     ]
 
-    sql_results = _execute_sql_query(fields, tables, conditions, {
-        'date': end_date,
-    }, filters)
+    sql_results = _execute_periods_query(fields, tables, conditions, periods, filters,
+                                         groupby='account_move_line.currency_id, account_move_line.company_currency_id')
 
-    new_mrr = currency_normalisation(sql_results, 'subscription_mrr')
+    churned_mrr = _currency_normalisation_by_period(sql_results, 'subscription_mrr', periods)
+    previous_month_mrr = compute_mrr([
+        (start_date, end_date - relativedelta(months=+1)) for start_date, end_date in periods
+    ], filters)
+    return [
+        0 if period_previous_mrr == 0 else 100*period_churned_mrr/float(period_previous_mrr)
+        for period_churned_mrr, period_previous_mrr in zip(churned_mrr, previous_month_mrr)
+    ]
 
-    # 2. DOWN & EXPANSION
-    ##############################
-    # We rely on the sale_subscription_log value because comparing aml evolution is too verbose
-    # with currency conversion.
-    # The log already have the converted currencies.
 
-    fields = ['sale_subscription_log.amount_company_currency AS diff']
-    tables = ['sale_subscription_log', 'sale_subscription_template', 'sale_subscription']
+def compute_mrr_growth_values(periods, filters):
+    """ The MRR movements of the month (rolling) before the end of each period, read from
+    the `sale.subscription.mrr.movement` table. The movements are in the company currency. """
+    request.env['sale.subscription.mrr.movement'].flush()
     conditions = [
-        "sale_subscription_log.event_type = '1_change'",
-        "sale_subscription_template.id = sale_subscription.template_id",
-        "sale_subscription.id = sale_subscription_log.subscription_id",
-        "sale_subscription_log.event_date >= %(date)s",
-        "sale_subscription_log.event_date >= %(date)s",
+        "movement.date > (period.date_to - interval '1 months')::date",
+        "movement.date <= period.date_to",
     ]
-
-    query_args = {'date': end_date}
+    query_args = {
+        'date_from': [start_date for start_date, _end_date in periods],
+        'date_to': [end_date for _start_date, end_date in periods],
+    }
     if filters.get('template_ids'):
-        conditions.append("sale_subscription.template_id IN %(template_ids)s")
+        conditions.append("movement.template_id IN %(template_ids)s")
         query_args['template_ids'] = tuple(filters.get('template_ids'))
 
     if filters.get('sale_team_ids'):
-        conditions.append("sale_subscription_log.team_id IN %(team_ids)s")
-        conditions.append("sale_subscription.team_id IN %(team_ids)s")
+        conditions.append("movement.team_id IN %(team_ids)s")
         query_args['team_ids'] = tuple(filters.get('sale_team_ids'))
 
     if filters.get('tag_ids'):
-        tables.append("sale_subscription")
-        conditions.append("sale_subscription.tag_ids = IN %(tag_ids)s)")
+        conditions.append("""EXISTS (
+            SELECT 1 FROM account_analytic_tag_sale_subscription_rel rel
+             WHERE rel.sale_subscription_id = movement.subscription_id
+               AND rel.account_analytic_tag_id IN %(tag_ids)s
+        )""")
         query_args['tag_ids'] = tuple(filters.get('tag_ids'))
 
     if filters.get('company_ids'):
-        conditions.append("sale_subscription_log.company_id IN %(company_ids)s")
-        conditions.append("sale_subscription.company_id IN %(company_ids)s")
+        conditions.append("movement.company_id IN %(company_ids)s")
         query_args['company_ids'] = tuple(filters.get('company_ids'))
 
-    # Filters are empty in the following call because we took care above
-    sql_results = _execute_sql_query(fields, tables, conditions, query_args, {})
-
-    for account in sql_results:
-        if account['diff'] > 0:
-            expansion_mrr += account['diff']
-        else:
-            down_mrr -= account['diff']
-
-    # 3. CHURNED
-    fields = ['account_move_line.subscription_mrr']
-    tables = ['account_move_line', 'account_move']
-    conditions = [
-        "date %(date)s - interval '1 months' BETWEEN account_move_line.subscription_start_date AND account_move_line.subscription_end_date",
-        "account_move.id = account_move_line.move_id",
-        "account_move.move_type IN ('out_invoice', 'out_refund')",
-        "account_move.state NOT IN ('draft', 'cancel')",
-        "account_move_line.subscription_id IS NOT NULL",
-        """NOT exists (
-                    SELECT 1 from account_move_line ail
-                    WHERE ail.subscription_id = account_move_line.subscription_id
-                    AND (date %(date)s BETWEEN ail.subscription_start_date AND ail.subscription_end_date)
-                )
-        """,
-    ]
-
-    sql_results = _execute_sql_query(fields, tables, conditions, {
-        'date': end_date,
-    }, filters)
-
-    churned_mrr = currency_normalisation(sql_results, 'subscription_mrr')
-
-    net_new_mrr = new_mrr - churned_mrr + expansion_mrr - down_mrr
-
-    return {
-        'new_mrr': new_mrr,
-        'churned_mrr': -churned_mrr,
-        'expansion_mrr': expansion_mrr,
-        'down_mrr': -down_mrr,
-        'net_new_mrr': net_new_mrr,
-    }
+    request.cr.execute("""
+        SELECT period.index AS period,
+               COALESCE(SUM(movement.new_mrr + movement.reactivated_mrr), 0) AS new_mrr,
+               COALESCE(SUM(movement.churned_mrr), 0) AS churned_mrr,
+               COALESCE(SUM(movement.expansion_mrr), 0) AS expansion_mrr,
+               COALESCE(SUM(movement.contraction_mrr), 0) AS down_mrr
+          FROM sale_subscription_mrr_movement movement, %s
+         WHERE %s
+      GROUP BY period.index
+    """ % (PERIODS_TABLE, ' AND '.join(conditions)), query_args)
+    values_by_period = {row['period']: row for row in request.cr.dictfetchall()}
+
+    results = []
+    for index in range(1, len(periods) + 1):
+        values = values_by_period.get(index, {})
+        new_mrr = values.get('new_mrr', 0)
+        churned_mrr = values.get('churned_mrr', 0)
+        expansion_mrr = values.get('expansion_mrr', 0)
+        down_mrr = values.get('down_mrr', 0)
+        results.append({
+            'new_mrr': new_mrr,
+            'churned_mrr': -churned_mrr,
+            'expansion_mrr': expansion_mrr,
+            'down_mrr': -down_mrr,
+            'net_new_mrr': new_mrr - churned_mrr + expansion_mrr - down_mrr,
+        })
+    return results
 
 
 STAT_TYPES = {
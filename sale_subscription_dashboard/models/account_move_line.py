@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import models
+
+
+class AccountMoveLine(models.Model):
+    _inherit = 'account.move.line'
+
+    def init(self):
+        super().init()
+        # The dashboard stats look for the subscription lines active at given dates,
+        # see `_subscription_active_condition`.
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS account_move_line_subscription_period_idx
+                ON account_move_line USING gist (daterange(subscription_start_date, subscription_end_date, '[]'))
+             WHERE subscription_end_date >= subscription_start_date
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS account_move_line_subscription_id_idx
+                ON account_move_line (subscription_id)
+             WHERE subscription_id IS NOT NULL
+        """)
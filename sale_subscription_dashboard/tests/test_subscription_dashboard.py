@@ -124,3 +124,54 @@ class TestSubscriptionDashboard(HttpCase):
         self.assertEqual(res.status_code, 200, "Should OK")
         res_data = res.json()["result"]
         self.assertEqual(res_data["stats"]["value_2"], nrr_before, "NRR should not change after adding a subscription")
+
+    def test_graph_periods(self):
+        self.subscription.write(
+            {
+                "recurring_next_date": fields.Date.to_string(datetime.date.today()),
+                "recurring_invoice_line_ids": [
+                    (
+                        0,
+                        0,
+                        {
+                            "product_id": self.product.id,
+                            "name": "TestRecurringLine",
+                            "price_unit": 50,
+                            "uom_id": self.product.uom_id.id,
+                        },
+                    )
+                ],
+                "stage_id": self.ref("sale_subscription.sale_subscription_stage_in_progress"),
+            }
+        )
+        invoice_id = self.subscription.with_context(auto_commit=False)._recurring_create_invoice(automatic=True)
+        invoice_id._post()
+
+        self.authenticate("test_user_1", "P@ssw0rd!")
+        start_date = datetime.date.today() - datetime.timedelta(days=5)
+        end_date = datetime.date.today() + datetime.timedelta(days=5)
+        for stat_type in ["mrr", "nb_contracts", "arpu", "net_revenue", "logo_churn"]:
+            graph = self._json_request("/sale_subscription_dashboard/compute_graph", {
+                "stat_type": stat_type,
+                "start_date": fields.Date.to_string(start_date),
+                "end_date": fields.Date.to_string(end_date),
+                "filters": {},
+                "points_limit": 0,
+            })
+            self.assertEqual(len(graph), 11)
+            for point in graph:
+                value = self._json_request("/sale_subscription_dashboard/compute_stat", {
+                    "stat_type": stat_type,
+                    "start_date": point["0"],
+                    "end_date": point["0"],
+                    "filters": {},
+                })
+                self.assertEqual(point["1"], value, "The graph should match the stat computed for the tick alone")
+            if stat_type == "mrr":
+                self.assertFalse(graph[0]["1"], "The subscription was not active yet")
+                self.assertTrue(graph[5]["1"], "The subscription is active today")
+
+    def _json_request(self, url, params):
+        res = self.url_open(url, data=json.dumps({"params": params}), headers={"Content-Type": "application/json"})
+        self.assertEqual(res.status_code, 200, "Should OK")
+        return res.json()["result"]
@@ -132,6 +132,9 @@ class Sign(http.Controller):
         elif download_type == "origin":
             document = sign_request.template_id.attachment_id.datas
         elif download_type == "completed":
+            if not sign_request.completed_document and sign_request.completed_document_pending:
+                # the document has not been generated in the background yet
+                sign_request.generate_completed_document()
             document = sign_request.completed_document
             if not document: # if the document is completed but the document is encrypted
                 return request.redirect('/sign/password/%(request_id)s/%(access_token)s' % {'request_id': id, 'access_token': token})
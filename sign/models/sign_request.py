@@ -3,7 +3,9 @@
 
 import base64
 import io
+import logging
 import os
+import threading
 import time
 import uuid
 
@@ -23,6 +25,11 @@ from odoo import api, fields, models, http, _, Command
 from odoo.tools import DEFAULT_SERVER_DATE_FORMAT, config, get_lang, is_html_empty, formataddr
 from odoo.exceptions import UserError, ValidationError
 
+_logger = logging.getLogger(__name__)
+
+# Number of times the generation of a completed document is tried before giving up
+COMPLETED_DOCUMENT_MAX_ATTEMPTS = 3
+
 TTFSearchPath.append(os.path.join(config["root_path"], "..", "addons", "web", "static", "src", "fonts", "sign"))
 
 
@@ -69,6 +76,12 @@ class SignRequest(models.Model):
     ], default='sent', tracking=True, group_expand='_expand_states')
 
     completed_document = fields.Binary(readonly=True, string="Completed Document", attachment=True)
+    completed_document_pending = fields.Boolean(
+        string="Completed Document Pending", readonly=True, copy=False,
+        help="The completed document is being generated and sent in the background.")
+    completed_document_attempts = fields.Integer(
+        string="Completed Document Attempts", readonly=True, copy=False,
+        help="Number of failed attempts to generate and send the completed document in the background.")
 
     nb_wait = fields.Integer(string="Sent Requests", compute="_compute_count", store=True)
     nb_closed = fields.Integer(string="Completed Signatures", compute="_compute_count", store=True)
@@ -301,15 +314,86 @@ class SignRequest(models.Model):
         self.env.cr.commit()
         if not self.check_is_encrypted():
             # if the file is encrypted, we must wait that the document is decrypted
-            self.send_completed_document()
+            self._schedule_completed_document()
+
+    def _schedule_completed_document(self):
+        """ Generate and send the completed document in the background, so that the last signer
+        does not wait for the whole document to be rendered. """
+        self.write({'completed_document_pending': True})
+        self.env.ref('sign.ir_cron_send_completed_documents')._trigger()
+
+    @api.model
+    def _cron_send_completed_documents(self, batch_size=20):
+        """ Generate and send the pending completed documents.
+
+        Each request is claimed with ``FOR UPDATE SKIP LOCKED`` and committed once sent, so that
+        several workers running this method at the same time never process the same request twice.
+        A request which fails is only retried by the next runs, up to COMPLETED_DOCUMENT_MAX_ATTEMPTS times.
+        """
+        auto_commit = not getattr(threading.currentThread(), 'testing', False)
+        failed_ids = []
+        for __ in range(batch_size):
+            self.flush(['completed_document_pending', 'completed_document_attempts', 'state'])
+            self.env.cr.execute("""
+                SELECT id
+                  FROM sign_request
+                 WHERE completed_document_pending
+                   AND COALESCE(completed_document_attempts, 0) < %s
+                   AND state = 'signed'
+                   AND id != ALL(%s)
+                 ORDER BY id
+                 LIMIT 1
+                   FOR UPDATE SKIP LOCKED
+            """, [COMPLETED_DOCUMENT_MAX_ATTEMPTS, failed_ids])
+            row = self.env.cr.fetchone()
+            if not row:
+                return
+            sign_request = self.browse(row[0])
+            try:
+                with self.env.cr.savepoint():
+                    sign_request.send_completed_document()
+                    sign_request.completed_document_pending = False
+            except Exception:
+                _logger.exception("Failed to generate the completed document of the sign request %s", sign_request.id)
+                failed_ids.append(sign_request.id)
+                sign_request.completed_document_attempts += 1
+                if sign_request.completed_document_attempts >= COMPLETED_DOCUMENT_MAX_ATTEMPTS:
+                    sign_request._notify_completed_document_failure()
+            if auto_commit:
+                self.env.cr.commit()
+        # there might be more to process
+        self.env.ref('sign.ir_cron_send_completed_documents')._trigger()
+
+    def _notify_completed_document_failure(self):
+        """ Stop generating the completed document in the background and warn the responsible of the request. """
+        self.ensure_one()
+        _logger.error("Gave up generating the completed document of the sign request %s after %s attempts",
+                      self.id, self.completed_document_attempts)
+        self.completed_document_pending = False
+        self.activity_schedule(
+            'mail.mail_activity_data_warning',
+            user_id=self.create_uid.id,
+            summary=_("Completed document not sent"),
+            note=_("The completed document could not be generated and sent to the signers. "
+                   "It is generated again when it is downloaded, and can then be sent manually."),
+        )
 
     def check_is_encrypted(self):
         self.ensure_one()
         if not self.template_id.sign_item_ids:
             return False
 
-        old_pdf = PdfFileReader(io.BytesIO(base64.b64decode(self.template_id.attachment_id.datas)), strict=False, overwriteWarnings=False)
-        return old_pdf.isEncrypted
+        with self._get_template_pdf_file() as template_file:
+            old_pdf = PdfFileReader(template_file, strict=False, overwriteWarnings=False)
+            return old_pdf.isEncrypted
+
+    def _get_template_pdf_file(self):
+        """ Open the PDF of the template, directly from the filestore when it is stored there. """
+        self.ensure_one()
+        attachment = self.template_id.attachment_id.sudo()
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        return io.BytesIO(attachment.raw or b'')
 
     def action_canceled(self):
         for sign_request in self:
@@ -481,117 +565,124 @@ class SignRequest(models.Model):
             self.completed_document = self.template_id.attachment_id.datas
             return
 
-        try:
-            old_pdf = PdfFileReader(io.BytesIO(base64.b64decode(self.template_id.attachment_id.datas)), strict=False, overwriteWarnings=False)
-            old_pdf.getNumPages()
-        except:
-            raise ValidationError(_("ERROR: Invalid PDF file!"))
+        with self._get_template_pdf_file() as template_file:
+            try:
+                old_pdf = PdfFileReader(template_file, strict=False, overwriteWarnings=False)
+                old_pdf.getNumPages()
+            except:
+                raise ValidationError(_("ERROR: Invalid PDF file!"))
+
+            isEncrypted = old_pdf.isEncrypted
+            if isEncrypted and not old_pdf.decrypt(password):
+                # password is not correct
+                return
+
+            font = self._get_font()
+            normalFontSize = self._get_normal_font_size()
+
+            packet = io.BytesIO()
+            can = canvas.Canvas(packet)
+            itemsByPage = self.template_id.sign_item_ids.getByPage()
+            values = {}
+            for item_value in self.env['sign.request.item.value'].search([('sign_request_id', '=', self.id)]):
+                values.setdefault(item_value.sign_item_id.id, item_value.value)
+            # only the pages with a filled item are drawn on the canvas, then merged with the template
+            signed_pages = []
+            for p in range(0, old_pdf.getNumPages()):
+                items = [item for item in itemsByPage.get(p + 1, []) if values.get(item.id)]
+                if not items:
+                    continue
 
-        isEncrypted = old_pdf.isEncrypted
-        if isEncrypted and not old_pdf.decrypt(password):
-            # password is not correct
-            return
+                page = old_pdf.getPage(p)
+                # Absolute values are taken as it depends on the MediaBox template PDF metadata, they may be negative
+                width = float(abs(page.mediaBox.getWidth()))
+                height = float(abs(page.mediaBox.getHeight()))
+
+                # Set page orientation (either 0, 90, 180 or 270)
+                rotation = page['/Rotate'] if '/Rotate' in page else 0
+                if rotation and isinstance(rotation, int):
+                    can.rotate(rotation)
+                    # Translate system so that elements are placed correctly
+                    # despite of the orientation
+                    if rotation == 90:
+                        width, height = height, width
+                        can.translate(0, -height)
+                    elif rotation == 180:
+                        can.translate(-width, -height)
+                    elif rotation == 270:
+                        width, height = height, width
+                        can.translate(-width, 0)
+
+                for item in items:
+                    value = values[item.id]
+
+                    if item.type_id.item_type == "text":
+                        can.setFont(font, height*item.height*0.8)
+                        if item.alignment == "left":
+                            can.drawString(width*item.posX, height*(1-item.posY-item.height*0.9), value)
+                        elif item.alignment == "right":
+                            can.drawRightString(width*(item.posX+item.width), height*(1-item.posY-item.height*0.9), value)
+                        else:
+                            can.drawCentredString(width*(item.posX+item.width/2), height*(1-item.posY-item.height*0.9), value)
+
+                    elif item.type_id.item_type == "selection":
+                        content = []
+                        for option in item.option_ids:
+                            if option.id != int(value):
+                                content.append("<strike>%s</strike>" % (option.value))
+                            else:
+                                content.append(option.value)
+                        font_size = height * normalFontSize * 0.8
+                        can.setFont(font, font_size)
+                        text = " / ".join(content)
+                        string_width = stringWidth(text.replace("<strike>", "").replace("</strike>", ""), font, font_size)
+                        paragraph = Paragraph(text, getSampleStyleSheet()["Normal"])
+                        w, h = paragraph.wrap(width, height)
+                        posX = width * (item.posX + item.width * 0.5) - string_width // 2
+                        posY = height * (1 - item.posY - item.height * 0.5) - h // 2
+                        paragraph.drawOn(can, posX, posY)
+
+                    elif item.type_id.item_type == "textarea":
+                        can.setFont(font, height*normalFontSize*0.8)
+                        lines = value.split('\n')
+                        y = (1-item.posY)
+                        for line in lines:
+                            y -= normalFontSize*0.9
+                            can.drawString(width*item.posX, height*y, line)
+                            y -= normalFontSize*0.1
+
+                    elif item.type_id.item_type == "checkbox":
+                        can.setFont(font, height*item.height*0.8)
+                        value = 'X' if value == 'on' else ''
+                        can.drawString(width*item.posX, height*(1-item.posY-item.height*0.9), value)
 
-        font = self._get_font()
-        normalFontSize = self._get_normal_font_size()
-
-        packet = io.BytesIO()
-        can = canvas.Canvas(packet)
-        itemsByPage = self.template_id.sign_item_ids.getByPage()
-        SignItemValue = self.env['sign.request.item.value']
-        for p in range(0, old_pdf.getNumPages()):
-            page = old_pdf.getPage(p)
-            # Absolute values are taken as it depends on the MediaBox template PDF metadata, they may be negative
-            width = float(abs(page.mediaBox.getWidth()))
-            height = float(abs(page.mediaBox.getHeight()))
-
-            # Set page orientation (either 0, 90, 180 or 270)
-            rotation = page['/Rotate'] if '/Rotate' in page else 0
-            if rotation and isinstance(rotation, int):
-                can.rotate(rotation)
-                # Translate system so that elements are placed correctly
-                # despite of the orientation
-                if rotation == 90:
-                    width, height = height, width
-                    can.translate(0, -height)
-                elif rotation == 180:
-                    can.translate(-width, -height)
-                elif rotation == 270:
-                    width, height = height, width
-                    can.translate(-width, 0)
-
-            items = itemsByPage[p + 1] if p + 1 in itemsByPage else []
-            for item in items:
-                value = SignItemValue.search([('sign_item_id', '=', item.id), ('sign_request_id', '=', self.id)], limit=1)
-                if not value or not value.value:
-                    continue
+                    elif item.type_id.item_type == "signature" or item.type_id.item_type == "initial":
+                        image_reader = ImageReader(io.BytesIO(base64.b64decode(value[value.find(',')+1:])))
+                        _fix_image_transparency(image_reader._image)
+                        can.drawImage(image_reader, width*item.posX, height*(1-item.posY-item.height), width*item.width, height*item.height, 'auto', True)
 
-                value = value.value
+                can.showPage()
+                signed_pages.append(p)
 
-                if item.type_id.item_type == "text":
-                    can.setFont(font, height*item.height*0.8)
-                    if item.alignment == "left":
-                        can.drawString(width*item.posX, height*(1-item.posY-item.height*0.9), value)
-                    elif item.alignment == "right":
-                        can.drawRightString(width*(item.posX+item.width), height*(1-item.posY-item.height*0.9), value)
-                    else:
-                        can.drawCentredString(width*(item.posX+item.width/2), height*(1-item.posY-item.height*0.9), value)
-
-                elif item.type_id.item_type == "selection":
-                    content = []
-                    for option in item.option_ids:
-                        if option.id != int(value):
-                            content.append("<strike>%s</strike>" % (option.value))
-                        else:
-                            content.append(option.value)
-                    font_size = height * normalFontSize * 0.8
-                    can.setFont(font, font_size)
-                    text = " / ".join(content)
-                    string_width = stringWidth(text.replace("<strike>", "").replace("</strike>", ""), font, font_size)
-                    p = Paragraph(text, getSampleStyleSheet()["Normal"])
-                    w, h = p.wrap(width, height)
-                    posX = width * (item.posX + item.width * 0.5) - string_width // 2
-                    posY = height * (1 - item.posY - item.height * 0.5) - h // 2
-                    p.drawOn(can, posX, posY)
-
-                elif item.type_id.item_type == "textarea":
-                    can.setFont(font, height*normalFontSize*0.8)
-                    lines = value.split('\n')
-                    y = (1-item.posY)
-                    for line in lines:
-                        y -= normalFontSize*0.9
-                        can.drawString(width*item.posX, height*y, line)
-                        y -= normalFontSize*0.1
-
-                elif item.type_id.item_type == "checkbox":
-                    can.setFont(font, height*item.height*0.8)
-                    value = 'X' if value == 'on' else ''
-                    can.drawString(width*item.posX, height*(1-item.posY-item.height*0.9), value)
-
-                elif item.type_id.item_type == "signature" or item.type_id.item_type == "initial":
-                    image_reader = ImageReader(io.BytesIO(base64.b64decode(value[value.find(',')+1:])))
-                    _fix_image_transparency(image_reader._image)
-                    can.drawImage(image_reader, width*item.posX, height*(1-item.posY-item.height), width*item.width, height*item.height, 'auto', True)
-
-            can.showPage()
-
-        can.save()
-
-        item_pdf = PdfFileReader(packet, overwriteWarnings=False)
-        new_pdf = PdfFileWriter()
-
-        for p in range(0, old_pdf.getNumPages()):
-            page = old_pdf.getPage(p)
-            page.mergePage(item_pdf.getPage(p))
-            new_pdf.addPage(page)
-
-        if isEncrypted:
-            new_pdf.encrypt(password)
-
-        output = io.BytesIO()
-        new_pdf.write(output)
-        self.completed_document = base64.b64encode(output.getvalue())
-        output.close()
+            can.save()
+
+            item_pdf = PdfFileReader(packet, overwriteWarnings=False)
+            item_pages = {p: index for index, p in enumerate(signed_pages)}
+            new_pdf = PdfFileWriter()
+
+            for p in range(0, old_pdf.getNumPages()):
+                page = old_pdf.getPage(p)
+                if p in item_pages:
+                    page.mergePage(item_pdf.getPage(item_pages[p]))
+                new_pdf.addPage(page)
+
+            if isEncrypted:
+                new_pdf.encrypt(password)
+
+            output = io.BytesIO()
+            new_pdf.write(output)
+            self.completed_document = base64.b64encode(output.getvalue())
+            output.close()
 
     @api.model
     def _message_send_mail(self, body, notif_template_xmlid, message_values, notif_values, mail_values, force_send=False, **kwargs):
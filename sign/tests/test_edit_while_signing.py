@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
+from unittest.mock import patch
+
 from .test_common import TestSignCommon
 from odoo import http
 from odoo.tests.common import HttpCase
@@ -53,6 +55,58 @@ class TestEditModeWhileSigning(HttpCase, TestSignCommon):
         )
         self.assertEqual(sign_request.state, 'signed')
 
+    def test_sign_generates_completed_document_in_background(self):
+        sign_request = self.single_role_sign_request
+        sign_request_item = sign_request.request_item_ids[0]
+        sign_values = self.create_sign_values(sign_request.template_id.sign_item_ids, sign_request_item.role_id.id)
+
+        url = "/sign/sign/%s/%s" % (sign_request.id, sign_request_item.access_token)
+        sign_result = self.opener.post(self._build_url(url), json=self._build_jsonrpc_payload({'signature': sign_values}))
+        self.assertTrue(sign_result.json()['result'])
+
+        sign_request.invalidate_cache()
+        self.assertEqual(sign_request.state, 'signed')
+        self.assertTrue(sign_request.completed_document_pending, 'The completed document should be generated later')
+        self.assertFalse(sign_request.completed_document)
+
+        self.env['sign.request']._cron_send_completed_documents()
+        sign_request.invalidate_cache()
+        self.assertFalse(sign_request.completed_document_pending)
+        self.assertTrue(sign_request.completed_document, 'The completed document should have been generated')
+        self.assertTrue(sign_request.attachment_ids, 'The completed document should have been sent')
+
+    def test_sign_completed_document_failure_is_retried(self):
+        sign_request = self.single_role_sign_request
+        sign_request_item = sign_request.request_item_ids[0]
+        sign_values = self.create_sign_values(sign_request.template_id.sign_item_ids, sign_request_item.role_id.id)
+
+        url = "/sign/sign/%s/%s" % (sign_request.id, sign_request_item.access_token)
+        sign_result = self.opener.post(self._build_url(url), json=self._build_jsonrpc_payload({'signature': sign_values}))
+        self.assertTrue(sign_result.json()['result'])
+
+        warning_type = self.env.ref('mail.mail_activity_data_warning')
+        SignRequest = type(self.env['sign.request'])
+        with patch.object(SignRequest, 'send_completed_document', side_effect=Exception('failure')):
+            self.env['sign.request']._cron_send_completed_documents()
+            sign_request.invalidate_cache()
+            self.assertTrue(sign_request.completed_document_pending, 'The failed request should be retried by the next run')
+            self.assertEqual(sign_request.completed_document_attempts, 1)
+            self.assertFalse(sign_request.activity_ids.filtered(lambda a: a.activity_type_id == warning_type))
+
+            self.env['sign.request']._cron_send_completed_documents()
+            self.env['sign.request']._cron_send_completed_documents()
+            sign_request.invalidate_cache()
+            self.assertFalse(sign_request.completed_document_pending, 'The request should be given up after the last attempt')
+            self.assertEqual(sign_request.completed_document_attempts, 3)
+            self.assertTrue(sign_request.activity_ids.filtered(lambda a: a.activity_type_id == warning_type),
+                            'The responsible of the request should be warned')
+
+        sign_request.write({'completed_document_pending': True, 'completed_document_attempts': 0})
+        self.env['sign.request']._cron_send_completed_documents()
+        sign_request.invalidate_cache()
+        self.assertFalse(sign_request.completed_document_pending)
+        self.assertTrue(sign_request.completed_document)
+
     def test_sign_with_new_items(self):
         sign_request = self.single_role_sign_request
         sign_request_id = sign_request.id
@@ -41,11 +41,18 @@ class StockBarcodeController(http.Controller):
             return {'warning': _('No picking or product corresponding to barcode %(barcode)s') % {'barcode': barcode}}
 
     @http.route('/stock_barcode/save_barcode_data', type='json', auth='user')
-    def save_barcode_data(self, model, res_id, write_field, write_vals):
+    def save_barcode_data(self, model, res_id, write_field, write_vals, sync_token=False, move_line_ids=None):
+        """ Saves the changes done in the barcode client and returns the data to refresh it.
+
+        When the client gives the `sync_token` of its last data, only the records changed
+        since then are returned (see `_get_stock_barcode_delta_data`).
+        """
         if not res_id:
             return request.env[model].barcode_write(write_vals)
         target_record = request.env[model].browse(res_id)
         target_record.write({write_field: write_vals})
+        if sync_token and hasattr(target_record, '_get_stock_barcode_delta_data'):
+            return target_record._get_stock_barcode_delta_data(sync_token, move_line_ids or [])
         return target_record._get_stock_barcode_data()
 
     @http.route('/stock_barcode/get_barcode_data', type='json', auth='user')
@@ -70,23 +77,23 @@ class StockBarcodeController(http.Controller):
     @http.route('/stock_barcode/get_specific_barcode_data', type='json', auth='user')
     def get_specific_barcode_data(self, barcode, model_name, domains_by_model=False):
         nomenclature = request.env.company.nomenclature_id
-        # Adapts the search parameters for GS1 specifications.
-        operator = '='
+        # Adapts the search parameters for GS1 specifications: a digits only barcode
+        # can be padded, so it matches any barcode with the same normalized value.
         limit = None if nomenclature.is_gs1_nomenclature else 1
-        if nomenclature.is_gs1_nomenclature:
-            try:
-                # If barcode is digits only, cut off the padding to keep the original barcode only.
-                barcode = str(int(barcode))
-                operator = 'ilike'
-            except ValueError:
-                pass  # Barcode isn't digits only.
+        exact_match = not (nomenclature.is_gs1_nomenclature and barcode.strip().isdigit())
 
         domains_by_model = domains_by_model or {}
         barcode_field_by_model = self._get_barcode_field_by_model()
         result = defaultdict(list)
         model_names = model_name and [model_name] or list(barcode_field_by_model.keys())
+        # Resolves the barcode in all models at once, then reads the matching records.
+        ids_by_model = request.env['stock_barcode.index'].sudo()._lookup(barcode, model_names)
         for model in model_names:
-            domain = [(barcode_field_by_model[model], operator, barcode)]
+            if not ids_by_model.get(model):
+                continue
+            domain = [('id', 'in', ids_by_model[model])]
+            if exact_match:
+                domain = expression.AND([domain, [(barcode_field_by_model[model], '=', barcode)]])
             domain_for_this_model = domains_by_model.get(model)
             if domain_for_this_model:
                 domain = expression.AND([domain, domain_for_this_model])
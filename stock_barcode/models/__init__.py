@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from . import stock_barcode_index
 from . import stock_picking
 from . import stock_quant
 from . import stock_scrap
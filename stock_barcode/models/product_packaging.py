@@ -5,7 +5,8 @@ from odoo import models, api
 
 
 class ProductPackaging(models.Model):
-    _inherit = 'product.packaging'
+    _name = 'product.packaging'
+    _inherit = ['product.packaging', 'stock_barcode.index.mixin']
     _barcode_field = 'barcode'
 
     @api.model
@@ -5,7 +5,8 @@ from odoo import models, api
 
 
 class Product(models.Model):
-    _inherit = 'product.product'
+    _name = 'product.product'
+    _inherit = ['product.product', 'stock_barcode.index.mixin']
     _barcode_field = 'barcode'
 
     @api.model
@@ -36,3 +37,14 @@ class Product(models.Model):
             res['records']['res.partner'] = self.env['res.partner'].browse(quant['owner_id']).read(self.env['res.partner']._get_fields_stock_barcode(), load=False)
 
         return res
+
+
+class ProductTemplate(models.Model):
+    _inherit = 'product.template'
+
+    def write(self, vals):
+        res = super().write(vals)
+        # The company of the variants is the one of their template.
+        if 'company_id' in vals:
+            self.env['stock_barcode.index']._index_records(self.with_context(active_test=False).product_variant_ids)
+        return res
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, fields, models
+from odoo.tools import split_every
+
+
+class StockBarcodeIndex(models.Model):
+    """ Maps the barcodes of the records which can be scanned in the barcode app
+    to these records, so a scan is resolved with one indexed lookup whatever
+    the model of the scanned record.
+
+    The barcodes are normalized (see `_normalize_barcode`) so the padded
+    barcodes of a GS1 nomenclature match the same key as the original ones.
+    The index is kept up to date by `stock_barcode.index.mixin`.
+    """
+    _name = 'stock_barcode.index'
+    _description = 'Barcode Lookup Index'
+    _log_access = False
+
+    barcode = fields.Char('Normalized Barcode', required=True, index=True)
+    res_model = fields.Char('Model', required=True)
+    res_id = fields.Many2oneReference('Record', model_field='res_model', required=True)
+    company_id = fields.Many2one('res.company', 'Company', ondelete='cascade')
+
+    _sql_constraints = [
+        ('record_uniq', 'unique (res_model, res_id)', "A record can only be indexed once."),
+    ]
+
+    def init(self):
+        # Fills the index the first time, it is then maintained on the records' changes.
+        self.env.cr.execute("SELECT 1 FROM stock_barcode_index LIMIT 1")
+        if self.env.cr.fetchone():
+            return
+        for model_name in self._get_indexed_models():
+            Model = self.env[model_name].with_context(active_test=False)
+            query = Model._search([(Model._barcode_field, '!=', False)], order='id')
+            for ids in split_every(5000, list(query)):
+                records = Model.browse(ids)
+                self._index_records(records)
+                records.invalidate_cache()
+
+    @api.model
+    def _get_indexed_models(self):
+        mixin = self.pool['stock_barcode.index.mixin']
+        return [name for name, model in self.pool.items() if issubclass(model, mixin) and not model._abstract]
+
+    @api.model
+    def _normalize_barcode(self, barcode):
+        """ Strips the zeros padding the numeric barcodes, as a GS1 nomenclature
+        pads them to a fixed length. """
+        barcode = (barcode or '').strip()
+        if barcode.isdigit():
+            return barcode.lstrip('0') or '0'
+        return barcode
+
+    @api.model
+    def _index_records(self, records):
+        """ (Re)indexes ``records`` with their current barcode. """
+        records = records.sudo()
+        self._remove_records(records._name, records.ids)
+        barcode_field = records._barcode_field
+        has_company = 'company_id' in records._fields
+        values = [
+            (self._normalize_barcode(record[barcode_field]), records._name, record.id,
+             has_company and record.company_id.id or None)
+            for record in records if record[barcode_field]
+        ]
+        if values:
+            self.env.cr.execute("""
+                INSERT INTO stock_barcode_index (barcode, res_model, res_id, company_id)
+                VALUES %s
+                ON CONFLICT DO NOTHING
+            """ % ', '.join(['(%s, %s, %s, %s)'] * len(values)), [value for row in values for value in row])
+
+    @api.model
+    def _remove_records(self, model_name, ids):
+        if ids:
+            self.env.cr.execute(
+                "DELETE FROM stock_barcode_index WHERE res_model = %s AND res_id IN %s",
+                [model_name, tuple(ids)])
+
+    @api.model
+    def _lookup(self, barcode, model_names):
+        """ Returns the ids of the records of ``model_names`` whose normalized barcode
+        matches ``barcode`` in the companies of the user, as a dict {model: ids}. """
+        self.env.cr.execute("""
+            SELECT res_model, ARRAY_AGG(res_id ORDER BY res_id)
+              FROM stock_barcode_index
+             WHERE barcode = %s
+               AND res_model IN %s
+               AND (company_id IS NULL OR company_id IN %s)
+          GROUP BY res_model
+        """, [self._normalize_barcode(barcode), tuple(model_names), tuple(self.env.user.company_ids.ids)])
+        return dict(self.env.cr.fetchall())
+
+
+class StockBarcodeIndexMixin(models.AbstractModel):
+    """ Keeps the barcode of the records (their `_barcode_field`) in `stock_barcode.index`. """
+    _name = 'stock_barcode.index.mixin'
+    _description = 'Barcode Lookup Index Mixin'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['stock_barcode.index']._index_records(records)
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self._barcode_field in vals or 'company_id' in vals:
+            self.env['stock_barcode.index']._index_records(self)
+        return res
+
+    def unlink(self):
+        self.env['stock_barcode.index']._remove_records(self._name, self.ids)
+        return super().unlink()
@@ -5,7 +5,8 @@ from odoo import models, api
 
 
 class Location(models.Model):
-    _inherit = 'stock.location'
+    _name = 'stock.location'
+    _inherit = ['stock.location', 'stock_barcode.index.mixin']
     _barcode_field = 'barcode'
 
     @api.model
@@ -4,10 +4,13 @@ from odoo import models, fields, api, _
 from odoo.tools.float_utils import float_compare
 from odoo.tools import html2plaintext, is_html_empty
 
+# Seconds subtracted from the sync tokens, see `_get_stock_barcode_sync_token`
+SYNC_TOKEN_MARGIN = 60
+
 
 class StockPicking(models.Model):
     _name = 'stock.picking'
-    _inherit = ['stock.picking', 'barcodes.barcode_events_mixin']
+    _inherit = ['stock.picking', 'barcodes.barcode_events_mixin', 'stock_barcode.index.mixin']
     _barcode_field = 'name'
 
     def action_cancel_from_barcode(self):
@@ -74,51 +77,112 @@ class StockPicking(models.Model):
     def _get_stock_barcode_data(self):
         # Avoid to get the products full name because code and name are separate in the barcode app.
         self = self.with_context(display_default_code=False)
-        move_lines = self.move_line_ids
-        lots = move_lines.lot_id
-        owners = move_lines.owner_id
-        # Fetch all implied products in `self` and adds last used products to avoid additional rpc.
-        products = move_lines.product_id
-        packagings = products.packaging_ids
+        records = self._get_stock_barcode_line_records(self.move_line_ids)
+        records['stock.picking'] = self
 
-        uoms = products.uom_id
         # If UoM setting is active, fetch all UoM's data.
         if self.env.user.has_group('uom.group_uom'):
-            uoms = self.env['uom.uom'].search([])
+            records['uom.uom'] = self.env['uom.uom'].search([])
 
-        # Fetch `stock.quant.package` and `stock.package.type` if group_tracking_lot.
-        packages = self.env['stock.quant.package']
-        package_types = self.env['stock.package.type']
+        # Fetch all usable `stock.quant.package` and `stock.package.type` if group_tracking_lot.
         if self.env.user.has_group('stock.group_tracking_lot'):
-            packages |= move_lines.package_id | move_lines.result_package_id
-            packages |= self.env['stock.quant.package']._get_usable_packages()
-            package_types = package_types.search([])
+            records['stock.quant.package'] |= self.env['stock.quant.package']._get_usable_packages()
+            records['stock.package.type'] = self.env['stock.package.type'].search([])
 
         # Fetch `stock.location`
         source_locations = self.env['stock.location'].search([('id', 'child_of', self.location_id.ids)])
         destination_locations = self.env['stock.location'].search([('id', 'child_of', self.location_dest_id.ids)])
-        locations = move_lines.location_id | move_lines.location_dest_id | source_locations | destination_locations
+        records['stock.location'] |= source_locations | destination_locations
         data = {
-            "records": {
-                "stock.picking": self.read(self._get_fields_stock_barcode(), load=False),
-                "stock.move.line": move_lines.read(move_lines._get_fields_stock_barcode(), load=False),
-                "product.product": products.read(products._get_fields_stock_barcode(), load=False),
-                "product.packaging": packagings.read(packagings._get_fields_stock_barcode(), load=False),
-                "res.partner": owners.read(owners._get_fields_stock_barcode(), load=False),
-                "stock.location": locations.read(locations._get_fields_stock_barcode(), load=False),
-                "stock.package.type": package_types.read(package_types._get_fields_stock_barcode(), False),
-                "stock.quant.package": packages.read(packages._get_fields_stock_barcode(), load=False),
-                "stock.production.lot": lots.read(lots._get_fields_stock_barcode(), load=False),
-                "uom.uom": uoms.read(uoms._get_fields_stock_barcode(), load=False),
-            },
+            "records": self._read_stock_barcode_records(records),
             "nomenclature_id": [self.env.company.nomenclature_id.id],
             "source_location_ids": source_locations.ids,
             "destination_locations_ids": destination_locations.ids,
+            "sync_token": self._get_stock_barcode_sync_token(),
         }
+        self._format_stock_barcode_notes(data)
+        return data
+
+    def _get_stock_barcode_delta_data(self, sync_token, move_line_ids):
+        """ Return the data changed since the client received ``sync_token``.
+
+        Only the pickings, their move lines created or updated since then and the
+        records they use are sent. The locations, UoMs, package types and usable
+        packages are loaded once by `_get_stock_barcode_data` and kept in the
+        client's cache.
+
+        :param sync_token: the `sync_token` of the last data received by the client
+        :param move_line_ids: ids of the move lines known by the client
+        :return: same structure as `_get_stock_barcode_data` with the ids of the
+            move lines which have been deleted under the "deleted" key
+        """
+        self = self.with_context(display_default_code=False)
+        new_sync_token = self._get_stock_barcode_sync_token()
+        known_move_lines = self.env['stock.move.line'].browse(move_line_ids)
+        move_lines = self.env['stock.move.line'].search([
+            ('picking_id', 'in', self.ids),
+            ('write_date', '>=', fields.Datetime.to_datetime(sync_token)),
+        ])
+        # Also sends the lines unknown by the client, even if they were not updated.
+        move_lines |= self.move_line_ids - known_move_lines
+        records = self._get_stock_barcode_line_records(move_lines)
+        records['stock.picking'] = self
+        data = {
+            "records": self._read_stock_barcode_records(records),
+            "deleted": {
+                "stock.move.line": (known_move_lines - self.move_line_ids).ids,
+            },
+            "sync_token": new_sync_token,
+        }
+        self._format_stock_barcode_notes(data)
+        return data
+
+    def _get_stock_barcode_line_records(self, move_lines):
+        """ Return the records used by ``move_lines`` in the barcode app, by model. """
+        products = move_lines.product_id
+        packages = self.env['stock.quant.package']
+        if self.env.user.has_group('stock.group_tracking_lot'):
+            packages = move_lines.package_id | move_lines.result_package_id
+        return {
+            "stock.move.line": move_lines,
+            "product.product": products,
+            "product.packaging": products.packaging_ids,
+            "res.partner": move_lines.owner_id,
+            "stock.location": move_lines.location_id | move_lines.location_dest_id,
+            "stock.package.type": self.env['stock.package.type'],
+            "stock.quant.package": packages,
+            "stock.production.lot": move_lines.lot_id,
+            "uom.uom": products.uom_id,
+        }
+
+    @api.model
+    def _read_stock_barcode_records(self, records_by_model):
+        return {
+            model: records.read(records._get_fields_stock_barcode(), load=False)
+            for model, records in records_by_model.items()
+        }
+
+    @api.model
+    def _get_stock_barcode_sync_token(self):
+        """ The records written after the sync token are sent on the next `_get_stock_barcode_delta_data`.
+
+        The `write_date` of a record is the start of the transaction which wrote it, and a transaction
+        running now may still commit some records written before the current one started. The token
+        is thus the start of the oldest running transaction, minus a margin for the transactions which
+        committed since the current one started. The client replaces the records it receives again.
+        """
+        self.env.cr.execute("""
+            SELECT LEAST(NOW(), MIN(xact_start)) AT TIME ZONE 'UTC' - %s * INTERVAL '1 second'
+              FROM pg_stat_activity
+             WHERE datname = current_database()
+        """, [SYNC_TOKEN_MARGIN])
+        return fields.Datetime.to_string(self.env.cr.fetchone()[0])
+
+    @api.model
+    def _format_stock_barcode_notes(self, data):
         # Extracts pickings' note if it's empty HTML.
         for picking in data['records']['stock.picking']:
             picking['note'] = False if is_html_empty(picking['note']) else html2plaintext(picking['note'])
-        return data
 
     def get_po_to_split_from_barcode(self, barcode):
         """ Returns the lot wizard's action for the move line matching
@@ -5,7 +5,8 @@ from odoo import models, api
 
 
 class StockProductionLot(models.Model):
-    _inherit = 'stock.production.lot'
+    _name = 'stock.production.lot'
+    _inherit = ['stock.production.lot', 'stock_barcode.index.mixin']
     _barcode_field = 'name'
 
     def _get_stock_barcode_specific_data(self):
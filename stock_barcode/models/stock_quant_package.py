@@ -5,7 +5,8 @@ from odoo import api, models
 
 
 class QuantPackage(models.Model):
-    _inherit = 'stock.quant.package'
+    _name = 'stock.quant.package'
+    _inherit = ['stock.quant.package', 'stock_barcode.index.mixin']
     _barcode_field = 'name'
 
     @api.model
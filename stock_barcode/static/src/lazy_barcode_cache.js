@@ -64,6 +64,31 @@ export default class LazyBarcodeCache {
         }
     }
 
+    /**
+     * Removes records from the barcode application's cache.
+     *
+     * @param {Object} deletedData each key is a model's name and contains an array of ids.
+     */
+    deleteRecords(deletedData) {
+        for (const model in deletedData) {
+            if (!this.dbIdCache.hasOwnProperty(model)) {
+                continue;
+            }
+            const barcodeField = this._getBarcodeField(model);
+            for (const id of deletedData[model]) {
+                const record = this.dbIdCache[model][id];
+                if (!record) {
+                    continue;
+                }
+                if (barcodeField && this.dbBarcodeCache[model][record[barcodeField]]) {
+                    const ids = this.dbBarcodeCache[model][record[barcodeField]];
+                    this.dbBarcodeCache[model][record[barcodeField]] = ids.filter(recordId => recordId !== id);
+                }
+                delete this.dbIdCache[model][id];
+            }
+        }
+    }
+
     /**
      * Get record from the cache, throw a error if we don't find in the cache
      * (the server should have return this information).
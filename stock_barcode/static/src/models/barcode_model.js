@@ -16,6 +16,7 @@ export default class BarcodeModel extends owl.core.EventBus {
 
     setData(data) {
         this.cache = new LazyBarcodeCache(data.data.records);
+        this.syncToken = data.data.sync_token;
         const nomenclature = this.cache.getRecord('barcode.nomenclature', data.data.nomenclature_id);
         nomenclature.rules = [];
         for (const ruleId of nomenclature.rule_ids) {
@@ -541,6 +542,12 @@ export default class BarcodeModel extends owl.core.EventBus {
         if (route) {
             const res = await this.rpc(route, params);
             this.linesToSave = [];
+            if (res.deleted) {
+                this.cache.deleteRecords(res.deleted);
+            }
+            if (res.sync_token) {
+                this.syncToken = res.sync_token;
+            }
             await this.refreshCache(res.records);
         }
     }
@@ -435,6 +435,9 @@ export default class BarcodePickingModel extends BarcodeModel {
                     res_id: this.params.id,
                     write_field: 'move_line_ids',
                     write_vals: commands,
+                    // Only the lines changed since the last sync will be sent back.
+                    sync_token: this.syncToken,
+                    move_line_ids: this.record.move_line_ids,
                 },
             };
         }
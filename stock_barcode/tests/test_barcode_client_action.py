@@ -3,6 +3,7 @@
 from unittest.mock import patch
 
 import odoo
+from odoo import fields
 from odoo.tests import Form, HttpCase, tagged
 
 
@@ -1830,6 +1831,73 @@ class TestPickingBarcodeClientAction(TestBarcodeClientAction):
         # Checks the package is in the customer's location.
         self.assertEqual(package.location_id.id, self.customer_location.id)
 
+    def test_picking_delta_data(self):
+        """ Only the move lines changed since the last sync are sent back to the client. """
+        picking = self.env['stock.picking'].create({
+            'location_id': self.stock_location.id,
+            'location_dest_id': self.stock_location.id,
+            'picking_type_id': self.picking_type_internal.id,
+        })
+        line_vals = {
+            'picking_id': picking.id,
+            'company_id': self.env.company.id,
+            'location_id': self.shelf1.id,
+            'location_dest_id': self.shelf2.id,
+            'product_uom_id': self.uom_unit.id,
+            'qty_done': 1,
+        }
+        updated_line, deleted_line, unchanged_line = self.env['stock.move.line'].create([
+            dict(line_vals, product_id=self.product1.id),
+            dict(line_vals, product_id=self.product2.id),
+            dict(line_vals, product_id=self.productlot1.id, lot_name='lot1'),
+        ])
+        data = picking._get_stock_barcode_data()
+        self.assertTrue(data['sync_token'])
+        # the lines written by the transactions still running when the token is given are sent again
+        self.env.cr.execute("SELECT NOW() AT TIME ZONE 'UTC'")
+        self.assertLess(fields.Datetime.to_datetime(data['sync_token']), self.env.cr.fetchone()[0])
+        self.assertEqual(len(data['records']['stock.move.line']), 3)
+
+        # simulates a client synced before the current transaction
+        self.env['stock.move.line'].flush()
+        self.env.cr.execute("UPDATE stock_move_line SET write_date = '2000-01-01' WHERE picking_id = %s", [picking.id])
+        self.env['stock.move.line'].invalidate_cache(['write_date'])
+        known_ids = picking.move_line_ids.ids
+        updated_line.qty_done = 2
+        deleted_line.unlink()
+        new_line = self.env['stock.move.line'].create(dict(line_vals, product_id=self.product2.id))
+
+        delta = picking._get_stock_barcode_delta_data('2000-01-02 00:00:00', known_ids)
+        self.assertEqual(
+            {line['id'] for line in delta['records']['stock.move.line']},
+            {updated_line.id, new_line.id})
+        self.assertEqual(delta['deleted']['stock.move.line'], [deleted_line.id])
+        self.assertEqual([p['id'] for p in delta['records']['stock.picking']], picking.ids)
+        self.assertEqual(delta['records']['stock.picking'][0]['move_line_ids'], (updated_line | unchanged_line | new_line).ids)
+        self.assertEqual({p['id'] for p in delta['records']['product.product']}, {self.product1.id, self.product2.id})
+        self.assertNotIn(unchanged_line.id, [line['id'] for line in delta['records']['stock.move.line']])
+
+    def test_barcode_index(self):
+        """ The barcode index is kept up to date and matches the padded GS1 barcodes. """
+        Index = self.env['stock_barcode.index']
+        models = ['product.product', 'stock.production.lot', 'stock.location']
+        lot = self.env['stock.production.lot'].create({
+            'name': '76543210',
+            'product_id': self.productlot1.id,
+            'company_id': self.env.company.id,
+        })
+        self.assertEqual(Index._lookup('00000076543210', models), {
+            'product.product': self.product_tln_gtn8.ids,
+            'stock.production.lot': lot.ids,
+        })
+        self.assertEqual(Index._lookup('LOC-01-01-00', models), {'stock.location': self.shelf1.ids})
+
+        self.shelf1.barcode = 'LOC-01-01-01'
+        lot.unlink()
+        self.assertEqual(Index._lookup('LOC-01-01-00', models), {})
+        self.assertEqual(Index._lookup('LOC-01-01-01', models), {'stock.location': self.shelf1.ids})
+        self.assertEqual(Index._lookup('76543210', models), {'product.product': self.product_tln_gtn8.ids})
+
 
 @tagged('post_install', '-at_install')
 class TestInventoryAdjustmentBarcodeClientAction(TestBarcodeClientAction):
@@ -102,12 +102,7 @@ class StockPickingBatch(models.Model):
 
     def _get_stock_barcode_data(self):
         picking_data = self.picking_ids._get_stock_barcode_data()
-        picking_data['records'].update({
-            self._name: self.read(self._get_fields_stock_barcode(), load=False)
-        })
-        # Add picking_id sorted by name to be consistent with the older version.
-        for batch in picking_data['records'][self._name]:
-            batch['picking_ids'] = self.browse(batch['id']).picking_ids.sorted(key=lambda p: (p.name, p.id)).ids
+        self._add_stock_barcode_batch_data(picking_data)
         # Add some data for new batch.
         if not self.picking_ids:
             allowed_picking_ids = self.allowed_picking_ids.filtered(lambda p: p.state == 'assigned')
@@ -119,6 +114,19 @@ class StockPickingBatch(models.Model):
                 picking_data['picking_types'] = picking_types.read(['name'], False)
         return picking_data
 
+    def _get_stock_barcode_delta_data(self, sync_token, move_line_ids):
+        picking_data = self.picking_ids._get_stock_barcode_delta_data(sync_token, move_line_ids)
+        self._add_stock_barcode_batch_data(picking_data)
+        return picking_data
+
+    def _add_stock_barcode_batch_data(self, picking_data):
+        picking_data['records'].update({
+            self._name: self.read(self._get_fields_stock_barcode(), load=False)
+        })
+        # Add picking_id sorted by name to be consistent with the older version.
+        for batch in picking_data['records'][self._name]:
+            batch['picking_ids'] = self.browse(batch['id']).picking_ids.sorted(key=lambda p: (p.name, p.id)).ids
+
     @api.model
     def _get_fields_stock_barcode(self):
         return [
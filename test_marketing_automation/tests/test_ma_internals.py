@@ -130,3 +130,110 @@ class MarketingCampaignTest(TestMACommon):
 
         self.assertEqual(campaign.running_participant_count, 4)
         self.assertEqual(campaign.participant_ids.mapped('res_id'), (test_records[0:3] | test_records[-1]).ids)
+
+    @users('user_markauto')
+    @mute_logger('odoo.addons.base.ir.ir_model', 'odoo.models')
+    def test_internals_sync_participants(self):
+        test_records = self.test_records[:5].with_env(self.env)
+        excluded_name = test_records[0].name
+        campaign = self.env['marketing.campaign'].create({
+            'name': 'My First Campaign',
+            'model_id': self.env['ir.model']._get_id('marketing.test.sms'),
+            'domain': '%s' % [('id', 'in', test_records.ids), ('name', '!=', excluded_name)],
+        })
+        mailing = self._create_mailing()
+        activity = self._create_activity(campaign, mailing=mailing)
+
+        campaign.action_start_campaign()
+        campaign.sync_participants()
+        self.assertTrue(campaign.participants_sync_date)
+        self.assertEqual(campaign.participant_ids.mapped('res_id'), test_records[1:].ids)
+        self.assertEqual(set(activity.trace_ids.mapped('res_id')), set(test_records[1:].ids))
+
+        # only the modified records are considered: the first one now matches the filter,
+        # the second one does not match it anymore
+        test_records[0].write({'name': 'Now Matching'})
+        test_records[1].write({'name': excluded_name})
+        campaign.sync_participants()
+        self.assertEqual(set(campaign.participant_ids.mapped('res_id')), set(test_records.ids))
+        participant_0 = campaign.participant_ids.filtered(lambda p: p.res_id == test_records[0].id)
+        participant_1 = campaign.participant_ids.filtered(lambda p: p.res_id == test_records[1].id)
+        self.assertEqual(participant_0.state, 'running')
+        self.assertEqual(participant_0.trace_ids.activity_id, activity)
+        self.assertEqual(participant_1.state, 'unlinked')
+
+        # the removed participant is not created again
+        test_records[1].write({'name': 'Matching Again'})
+        campaign.sync_participants()
+        self.assertEqual(len(campaign.participant_ids), 5)
+
+    @users('user_markauto')
+    @mute_logger('odoo.addons.base.ir.ir_model', 'odoo.models', 'odoo.addons.marketing_automation.models.marketing_activity')
+    def test_internals_server_action_batch(self):
+        test_records = self.test_records[:3].with_env(self.env)
+        test_records[2].write({'name': 'Error'})
+        server_action = self.env['ir.actions.server'].sudo().create({
+            'name': 'Update description', 'state': 'code',
+            'model_id': self.env['ir.model']._get_id('marketing.test.sms'),
+            'code': """
+if any(record.name == 'Error' for record in records):
+    raise UserError('Error')
+records.write({'description': 'Batch of %s' % len(records)})""",
+        })
+        for records, descriptions in [(test_records[:2], {'Batch of 2'}), (test_records, {'Batch of 1'})]:
+            campaign = self.env['marketing.campaign'].create({
+                'name': 'My First Campaign',
+                'model_id': self.env['ir.model']._get_id('marketing.test.sms'),
+                'domain': '%s' % [('id', 'in', records.ids)],
+            })
+            activity = self._create_activity(campaign, action=server_action, interval_number=0, server_action_batch=True)
+            campaign.action_start_campaign()
+            campaign.sync_participants()
+            campaign.execute_activities()
+
+            # when the batch fails, the action is run again record by record
+            valid_records = records - test_records[2]
+            self.assertEqual(set(valid_records.mapped('description')), descriptions)
+            self.assertEqual(set(activity.trace_ids.filtered(lambda t: t.res_id in valid_records.ids).mapped('state')), {'processed'})
+            self.assertEqual(activity.trace_ids.filtered(lambda t: t.res_id == test_records[2].id).state or False,
+                             'error' if test_records[2] in records else False)
+
+    @users('user_markauto')
+    @mute_logger('odoo.addons.base.ir.ir_model', 'odoo.models')
+    def test_internals_execute_metrics(self):
+        test_records = self.test_records[:4].with_env(self.env)
+        server_action = self.env['ir.actions.server'].sudo().create({
+            'name': 'Update description', 'state': 'code',
+            'model_id': self.env['ir.model']._get_id('marketing.test.sms'),
+            'code': "records.write({'description': 'Executed'})",
+        })
+        campaigns = self.env['marketing.campaign']
+        for records in [test_records[:3], test_records[3:]]:
+            campaign = self.env['marketing.campaign'].create({
+                'name': 'My First Campaign',
+                'model_id': self.env['ir.model']._get_id('marketing.test.sms'),
+                'domain': '%s' % [('id', 'in', records.ids)],
+            })
+            activity = self._create_activity(campaign, action=server_action, interval_number=0)
+            self._create_activity(campaign, action=server_action, interval_number=0, parent_id=activity.id)
+            campaign.action_start_campaign()
+            campaign.sync_participants()
+            campaigns |= campaign
+
+        campaigns.execute_activities()
+        self.assertEqual(set(test_records.mapped('description')), {'Executed'})
+        for campaign, count in zip(campaigns, [3, 1]):
+            activity = campaign.marketing_activity_ids.filtered(lambda act: not act.parent_id)
+            child = campaign.marketing_activity_ids - activity
+            self.assertEqual(set(activity.trace_ids.mapped('state')), {'processed'})
+            executions = self.env['marketing.activity.execution'].search([('activity_id', '=', activity.id)])
+            self.assertEqual(len(executions), 1)
+            self.assertEqual(executions.campaign_id, campaign)
+            self.assertEqual((executions.trace_count, executions.error_count), (count, 0))
+            # children traces created during the run are executed by the next one
+            self.assertEqual(set(child.trace_ids.mapped('state')), {'scheduled'})
+            self.assertFalse(self.env['marketing.activity.execution'].search([('activity_id', '=', child.id)]))
+
+        campaigns.execute_activities()
+        for campaign in campaigns:
+            self.assertEqual(set(campaign.marketing_activity_ids.trace_ids.mapped('state')), {'processed'})
@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+from datetime import timedelta
+
 from odoo import _, api, models
 from lxml.builder import E
 from odoo.exceptions import UserError
@@ -152,3 +154,71 @@ class Base(models.AbstractModel):
         :returns: dict of unavailability
         """
         return rows
+
+    @api.model
+    def _gantt_fill_unavailabilities(self, rows, scale, field_name, get_unavailabilities):
+        """ Inject the 'unavailabilities' key in every row of ``rows``.
+
+        The rows grouped by ``field_name`` (and all their subrows) receive the
+        unavailabilities of their ``resId``; the other rows receive the default
+        unavailabilities. The ids of the rows are collected first so that the
+        unavailabilities of all of them can be computed in a single batch.
+
+        :param list rows: rows of the gantt view, see ``gantt_unavailability``
+        :param string scale: among "day", "week", "month" and "year"
+        :param string field_name: group_by field whose rows get their own unavailabilities
+        :param get_unavailabilities: function taking the set of ``resId`` found
+            for ``field_name`` and returning a tuple ``(mapping, default)``
+            where ``mapping`` maps (some of) those ids to their unavailable
+            intervals and ``default`` are the intervals used for other rows
+        :returns: list of the new rows
+        """
+        res_ids = set()
+
+        def collect_res_ids(rows):
+            for row in rows:
+                group_bys = row.get('groupedBy')
+                if not group_bys:
+                    continue
+                if group_bys[0] == field_name and row.get('resId'):
+                    res_ids.add(row['resId'])
+                elif field_name in group_bys:
+                    collect_res_ids(row.get('rows'))
+
+        collect_res_ids(rows)
+        intervals_mapping, default_intervals = get_unavailabilities(res_ids)
+
+        # remove intervals smaller than a cell, as they will cause half a cell to turn grey
+        # ie: when looking at a week, a employee start everyday at 8, so there is a unavailability
+        # like: 2019-05-22 20:00 -> 2019-05-23 08:00 which will make the first half of the 23's cell grey
+        cell_dt = timedelta(hours=1) if scale in ['day', 'week'] else timedelta(hours=12)
+        unavailabilities_cache = {}
+
+        def get_row_unavailabilities(res_id):
+            if res_id not in unavailabilities_cache:
+                intervals = intervals_mapping.get(res_id, default_intervals) if res_id else default_intervals
+                unavailabilities_cache[res_id] = [
+                    {'start': interval[0], 'stop': interval[1]}
+                    for interval in intervals
+                    if interval[1] - interval[0] >= cell_dt
+                ]
+            return unavailabilities_cache[res_id]
+
+        def fill_rows(rows, parent_res_id=None, search_res_id=True):
+            new_rows = []
+            for row in rows:
+                res_id = parent_res_id
+                search_sub_rows = False
+                group_bys = row.get('groupedBy')
+                if not res_id and search_res_id and group_bys:
+                    if group_bys[0] == field_name and row.get('resId'):
+                        res_id = row['resId']
+                    elif field_name in group_bys:
+                        search_sub_rows = True
+                new_row = dict(row)
+                new_row['rows'] = fill_rows(row.get('rows') or [], res_id, search_sub_rows)
+                new_row['unavailabilities'] = get_row_unavailabilities(res_id)
+                new_rows.append(new_row)
+            return new_rows
+
+        return fill_rows(rows)